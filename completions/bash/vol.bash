@@ -2,8 +2,31 @@
 
 _vol() {
     local cur="${COMP_WORDS[COMP_CWORD]}"
-    local commands
-    commands=$(vol --completion 2>/dev/null)
+    local index=.vol/completion
+    local header key commands names source
+    local -a current sources
+    # The index written by `vol --completion` is fresh while none of the
+    # files it was built from (vol.toml, the Makefile and its includes) is
+    # newer than it and the directory has the same scripts and configs
+    # (globbed in code point order, like vol). Glob includes are left to vol.
+    if [[ -f $index ]]; then
+        { read -r header; read -r key; read -r commands; read -r names; read -ra sources; } < "$index"
+        local LC_ALL=C nullglob=$(shopt -p nullglob)
+        shopt -s nullglob
+        current=(*.sh *.toml)
+        $nullglob
+        if [[ ${current[*]} != "$names" || " ${sources[*]}" == *" glob:"* ]]; then
+            header=
+        fi
+        for source in "${sources[@]}"; do
+            if [[ $source -nt $index ]]; then
+                header=
+            fi
+        done
+    fi
+    if [[ $header != "vol-completion 3" ]]; then
+        commands=$(vol --completion 2>/dev/null)
+    fi
     COMPREPLY=($(compgen -W "$commands" -- "$cur"))
 }
 
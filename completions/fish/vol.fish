@@ -1,6 +1,30 @@
 # vol(1) fish completion
 
 function __vol_complete
+    set -l index .vol/completion
+    # The index written by `vol --completion` is fresh while none of the
+    # files it was built from (vol.toml, the Makefile and its includes) is
+    # newer than it and the directory has the same scripts and configs
+    # (fish sorts globs its own way: compared as sets). Glob includes are left to vol.
+    if test -f $index
+        set -l lines (string split \n < $index)
+        set -l names (string split -n ' ' -- $lines[4])
+        set -l sources (string split -n ' ' -- $lines[5])
+        set -l current *.sh *.toml
+        set -l fresh (test "$lines[1]" = "vol-completion 3"; and test (count $current) -eq (count $names); and echo 1)
+        for name in $current
+            contains -- $name $names; or set fresh
+        end
+        for source in $sources
+            if string match -q 'glob:*' -- $source; or command test $source -nt $index
+                set fresh
+            end
+        end
+        if test -n "$fresh"
+            string split ' ' -- $lines[3]
+            return
+        end
+    end
     vol --completion 2>/dev/null | string split ' '
 end
 
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Output throughput benchmark.
+
+Runs a child that writes as fast as it can, once with raw output (a pipe
+drained by cat) and once under vol's live output panel (rendered to a
+terminal-like console on /dev/null). The child times its own writes, so
+the comparison shows whether vol slows down the build it is watching:
+with output drained on the engine thread and frames drawn at a fixed
+rate, the child never waits on a full pipe. "vol total" adds what vol
+does after the child exits (writing the log).
+
+Usage: python scripts/bench_output.py [--mb N] [--runs N] [--max-slowdown X]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# Children writing about `mb` megabytes: many short lines, or one huge line (minified bundle)
+CHILDREN = {
+    "short lines": "line = 'x' * 79 + '\\n'\nfor _ in range({mb} * 1024 * 1024 // 80): w(line)",
+    "one long line": "chunk = 'y' * 65536\nfor _ in range({mb} * 16): w(chunk)\nw('\\n')",
+}
+
+# Wraps a child: time from the first to the last write, saved to `timing`
+TIMED = """\
+import sys, time
+w = sys.stdout.write
+start = time.perf_counter()
+{body}
+sys.stdout.flush()
+open({timing!r}, "w").write(str(time.perf_counter() - start))
+"""
+
+
+def child_command(name: str, mb: int, timing: str) -> str:
+    script = TIMED.format(body=CHILDREN[name].format(mb=mb), timing=timing)
+    return f"{sys.executable} -c {subprocess.list2cmdline([script])}"
+
+
+def child_time(timing: str) -> float:
+    return float(Path(timing).read_text())
+
+
+def run_raw(cmd: str, timing: str) -> float:
+    subprocess.run(f"{cmd} | cat > /dev/null", shell=True, check=True)
+    return child_time(timing)
+
+
+def run_vol(cmd: str, timing: str, log_path: str) -> tuple[float, float]:
+    """(child time, total time) under run_command_with_output"""
+    from vol.output import console
+    from vol.logger import Logger
+    from vol.runner import run_command_with_output
+
+    start = time.perf_counter()
+    ok = run_command_with_output(cmd, "bench", False, Logger(log_path))
+    total = time.perf_counter() - start
+    console.file.flush()
+    if not ok:
+        raise SystemExit("child failed under vol")
+    return child_time(timing), total
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mb", type=int, default=64, help="Megabytes of output per child (default: 64)")
+    parser.add_argument("--runs", type=int, default=3, help="Runs per case, the fastest counts (default: 3)")
+    parser.add_argument("--max-slowdown", type=float, default=0,
+                        help="Fail if vol is slower than raw by more than this factor (0 = report only)")
+    args = parser.parse_args()
+
+    from vol.output import console
+    from vol.config import UIConfig, set_ui_config
+
+    # A live terminal, drawn into /dev/null
+    devnull = open(os.devnull, "w")
+    console.__init__(file=devnull, force_terminal=True, width=120, height=40)
+    set_ui_config(UIConfig(speed_mode=True))
+
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        log_path = os.path.join(tmp, "bench.log")
+        timing = os.path.join(tmp, "timing")
+        print(f"{'child':16} {'raw':>8} {'under vol':>10} {'ratio':>7} {'vol total':>10}   ({args.mb} MB each)")
+        for name in CHILDREN:
+            cmd = child_command(name, args.mb, timing)
+            raw = min(run_raw(cmd, timing) for _ in range(args.runs))
+            child, total = min(run_vol(cmd, timing, log_path) for _ in range(args.runs))
+            ratio = child / raw
+            print(f"{name:16} {raw:7.2f}s {child:9.2f}s {ratio:6.2f}x {total:9.2f}s")
+            if args.max_slowdown and ratio > args.max_slowdown:
+                failed = True
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
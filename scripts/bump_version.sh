@@ -23,8 +23,8 @@ fi
 # Update pyproject.toml
 sed -i '' "s/^version = \".*\"/version = \"$VERSION\"/" pyproject.toml
 
-# Update cli.py
-sed -i '' "s/version=\"vol .*\"/version=\"vol $VERSION\"/" vol/cli.py
+# Update the package version (used by `vol --version` and the parse cache)
+sed -i '' "s/^__version__ = \".*\"/__version__ = \"$VERSION\"/" vol/__init__.py
 
 # Update local Homebrew formula template with new version
 sed -i '' "s|releases/download/v[^/]*/vol|releases/download/v$VERSION/vol|g" homebrew/vol.rb
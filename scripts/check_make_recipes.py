@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Expansion of Makefile recipe lines.
+
+Parses a small Makefile in a scratch directory and checks the commands vol
+would run, in particular automatic variables reached through recursive
+variables (the auto-dependency idiom DEPFLAGS = -MT $@ -MMD -MP -MF $*.d).
+
+Usage: python scripts/check_make_recipes.py
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from vol.makefile import expand_pattern_rules, expand_variables, read_makefile, recipe_scope  # noqa: E402
+
+MAKEFILE = """\
+CC = cc
+DEPFLAGS = -MT $@ -MMD -MP -MF $*.d
+OUT = $(@D) $(@F) ${<F}
+
+%.o: %.c
+\t$(CC) $(DEPFLAGS) -c $< -o $@
+
+obj/app: main.o util.o
+\techo $(OUT) $^
+\techo '$$HOME' $$PATH $(UNKNOWN)
+"""
+
+# (target, recipe line) -> command vol runs
+EXPECTED = {
+    ("main.o", 0): "cc -MT main.o -MMD -MP -MF main.d -c main.c -o main.o",
+    ("util.o", 0): "cc -MT util.o -MMD -MP -MF util.d -c util.c -o util.o",
+    ("obj/app", 0): "echo obj app main.o main.o util.o",
+    ("obj/app", 1): "echo '$$HOME' $$PATH $(UNKNOWN)",
+}
+
+
+def main() -> int:
+    failed = False
+    with tempfile.TemporaryDirectory() as project:
+        os.chdir(project)
+        Path(project, "Makefile").write_text(MAKEFILE)
+        for source in ("main.c", "util.c"):
+            Path(project, source).write_text("int x;\n")
+        os.environ["VOL_NO_PARSE_CACHE"] = "1"
+
+        targets, variables, patterns = read_makefile("Makefile")
+        expand_pattern_rules("obj/app", targets, patterns)
+        for (name, index), expected in EXPECTED.items():
+            cmd = targets[name]["commands"][index]["cmd"]
+            got = expand_variables(cmd, recipe_scope(name, targets[name], variables))
+            ok = got == expected
+            failed |= not ok
+            print(f"{'ok  ' if ok else 'FAIL'}  {name}: {got!r}" + ("" if ok else f" (expected {expected!r})"))
+        os.chdir(ROOT)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
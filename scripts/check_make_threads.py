@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Parallel expansion of Makefile commands.
+
+With -j, several workers expand recipe lines at the same time. Expands
+a recursive variable that calls $(shell) and $(wildcard) from a few
+threads at once and fails if any thread sees another one's expansion
+(a false "references itself" error or a wrong result).
+
+Usage: python scripts/check_make_threads.py [--threads N] [--rounds N]
+"""
+
+import os
+import sys
+import argparse
+import tempfile
+import threading
+from collections import ChainMap
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from vol.make_expr import Deferred, Variables  # noqa: E402
+from vol.makefile import expand_variables  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=4, help="Expanding threads (default: 4)")
+    parser.add_argument("--rounds", type=int, default=20, help="Expansions per thread (default: 20)")
+    args = parser.parse_args()
+
+    errors: list[str] = []
+    with tempfile.TemporaryDirectory() as project:
+        os.chdir(project)
+        Path(project, "main.c").write_text("int main(void) { return 0; }\n")
+        variables = Variables({
+            # The slow $(shell) keeps FLAGS mid-expansion while other threads reach it
+            "SLOW": Deferred("$(shell sleep 0.01)"),
+            "FLAGS": Deferred("-O2 $(SLOW) $(wildcard *.c)"),
+        })
+        barrier = threading.Barrier(args.threads)
+
+        def worker(target: str):
+            barrier.wait()
+            for _ in range(args.rounds):
+                try:
+                    # The way recipe lines are expanded: automatic variables over the shared table
+                    line = expand_variables("echo $(FLAGS) $@", ChainMap({"@": target}, variables))
+                except ValueError as e:
+                    errors.append(f"{target}: {e}")
+                    return
+                if line != f"echo -O2  main.c {target}":
+                    errors.append(f"{target}: {line!r}")
+                    return
+
+        threads = [threading.Thread(target=worker, args=(f"t{i}",)) for i in range(args.threads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        os.chdir(ROOT)
+
+    for error in errors:
+        print(f"FAIL {error}")
+    if not errors:
+        print(f"OK   {args.threads} threads x {args.rounds} expansions")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
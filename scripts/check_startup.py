@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Startup budget for the vol CLI.
+
+Runs `vol --completion`, `vol --version` and `vol --list` under
+`python -X importtime` in a scratch project and fails if an entry path
+imports a module it must not need (Rich for completion, the runner for
+--list, ...) or if vol's own imports take longer than the budget.
+
+Usage: python scripts/check_startup.py [--runs N] [--scale X]
+"""
+
+import os
+import sys
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Entry path -> (import budget in ms, modules that must not be imported)
+CHECKS = {
+    "--completion": (80, ["rich", "asyncio", "concurrent.futures", "vol.runner", "vol.output"]),
+    "--version": (80, ["rich", "asyncio", "concurrent.futures", "vol.runner", "vol.output"]),
+    "--list": (200, ["rich.live", "rich.syntax", "asyncio", "vol.runner", "vol.engine"]),
+}
+
+MAKEFILE = """\
+# Build everything
+all: app
+
+app: main.o
+\tcc -o $@ $^
+
+%.o: %.c
+\tcc -c $< -o $@
+"""
+
+VOL_TOML = """\
+[build]
+description = "Build"
+commands = ["make all"]
+"""
+
+# Runs vol.cli.main() the way the console script does
+ENTRY = "import sys; from vol.cli import main; sys.argv[0] = 'vol'; main()"
+
+
+def import_times(code: str, args: list[str], cwd: str) -> dict[str, int]:
+    """Imports of `python -c code args`: {module name (indented by depth): cumulative microseconds}"""
+    env = dict(os.environ, PYTHONPATH=str(ROOT), VOL_NO_DAEMON="1")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code, *args],
+        cwd=cwd, env=env, capture_output=True, text=True,
+    )
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        if cumulative.strip().isdigit():
+            times[name[1:].rstrip()] = int(cumulative)
+    return times
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Runs per entry path, the fastest counts (default: 5)")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply budgets (slow machines)")
+    args = parser.parse_args()
+
+    failed = False
+    with tempfile.TemporaryDirectory() as project:
+        Path(project, "Makefile").write_text(MAKEFILE)
+        Path(project, "vol.toml").write_text(VOL_TOML)
+
+        # Modules the bare interpreter loads do not count
+        baseline = {name.strip() for name in import_times("pass", [], project)}
+
+        for flag, (budget_ms, forbidden) in CHECKS.items():
+            best = None
+            imported = set()
+            for _ in range(args.runs):
+                times = import_times(ENTRY, [flag], project)
+                imported = {name.strip() for name in times}
+                # Top-level entries (no indentation) after startup are what vol pulled in
+                total = sum(us for name, us in times.items()
+                            if not name.startswith("  ") and name.strip() not in baseline)
+                best = total if best is None else min(best, total)
+
+            bad = sorted(m for m in forbidden if m in imported)
+            limit = budget_ms * args.scale
+            status = "ok" if not bad and best / 1000 <= limit else "FAIL"
+            print(f"{status:4}  vol {flag:13} {best / 1000:6.1f} ms (budget {limit:.0f} ms)")
+            if bad:
+                print(f"      imports {', '.join(bad)}")
+            failed = failed or status != "ok"
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
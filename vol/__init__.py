@@ -3,25 +3,36 @@ Volumes v2 (vol) - Universal build tool with beautiful output
 https://github.com/pluttan/volumes
 """
 
-from .output import console, print_status
-from .config import VolConfig
-from .runner import VolRunner, run_command_with_output
-from .script import parse_script, run_script
-from .makefile import parse_makefile, run_makefile, list_makefile_targets
-from .logger import Logger
+__version__ = "2.0.24"
 
-__version__ = "2.0.0"
-__all__ = [
-    "console",
-    "print_status",
-    "VolConfig",
-    "VolRunner",
-    "run_command_with_output",
-    "parse_script",
-    "run_script",
-    "parse_makefile",
-    "run_makefile",
-    "list_makefile_targets",
-    "Logger",
-]
+# Public names and the modules they live in. Imported on first access so
+# that `import vol` (and every CLI start) does not pay for Rich.
+_EXPORTS = {
+    "console": "output",
+    "print_status": "output",
+    "VolConfig": "config",
+    "VolRunner": "runner",
+    "run_command_with_output": "runner",
+    "parse_script": "script",
+    "run_script": "script",
+    "parse_makefile": "makefile",
+    "run_makefile": "makefile",
+    "list_makefile_targets": "makefile",
+    "Logger": "logger",
+}
 
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module 'vol' has no attribute {name!r}")
+    import importlib
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
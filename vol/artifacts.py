@@ -0,0 +1,377 @@
+"""Local content-addressed store for task outputs"""
+
+import os
+import re
+import json
+import glob
+import time
+import shutil
+import fnmatch
+import threading
+from pathlib import Path
+from typing import Optional
+
+from .fingerprint import expand_globs, hash_file
+
+# Entries and objects younger than this are never evicted (keeps the entry
+# just saved, and objects whose entry a concurrent save has not written yet)
+EVICT_GRACE_S = 60
+
+# Linux FICLONE ioctl (reflink on btrfs, xfs, ...)
+FICLONE = 0x40049409
+
+
+def default_cache_dir() -> Path:
+    """~/.cache/vol (or $XDG_CACHE_HOME/vol)"""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return Path(base) / "vol"
+
+
+def temp_path(path: Path) -> Path:
+    """Scratch name next to path, unique per process and thread (parallel jobs write at once)"""
+    return path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+
+def reflink(src: str, dst: str) -> bool:
+    """Clone file contents without copying data. Returns False if unsupported."""
+    try:
+        import fcntl
+    except ImportError:
+        return False
+    try:
+        with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        return True
+    except OSError:
+        try:
+            os.unlink(dst)
+        except OSError:
+            pass
+        return False
+
+
+# Object names: SHA-256 of the contents, "x" suffix = executable
+OBJECT_NAME_RE = re.compile(r'^[0-9a-f]{64}x?$')
+
+
+def is_safe_output(pattern: str) -> bool:
+    """Outputs must stay inside the project directory"""
+    path = Path(os.path.expandvars(pattern))
+    return not path.is_absolute() and ".." not in path.parts
+
+
+def matches_outputs(path: str, outputs: list[str]) -> bool:
+    """Whether a file is one of the declared outputs (a match, or a file under a matched directory)"""
+    path = os.path.normpath(path)
+    for pattern in outputs:
+        pattern = os.path.normpath(os.path.expandvars(pattern))
+        candidates = [pattern, pattern[3:]] if pattern.startswith("**/") else [pattern]
+        for candidate in candidates:
+            if fnmatch.fnmatchcase(path, candidate) or fnmatch.fnmatchcase(path, candidate + "/*"):
+                return True
+    return False
+
+
+def parse_entry(data: bytes, outputs: list[str] = None) -> dict:
+    """
+    Decode and check an entry, which may come from a shared cache.
+
+    Every output pattern and file path must stay inside the project and
+    every object name must be a digest; with `outputs` (the task's own
+    declaration) the entry must cover exactly those outputs and its files
+    must lie inside them. Raises ValueError otherwise.
+    """
+    entry = json.loads(data)
+    if not isinstance(entry, dict):
+        raise ValueError("entry is not an object")
+    patterns, files = entry.get("outputs"), entry.get("files")
+    if not isinstance(patterns, list) or not all(isinstance(p, str) and is_safe_output(p) for p in patterns):
+        raise ValueError("bad entry outputs")
+    if not isinstance(files, list):
+        raise ValueError("bad entry files")
+    for item in files:
+        if not (isinstance(item, list) and len(item) == 2 and all(isinstance(part, str) for part in item)):
+            raise ValueError("bad entry file")
+        path, name = item
+        if not path or not is_safe_output(path) or not OBJECT_NAME_RE.match(name):
+            raise ValueError(f"unsafe entry file: {path!r} -> {name!r}")
+    if outputs is not None:
+        if sorted(patterns) != sorted(outputs):
+            raise ValueError("entry outputs differ from the task's")
+        if not all(matches_outputs(path, outputs) for path, _ in files):
+            raise ValueError("entry file outside the task's outputs")
+    return entry
+
+
+def is_inside_project(path: str) -> bool:
+    """The file's directory, symlinks resolved, is under the working directory"""
+    root = os.path.realpath(".")
+    parent = os.path.realpath(os.path.dirname(os.path.abspath(path)))
+    return parent == root or parent.startswith(root + os.sep)
+
+
+class ArtifactStore:
+    """Content-addressed store of task outputs.
+
+    Layout:
+        objects/ab/abcdef...[x]  - file contents by SHA-256 (x = executable), read-only
+        entries/<fingerprint>.json - {"outputs": [patterns], "files": [[path, object], ...]}
+
+    Entry mtimes are bumped on every hit, eviction removes the least
+    recently used entries and then unreferenced objects.
+    """
+
+    def __init__(self, root: Path = None, max_size_mb: int = 1024, remote=None, hardlinks: bool = False):
+        self.root = Path(root) if root else default_cache_dir()
+        self.objects = self.root / "objects"
+        self.entries = self.root / "entries"
+        self.max_bytes = max_size_mb * 1024 * 1024
+        # Restore by hardlinking objects where reflinks are unsupported (cache_hardlinks)
+        self.hardlinks = hardlinks
+        # Optional RemoteCache consulted on local misses and fed after saves
+        self.remote = remote
+        # Bytes of objects as of the last eviction scan plus those added since
+        # (None until the first scan): saves only scan the store once it is full
+        self._size: Optional[int] = None
+
+    def object_path(self, name: str) -> Path:
+        if not OBJECT_NAME_RE.match(name):
+            raise ValueError(f"bad object name: {name!r}")
+        return self.objects / name[:2] / name
+
+    def entry_path(self, fingerprint: str) -> Path:
+        return self.entries / f"{fingerprint}.json"
+
+    def has(self, fingerprint: str) -> bool:
+        return self.entry_path(fingerprint).exists()
+
+    def save(self, fingerprint: str, outputs: list[str], digests: dict[str, str] = None) -> bool:
+        """Store the current outputs under a task fingerprint"""
+        if not all(is_safe_output(p) for p in outputs):
+            return False
+
+        files = []
+        added = 0
+        try:
+            for path in expand_globs(outputs):
+                digest = (digests or {}).get(path) or hash_file(path)
+                executable = os.access(path, os.X_OK)
+                name = digest + ("x" if executable else "")
+                obj = self.object_path(name)
+                if not obj.exists():
+                    self._add_object(path, obj, executable)
+                    added += obj.stat().st_size
+                files.append([path, name])
+
+            self.put_entry(fingerprint, json.dumps({"outputs": outputs, "files": files}).encode())
+        except OSError:
+            return False
+
+        if self._size is None:
+            self.evict()
+        elif added:
+            self._size += added
+            if self._size > self.max_bytes:
+                self.evict()
+        if self.remote is not None:
+            self.remote.upload(self, fingerprint)
+        return True
+
+    def put_entry(self, fingerprint: str, data: bytes):
+        """Write an entry file atomically"""
+        entry = self.entry_path(fingerprint)
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        tmp = temp_path(entry)
+        tmp.write_bytes(data)
+        os.replace(tmp, entry)
+
+    def _add_object(self, src: str, obj: Path, executable: bool):
+        obj.parent.mkdir(parents=True, exist_ok=True)
+        tmp = temp_path(obj)
+        # Never hardlink into the store: later in-place edits would corrupt it
+        if not reflink(src, str(tmp)):
+            shutil.copyfile(src, tmp)
+        os.chmod(tmp, 0o555 if executable else 0o444)
+        os.replace(tmp, obj)
+
+    def restore(self, fingerprint: str, outputs: list[str]) -> bool:
+        """
+        Restore a task's declared outputs saved under a fingerprint.
+        Returns False on a miss, or if the entry does not describe exactly
+        these outputs inside the project (see parse_entry).
+        """
+        if not all(is_safe_output(p) for p in outputs):
+            return False
+        entry = self.entry_path(fingerprint)
+        if not entry.exists() and not (self.remote is not None and self.remote.fetch(self, fingerprint)):
+            return False
+        try:
+            files = parse_entry(entry.read_bytes(), outputs)["files"]
+            if not all(self.object_path(name).exists() for _, name in files):
+                return False
+            # No writing through symlinked directories out of the project
+            if not all(is_inside_project(path) for path, _ in files):
+                return False
+
+            # Remove stale outputs so restored directories match exactly; sorted,
+            # a directory goes before its contents (dir and dir/** both match)
+            matches = {m for pattern in outputs for m in glob.glob(os.path.expandvars(pattern), recursive=True)}
+            for match in sorted(matches):
+                try:
+                    if os.path.isdir(match) and not os.path.islink(match):
+                        shutil.rmtree(match)
+                    else:
+                        os.unlink(match)
+                except FileNotFoundError:
+                    # Removed with its directory already
+                    pass
+
+            for path, name in files:
+                Path(path).parent.mkdir(parents=True, exist_ok=True)
+                self._place(self.object_path(name), path)
+
+            # Bump for LRU
+            os.utime(entry)
+        except (OSError, ValueError, KeyError):
+            return False
+        return True
+
+    def _place(self, obj: Path, dst: str):
+        """
+        Materialize an object: reflink, then copy. A hardlink would let any
+        tool writing the output in place (or chmod +w and edit) corrupt the
+        store for every project, so it is only used with cache_hardlinks.
+        """
+        if reflink(str(obj), dst):
+            os.chmod(dst, obj.stat().st_mode | 0o200)
+            return
+        if self.hardlinks:
+            try:
+                # Shares the read-only inode; unshare() copies it before the task runs again
+                os.link(obj, dst)
+                return
+            except OSError:
+                pass
+        shutil.copyfile(obj, dst)
+        os.chmod(dst, obj.stat().st_mode | 0o200)
+
+    def unshare(self, outputs: list[str]):
+        """Replace hardlinked (read-only) outputs with private writable copies,
+        so a task rebuilding them in place does not fail or touch the store"""
+        for path in expand_globs(outputs):
+            try:
+                st = os.lstat(path)
+                if st.st_nlink > 1:
+                    # Checked by link count, not access(): root may write read-only files
+                    tmp = temp_path(Path(path))
+                    shutil.copyfile(path, tmp)
+                    os.chmod(tmp, st.st_mode | 0o200)
+                    os.replace(tmp, path)
+                elif not st.st_mode & 0o200:
+                    # Was linked to an object that has since been evicted
+                    os.chmod(path, st.st_mode | 0o200)
+            except OSError:
+                pass
+
+    def evict(self):
+        """
+        Drop least recently used entries until the store fits max size.
+        Runs from save() on the first save of a process, then only once the
+        bytes added since the last scan reach the limit.
+        """
+        try:
+            import fcntl
+        except ImportError:
+            fcntl = None
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        with open(self.root / "lock", "w") as lock:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    # Someone else is evicting right now
+                    return
+
+            objects = {}
+            for path in self.objects.glob("*/*"):
+                try:
+                    st = path.stat()
+                except OSError:
+                    continue
+                objects[path.name] = (path, st.st_size, st.st_mtime)
+
+            total = sum(size for _, size, _ in objects.values())
+            self._size = total
+            if total <= self.max_bytes:
+                return
+
+            entries = []
+            for path in self.entries.glob("*.json"):
+                try:
+                    names = [name for _, name in json.loads(path.read_text(encoding="utf-8"))["files"]]
+                    entries.append((path.stat().st_mtime, path, names))
+                except (OSError, ValueError, KeyError):
+                    continue
+            entries.sort()
+
+            refs = {}
+            for _, _, names in entries:
+                for name in names:
+                    refs[name] = refs.get(name, 0) + 1
+
+            now = time.time()
+
+            def drop_object(name: str):
+                nonlocal total
+                obj, size, mtime = objects.pop(name)
+                if now - mtime < EVICT_GRACE_S:
+                    return
+                try:
+                    obj.unlink()
+                    total -= size
+                except OSError:
+                    pass
+
+            # Orphans first (left over from interrupted saves)
+            for name in [n for n in objects if n not in refs]:
+                drop_object(name)
+
+            for entry_mtime, path, names in entries:
+                if total <= self.max_bytes or now - entry_mtime < EVICT_GRACE_S:
+                    break
+                try:
+                    path.unlink()
+                except OSError:
+                    continue
+                for name in names:
+                    refs[name] -= 1
+                    if refs[name] == 0 and name in objects:
+                        drop_object(name)
+            self._size = total
+
+
+# Global store instance
+_store: Optional[ArtifactStore] = None
+
+
+def get_artifact_store() -> ArtifactStore:
+    """Get or create the artifact store configured in [config]"""
+    global _store
+    if _store is None:
+        from .config import get_ui_config
+        ui = get_ui_config()
+        from .remote_cache import create_remote_cache
+        _store = ArtifactStore(
+            os.path.expanduser(ui.cache_dir) if ui.cache_dir else None,
+            ui.cache_size_mb,
+            remote=create_remote_cache(),
+            hardlinks=ui.cache_hardlinks,
+        )
+    return _store
+
+
+def flush_remote_cache():
+    """Finish uploads to the remote cache and report its failure (the daemon's children skip atexit)"""
+    if _store is not None and _store.remote is not None:
+        _store.remote.flush()
@@ -1,44 +1,72 @@
 """Output buffer for command output display"""
 
+from collections import deque
+
+# Longest line kept when there is no panel width to cut it to
+MAX_LINE_CHARS = 10_000
+
 
 class OutputBuffer:
-    """Simple output buffer showing last N lines"""
-    
+    """
+    Output buffer showing the last N lines.
+
+    Only what can still be seen is stored: a ring of max_lines rows, and of
+    a long line just the wrapped rows that fit in it, so a multi-megabyte
+    line costs as much as a short one.
+    """
+
     def __init__(self, max_lines: int = 10, max_width: int = 0, wrap_lines: bool = True):
         self.max_lines = max_lines
         self.max_width = max_width  # 0 = no limit
         self.wrap_lines = wrap_lines
-        self.lines: list[str] = []
-    
+        self.lines: deque[str] = deque(maxlen=max_lines)
+        self._display: str | None = None
+
     def add_line(self, line: str):
         line = line.rstrip()
-        
-        if self.max_width > 0:
+        width = self.max_width
+        self._display = None
+
+        if width > 0:
             if self.wrap_lines:
-                # Wrap long lines into multiple lines
-                while len(line) > self.max_width:
-                    self.lines.append(line[:self.max_width])
-                    line = line[self.max_width:]
-                if line:
-                    self.lines.append(line)
+                # Wrap long lines into rows of `width`; rows that would scroll
+                # out of the buffer right away are never sliced
+                rows = -(-len(line) // width)
+                first = max(0, rows - self.max_lines)
+                for start in range(first * width, len(line), width):
+                    self.lines.append(line[start:start + width])
             else:
                 # Truncate long lines
-                if len(line) > self.max_width:
-                    line = line[:self.max_width - 3] + "..."
+                if len(line) > width:
+                    line = line[:width - 3] + "..."
                 self.lines.append(line)
         else:
+            if len(line) > MAX_LINE_CHARS:
+                line = line[:MAX_LINE_CHARS - 3] + "..."
             self.lines.append(line)
-        
-        # Keep only last max_lines
-        if len(self.lines) > self.max_lines:
-            self.lines = self.lines[-self.max_lines:]
-    
+
+    def add_lines(self, lines: list[str]):
+        """Add a batch of lines; those that would scroll out right away are skipped"""
+        start = len(lines)
+        rows = 0
+        while start > 0 and rows < self.max_lines:
+            start -= 1
+            rows += self.row_count(lines[start])
+        for line in lines[start:]:
+            self.add_line(line)
+
+    def row_count(self, line: str) -> int:
+        """Rows a line takes in the buffer"""
+        if self.max_width > 0 and self.wrap_lines:
+            return -(-len(line.rstrip()) // self.max_width)
+        return 1
+
     def line_count(self) -> int:
         """Return current number of lines in buffer"""
         return len(self.lines)
-    
+
     def get_display(self) -> str:
-        """Return display with actual lines only"""
-        if not self.lines:
-            return ""
-        return "\n".join(self.lines)
+        """Return display with actual lines only (cached until a line is added)"""
+        if self._display is None:
+            self._display = "\n".join(self.lines)
+        return self._display
@@ -0,0 +1,143 @@
+"""Headless output for CI and pipes: plain status lines and prefixed command output"""
+
+import os
+import sys
+import time
+import threading
+from itertools import count
+from typing import Optional
+
+# Collapsible sections around each command's output in CI logs
+GROUP_STYLES = ("auto", "github", "gitlab", "none")
+
+
+def detect_group_style() -> str:
+    """Group markers understood by the CI service running us, if any"""
+    if os.environ.get("GITHUB_ACTIONS") == "true":
+        return "github"
+    if os.environ.get("GITLAB_CI") == "true":
+        return "gitlab"
+    return "none"
+
+
+class PlainOutput:
+    """
+    Line-buffered plain text on stdout, for logs read by people and CI services.
+
+    Nothing here moves the cursor, clears the screen or draws a panel:
+    status lines are written as text and command output streams as
+    `[task] line`. Output is line-buffered per read: the lines the engine
+    got from one read of a pipe are flushed together as soon as it has
+    handled them, and always before the next status line. A lock keeps
+    lines of parallel jobs whole.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sections = count(1)
+        # Output lines waiting for the flush scheduled on the engine loop
+        self._pending: list[str] = []
+        self._flush_scheduled = False
+
+    @property
+    def groups(self) -> str:
+        """Group marker style from ci_groups (read late: inline config may set it)"""
+        from .config import get_ui_config
+        groups = get_ui_config().ci_groups
+        if groups == "auto":
+            return detect_group_style()
+        return groups if groups in GROUP_STYLES else "none"
+
+    def write_lines(self, lines: list[str]):
+        text = "".join(line + "\n" for line in lines)
+        with self._lock:
+            if self._pending:
+                text = "".join(self._pending) + text
+                self._pending = []
+            sys.stdout.write(text)
+            sys.stdout.flush()
+
+    def flush(self):
+        self.write_lines([])
+
+    def status_line(self, label: str, padding: str, time_str: str, task_name: Optional[str], message: str) -> str:
+        """[STATUS] [TIME] [TASK] message, laid out like the interactive line"""
+        from .config import get_ui_config
+        from .output import format_task_name
+        ui = get_ui_config()
+        parts = []
+        if ui.show_status_label:
+            parts.append(f"[{label}]{padding}")
+        if ui.show_time:
+            parts.append(f" [{time_str}]")
+        if ui.show_task_name and task_name:
+            parts.append(format_task_name(task_name))
+        parts.append(f"  {message}")
+        return "".join(parts)
+
+    def begin_command(self, title: str, group: bool) -> Optional[str]:
+        """Announce a command; returns the section to close, if its output is grouped"""
+        groups = self.groups if group else "none"
+        if groups == "none":
+            self.write_lines([title])
+            return None
+        if groups == "github":
+            self.write_lines([f"::group::{title}"])
+            return "github"
+        # GitLab folds the lines between section_start and section_end markers
+        section = f"vol_{next(self._sections)}"
+        self.write_lines([f"\033[0Ksection_start:{int(time.time())}:{section}[collapsed=true]\r\033[0K{title}"])
+        return section
+
+    def end_command(self, section: Optional[str]):
+        if section == "github":
+            self.write_lines(["::endgroup::"])
+        elif section is not None:
+            self.write_lines([f"\033[0Ksection_end:{int(time.time())}:{section}\r\033[0K"])
+
+    def prefix(self, task_name: Optional[str]) -> str:
+        """Prefix of a command's output lines"""
+        return f"[{task_name}] " if task_name else ""
+
+    def output_line(self, prefix: str, line: str):
+        """One line of command output (newline included, as the engine passes it)"""
+        if not line.endswith("\n"):
+            line += "\n"
+        with self._lock:
+            self._pending.append(prefix + line)
+            if self._flush_scheduled:
+                return
+            self._flush_scheduled = True
+        import asyncio
+        try:
+            # Runs once the engine is done with the current chunk of output
+            asyncio.get_running_loop().call_soon(self._scheduled_flush)
+        except RuntimeError:
+            self._scheduled_flush()
+
+    def _scheduled_flush(self):
+        with self._lock:
+            self._flush_scheduled = False
+        self.flush()
+
+
+# Set by the CLI for --ci or when stdout is not a terminal
+_plain_output: Optional[PlainOutput] = None
+
+
+def enable_ci_mode():
+    """Switch every front end to plain streaming output for this run"""
+    global _plain_output
+    from .output import console
+    _plain_output = PlainOutput()
+    # Tables and messages printed through rich come out without colors or control codes
+    console.__init__(force_terminal=False, no_color=True, highlight=False)
+
+
+def get_plain_output() -> Optional[PlainOutput]:
+    """The headless renderer, or None in interactive mode"""
+    return _plain_output
+
+
+def is_ci_mode() -> bool:
+    return _plain_output is not None
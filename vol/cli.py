@@ -1,24 +1,24 @@
 """Command-line interface"""
 
 import sys
-import glob
+import time
 import argparse
 from pathlib import Path
 
-from rich.table import Table
-from rich import box
-
-from .output import console, print_status, print_header, print_error_footer, clear_screen, setup_terminal_for_progress
+# Rich, the runner and the parsers are imported inside the functions that
+# need them: --version and --completion must start fast (scripts/check_startup.py)
+from . import __version__
 from .config import VolConfig, UIConfig, set_ui_config
-from .runner import VolRunner
-from .script import run_script
-from .makefile import list_makefile_targets, run_makefile
-from .logger import Logger
-from .tmp_log import init_tmp_log
 
 
 def list_tasks(config: VolConfig):
     """Display all available tasks, scripts, and Makefile targets"""
+    import glob
+    from rich.table import Table
+    from rich import box
+    from .output import console, print_status
+    from .makefile import list_makefile_targets
+    
     tasks = config.get_all_tasks()
     scripts = glob.glob("*.sh")
     toml_files = [f for f in glob.glob("*.toml") if f != "vol.toml"]
@@ -57,18 +57,57 @@ def list_tasks(config: VolConfig):
     console.print(table)
 
 
-def print_completion_list(config: VolConfig):
-    """Print all available tasks, scripts, and Makefile targets for completion"""
-    tasks = list(config.get_all_tasks().keys())
-    scripts = glob.glob("*.sh")
-    toml_files = [f for f in glob.glob("*.toml") if f != "vol.toml"]
-    makefile_targets = [f"make:{t}" for t in list_makefile_targets().keys()]
+def normalize_jobs_arg(argv: list[str]) -> list[str]:
+    """Allow a bare `-j` before the task name (`vol -j build`), like make does"""
+    result = []
+    for i, arg in enumerate(argv):
+        result.append(arg)
+        if arg in ("-j", "--jobs"):
+            next_arg = argv[i + 1] if i + 1 < len(argv) else ""
+            if not next_arg.isdigit():
+                from .scheduler import default_jobs
+                result.append(str(default_jobs()))
+    return result
+
+
+def cache_server_main(argv: list[str]):
+    """vol cache-server: reference shared cache server"""
+    from .remote_cache import serve
+    from .artifacts import default_cache_dir
     
-    all_items = tasks + scripts + makefile_targets + toml_files
-    print(" ".join(all_items))
+    parser = argparse.ArgumentParser(prog="vol cache-server", description="Serve a shared vol build cache over HTTP")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (default: 127.0.0.1)")
+    parser.add_argument("-p", "--port", type=int, default=8765, help="Port (default: 8765)")
+    parser.add_argument("-d", "--dir", default=str(default_cache_dir() / "server"), help="Storage directory")
+    args = parser.parse_args(argv)
+    serve(args.dir, args.host, args.port)
+
+
+def start_build_summary(started: float):
+    """Collect command timings and usage for the summary table"""
+    from .summary import start_summary
+    start_summary(started)
+
+
+def print_build_summary(args):
+    """Summary table after a build, if asked for (--summary or show_summary = true)"""
+    from .config import get_ui_config
+    if args.summary or get_ui_config().show_summary:
+        from .summary import print_summary
+        print_summary()
 
 
 def main():
+    # Wall time of the build counts from here (vol --summary)
+    started = time.time()
+    
+    # Hand the whole invocation to a running daemon (vol daemon start), if any
+    if sys.argv[1:2] != ["daemon"]:
+        from .daemon import run_client
+        code = run_client(sys.argv[1:])
+        if code is not None:
+            sys.exit(code)
+    
     parser = argparse.ArgumentParser(
         prog="vol",
         description="Volumes v2 - Universal build tool with beautiful output",
@@ -78,23 +117,65 @@ Examples:
   vol build              Run 'build' task from vol.toml
   vol make:build         Run 'build' target from Makefile
   vol test               Run 'test' task (with dependencies)
+  vol -j 4 deploy        Run independent dependencies of 'deploy' in parallel
+  vol make:all -j 8      Build independent Makefile prerequisites in parallel
+  vol -w make:all        Rebuild what changed on every save
+  vol --summary build    Costliest commands (time, CPU, memory) and vol's overhead
+  vol --ci make:all      Plain output with [target] prefixes (GitHub/GitLab groups)
   vol script.sh          Run shell script with volumes syntax
   vol --list             Show all available tasks
   vol -c app.toml build  Use custom config file
+  vol history --slowest  Slowest commands over the last 50 runs (--flaky: pass and fail)
+  vol cache-server       Serve a shared build cache (remote_cache = "http://host:8765")
+  vol daemon start       Keep vol warm in the background (stop: vol daemon stop)
         """
     )
     
     parser.add_argument("task", nargs="?", help="Task name, make:<target>, or script file")
     parser.add_argument("-c", "--config", default="vol.toml", help="Config file (default: vol.toml)")
     parser.add_argument("-l", "--list", action="store_true", help="List all tasks")
+    parser.add_argument("-j", "--jobs", type=int, default=1, metavar="N",
+                        help="Run up to N independent tasks or targets at once (default N: available CPUs)")
+    parser.add_argument("-k", "--keep-going", action="store_true",
+                        help="Keep running tasks that do not depend on a failed one")
+    parser.add_argument("-f", "--force", action="store_true",
+                        help="Run tasks even if their inputs/outputs are unchanged")
+    parser.add_argument("-w", "--watch", action="store_true",
+                        help="Re-run the task when its inputs or prerequisites change")
+    parser.add_argument("--refresh-shell", action="store_true",
+                        help="Ignore $(shell ...) outputs cached by shell_cache_ttl and query them again")
+    parser.add_argument("--summary", action="store_true",
+                        help="After the build, show the costliest commands (wall time, CPU, memory) and vol's own overhead")
+    parser.add_argument("--ci", action="store_true",
+                        help="Plain streaming output for CI logs (default when stdout is not a terminal)")
     parser.add_argument("--completion", action="store_true", help=argparse.SUPPRESS)
-    parser.add_argument("-v", "--version", action="version", version="vol 2.0.24")
+    parser.add_argument("-v", "--version", action="version", version=f"vol {__version__}")
+    
+    # Subcommands
+    if sys.argv[1:2] == ["cache-server"]:
+        cache_server_main(sys.argv[2:])
+        return
+    if sys.argv[1:2] == ["history"]:
+        from .history import history_main
+        history_main(sys.argv[2:])
+        return
+    if sys.argv[1:2] == ["daemon"]:
+        from .daemon import daemon_main
+        daemon_main(sys.argv[2:])
+        return
     
     # Use parse_known_args to allow passing extra args to commands (e.g. VERSION=2.0.0)
-    args, extra_args = parser.parse_known_args()
+    args, extra_args = parser.parse_known_args(normalize_jobs_arg(sys.argv[1:]))
+    
+    # Shell completion runs on every tab press: answered from .vol/completion when fresh
+    if args.completion:
+        from .completion import print_completion_list
+        print_completion_list(args.config)
+        return
     
-    # Initialize temporary log file for static output
-    init_tmp_log()
+    if args.refresh_shell:
+        from .shell_cache import set_shell_refresh
+        set_shell_refresh(True)
     
     # Load config early to get UI settings
     config_path = Path(args.config)
@@ -105,6 +186,17 @@ Examples:
         set_ui_config(UIConfig())
         config = None
     
+    from .output import console, print_status, print_header, print_error_footer, setup_terminal_for_progress
+    
+    if args.ci or not sys.stdout.isatty():
+        # No Live panels, screen control or .vol.tmp: output is a log
+        from .ci import enable_ci_mode
+        enable_ci_mode()
+    else:
+        # Initialize temporary log file for static output
+        from .tmp_log import init_tmp_log
+        init_tmp_log()
+    
     # Auto-detect if task is a script file
     if args.task and Path(args.task).is_file():
         script_path = args.task
@@ -118,9 +210,13 @@ Examples:
         
         print_header()
         
+        from .logger import Logger
+        from .script import run_script
         log_file = config.log_file if config else "./vol.log"
         logger = Logger(log_file)
+        start_build_summary(started)
         success = run_script(script_path, logger, extra_args)
+        print_build_summary(args)
         
         if not success:
             print_error_footer()
@@ -140,7 +236,15 @@ Examples:
         
         print_header()
         
-        success = run_makefile(target_name, extra_args)
+        if args.watch:
+            from .watch import watch_makefile
+            watch_makefile(target_name, extra_args, jobs=max(1, args.jobs), keep_going=args.keep_going)
+            return
+        
+        from .makefile import run_makefile
+        start_build_summary(started)
+        success = run_makefile(target_name, extra_args, jobs=max(1, args.jobs), keep_going=args.keep_going)
+        print_build_summary(args)
         
         if not success:
             print_error_footer()
@@ -157,10 +261,6 @@ Examples:
         list_tasks(config)
         return
 
-    if args.completion:
-        print_completion_list(config)
-        return
-    
     if not args.task:
         parser.print_help()
         console.print("\n")
@@ -173,12 +273,21 @@ Examples:
         console.print("\n[dim]Создайте vol.toml, используйте 'vol script.sh' или 'vol make:<target>'[/dim]")
         sys.exit(1)
     
+    if args.watch:
+        from .watch import watch_tasks
+        print_header()
+        watch_tasks(args.config, args.task, extra_args, max(1, args.jobs), args.keep_going, args.force)
+        return
+    
     # Run task
-    runner = VolRunner(config)
+    from .runner import VolRunner
+    runner = VolRunner(config, jobs=max(1, args.jobs), keep_going=args.keep_going, force=args.force)
     
     print_header()
     
+    start_build_summary(started)
     success = runner.run_with_deps(args.task, extra_args)
+    print_build_summary(args)
     
     if not success:
         print_error_footer()
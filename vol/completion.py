@@ -0,0 +1,123 @@
+"""Shell-completion index: completion candidates cached in .vol/completion"""
+
+import os
+from pathlib import Path
+from typing import Optional
+
+# Same directory as fingerprint.STATE_DIR (not imported: completion must start fast)
+INDEX_PATH = Path(".vol") / "completion"
+
+# First line of the index file
+INDEX_HEADER = "vol-completion 3"
+
+
+def index_key(stamps: list) -> str:
+    return repr(stamps)
+
+
+def can_index(source: str) -> bool:
+    """Sources are stored space separated, and $(shell ...) results are never fresh"""
+    from .parse_cache import VOLATILE
+    return source != VOLATILE and not any(c.isspace() for c in source)
+
+
+def script_names() -> str:
+    """
+    Scripts and configs offered as candidates: *.sh, then *.toml, each sorted
+    by code point as the completion scripts glob them (LC_ALL=C). Compared
+    by name: the directory mtime also changes on vol's own logs.
+    """
+    import glob
+    return " ".join(sorted(glob.glob("*.sh")) + sorted(glob.glob("*.toml")))
+
+
+def read_index(config_path: str, names: str) -> Optional[str]:
+    """Cached candidates, or None if the index is missing or stale.
+
+    Format (also read directly by the bash/zsh/fish completion scripts):
+        vol-completion 3
+        <stamps of the sources, as parse_cache takes them>
+        <candidates separated by spaces>
+        <script_names()>
+        <sources: vol.toml, the Makefile, included files, glob:patterns>
+    """
+    from .parse_cache import source_stamp
+    try:
+        lines = INDEX_PATH.read_text(encoding="utf-8").split("\n")
+    except OSError:
+        return None
+    if len(lines) < 5 or lines[0] != INDEX_HEADER or lines[3] != names:
+        return None
+    sources = lines[4].split()
+    # Written for another config (-c)
+    if os.path.abspath(config_path) not in sources:
+        return None
+    if lines[1] != index_key([source_stamp(source) for source in sources]):
+        return None
+    return lines[2]
+
+
+def write_index(stamps: dict, items: str, names: str):
+    """
+    Store candidates atomically (the completion scripts read the index while
+    other shells rewrite it); silently skipped where .vol can't be written.
+    The scripts trust an index newer than its sources, so it is not written
+    when a source changed while the candidates were being collected.
+    """
+    import tempfile
+    from .parse_cache import source_stamp
+    key = index_key(list(stamps.values()))
+    try:
+        fd, tmp = tempfile.mkstemp(prefix=f"{INDEX_PATH.name}.", suffix=".tmp", dir=INDEX_PATH.parent)
+    except OSError:
+        return
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(f"{INDEX_HEADER}\n{key}\n{items}\n{names}\n{' '.join(stamps)}\n")
+        if [source_stamp(source) for source in stamps] == list(stamps.values()):
+            os.replace(tmp, INDEX_PATH)
+            return
+    except OSError:
+        pass
+    try:
+        os.unlink(tmp)
+    except OSError:
+        pass
+
+
+def completion_items(config_path: str = "vol.toml") -> str:
+    """All tasks, scripts, Makefile targets and other configs, space separated"""
+    import glob
+    from .config import VolConfig
+    from .makefile import list_makefile_targets
+
+    tasks = list(VolConfig(config_path).get_all_tasks()) if Path(config_path).exists() else []
+    scripts = glob.glob("*.sh")
+    toml_files = [f for f in glob.glob("*.toml") if f != "vol.toml"]
+    # Targets named by a variable ($(BIN)) are listed unexpanded: not offered
+    makefile_targets = [f"make:{t}" for t in list_makefile_targets() if "$" not in t]
+
+    return " ".join(tasks + scripts + makefile_targets + toml_files)
+
+
+def print_completion_list(config_path: str = "vol.toml"):
+    """Print completion candidates, from the index when it is fresh"""
+    from .parse_cache import file_stamp, recorded_stamps
+    names = script_names()
+    items = read_index(config_path, names)
+    if items is None:
+        # Only projects vol can work with get a .vol directory
+        cacheable = Path(config_path).exists() or Path("Makefile").exists()
+        if cacheable and not INDEX_PATH.parent.is_dir():
+            try:
+                INDEX_PATH.parent.mkdir()
+            except OSError:
+                cacheable = False
+        # A vol.toml or Makefile created later changes the candidates too
+        stamps = {os.path.abspath(path): file_stamp(path) for path in (config_path, "Makefile")}
+        # Includes and globs of the Makefile count like the Makefile itself
+        items, used = recorded_stamps(lambda: completion_items(config_path))
+        stamps.update(used)
+        if cacheable and all(map(can_index, stamps)):
+            write_index(stamps, items, names)
+    print(items)
@@ -160,10 +160,31 @@ class UIConfig:
     panel_height: int = 10         # Максимальная высота (строк)
     wrap_lines: bool = True        # Переносить строки (False = резать)
     delay_ms: int = 100            # Задержка перед появлением панели (мс)
+    job_panel_height: int = 3      # Высота панели каждой параллельной задачи (строк)
     
     # Logging
     log_file: str = "./vol.log"
     
+    # Artifact cache for task outputs ("" = ~/.cache/vol)
+    cache_dir: str = ""
+    cache_size_mb: int = 1024
+    cache_hardlinks: bool = False   # Restore outputs as read-only hardlinks into the store (no reflink)
+    remote_cache: str = ""          # http://host:port of a shared cache ($VOL_REMOTE_CACHE)
+    remote_cache_push: bool = True  # Upload outputs to the shared cache
+    
+    # Reuse successful $(shell ...) outputs across runs for this many seconds (0 = off)
+    shell_cache_ttl: float = 0
+    
+    # Record run, task and command timings in .vol/history.db (vol history)
+    history: bool = True
+    
+    # Table of the costliest commands after the build (vol --summary), top N by wall time, CPU and memory
+    show_summary: bool = False
+    summary_top: int = 10
+    
+    # Collapsible groups around command output in CI mode: auto, github, gitlab, none
+    ci_groups: str = "auto"
+    
     # Legacy alias
     show_error_message: bool = True
     
@@ -195,7 +216,18 @@ class UIConfig:
             panel_height=data.get("panel_height", 10),
             wrap_lines=data.get("wrap_lines", True),
             delay_ms=data.get("delay_ms", 100),
+            job_panel_height=data.get("job_panel_height", 3),
             log_file=expand_env_vars(data.get("log_file", "./vol.log")),
+            cache_dir=expand_env_vars(data.get("cache_dir", "")),
+            cache_size_mb=data.get("cache_size_mb", 1024),
+            cache_hardlinks=data.get("cache_hardlinks", False),
+            remote_cache=expand_env_vars(data.get("remote_cache", "")),
+            remote_cache_push=data.get("remote_cache_push", True),
+            shell_cache_ttl=data.get("shell_cache_ttl", 0),
+            history=data.get("history", True),
+            show_summary=data.get("show_summary", False),
+            summary_top=data.get("summary_top", 10),
+            ci_groups=data.get("ci_groups", "auto"),
             show_error_message=data.get("show_error_message", True),
             color_theme=color_theme,
             theme=Theme.from_dict(theme_data, preset_name=color_theme),
@@ -221,6 +253,11 @@ def set_ui_config(config: UIConfig):
     _ui_config = config
 
 
+def load_toml(path: Path) -> dict:
+    with open(path, "rb") as f:
+        return tomllib.load(f)
+
+
 class VolConfig:
     """Parse and manage vol.toml configuration"""
     
@@ -241,8 +278,8 @@ class VolConfig:
         return self.ui.log_file
     
     def load(self):
-        with open(self.config_path, "rb") as f:
-            self.config = tomllib.load(f)
+        from .parse_cache import cached_parse
+        self.config = cached_parse("toml", str(self.config_path), lambda: (load_toml(self.config_path), ()))
         
         # Get config section (renamed from settings)
         config_section = self.config.get("config", self.config.get("settings", {}))
@@ -283,3 +320,11 @@ class VolConfig:
             resolved.add(task_name)
         
         return result
+    
+    def dependency_graph(self, task_name: str) -> dict[str, list[str]]:
+        """Return {task: [depends]} for the task and all its dependencies, in run order"""
+        graph = {}
+        for name in self.resolve_dependencies(task_name):
+            depends = self.get_task(name).get("depends", [])
+            graph[name] = [dep for dep in depends if self.get_task(dep)]
+        return graph
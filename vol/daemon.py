@@ -0,0 +1,442 @@
+"""Background daemon keeping vol warm, and the thin client that hands it requests"""
+
+import os
+import sys
+import struct
+from typing import Optional
+
+# json, socket and signal are imported where used: every vol start checks
+# for a daemon, and with none running that check must cost almost nothing
+
+# Bumped when the request/reply format changes
+PROTOCOL_VERSION = 1
+
+# Reply: a 4-byte signed int (child pid, 0 = request refused), then the exit code
+REPLY = struct.Struct("!i")
+
+# Request: 4-byte length, then JSON; the client's stdin/stdout/stderr travel as SCM_RIGHTS
+LENGTH = struct.Struct("!I")
+
+# Accept loop wakes up this often to reap finished requests
+ACCEPT_TIMEOUT_S = 1.0
+
+# Set in the daemon and its children so vol never talks to itself
+_serving = False
+
+
+def socket_path() -> str:
+    """Per-user socket: $XDG_RUNTIME_DIR/vol.sock, or /tmp/vol-<uid>/vol.sock"""
+    runtime = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime and os.path.isdir(runtime):
+        return os.path.join(runtime, "vol.sock")
+    return os.path.join("/tmp", f"vol-{os.getuid()}", "vol.sock")
+
+
+def is_private(path: str, kind: int) -> bool:
+    """path is a `kind` (stat.S_IFSOCK, ...) of ours, not a symlink, closed to group and others"""
+    import stat
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return False
+    return (stat.S_IFMT(st.st_mode) == kind and st.st_uid == os.getuid()
+            and not st.st_mode & 0o077)
+
+
+def make_socket_dir(path: str) -> bool:
+    """Create the directory of the socket private to us (fallback under /tmp), False if it is not ours"""
+    import stat
+    directory = os.path.dirname(path)
+    if directory == os.environ.get("XDG_RUNTIME_DIR"):
+        return True
+    try:
+        os.mkdir(directory, 0o700)
+    except FileExistsError:
+        pass
+    except OSError:
+        return False
+    return is_private(directory, stat.S_IFDIR)
+
+
+def peer_uid(sock: "socket.socket") -> Optional[int]:
+    """uid of the process at the other end (Linux SO_PEERCRED), None where unknown"""
+    import socket
+    if not hasattr(socket, "SO_PEERCRED"):
+        return None
+    creds = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+    return struct.unpack("3i", creds)[1]
+
+
+def protocol_id() -> str:
+    from . import __version__
+    return f"{PROTOCOL_VERSION}:{__version__}"
+
+
+def recv_exact(sock: "socket.socket", size: int) -> Optional[bytes]:
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+
+def send_request(sock: "socket.socket", message: dict, fds: list[int] = ()):
+    import json
+    import socket
+    payload = json.dumps(message).encode()
+    data = LENGTH.pack(len(payload)) + payload
+    sent = socket.send_fds(sock, [data], list(fds)) if fds else sock.send(data)
+    if sent < len(data):
+        sock.sendall(data[sent:])
+
+
+def connect() -> Optional["socket.socket"]:
+    """
+    Connect to the running daemon, or None if there is none.
+
+    The client hands the daemon its environment and stdio, so only a
+    socket of our own that nobody else can reach is used, and the peer
+    must run as us.
+    """
+    import stat
+    path = socket_path()
+    if not is_private(path, stat.S_IFSOCK):
+        return None
+    import socket
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+        uid = peer_uid(sock)
+    except OSError:
+        sock.close()
+        return None
+    if uid is not None and uid != os.getuid():
+        sock.close()
+        return None
+    return sock
+
+
+def run_client(argv: list[str]) -> Optional[int]:
+    """
+    Run a vol invocation in the daemon, if one is running.
+    Returns the exit code, or None if the request should run locally.
+    """
+    if _serving or os.environ.get("VOL_NO_DAEMON"):
+        return None
+    sock = connect()
+    if sock is None:
+        return None
+    import signal
+
+    with sock:
+        message = {
+            "version": protocol_id(),
+            "argv": argv,
+            "cwd": os.getcwd(),
+            "env": dict(os.environ),
+        }
+        try:
+            send_request(sock, message, [0, 1, 2])
+            reply = recv_exact(sock, REPLY.size)
+        except OSError:
+            return None
+        if reply is None:
+            return None
+        pid = REPLY.unpack(reply)[0]
+        if pid <= 0:
+            # Daemon from another vol version
+            return None
+
+        # The request runs in its own process group: forward terminal signals to it
+        def forward(signum, frame):
+            try:
+                os.killpg(pid, signum)
+            except OSError:
+                pass
+
+        for signum in (signal.SIGINT, signal.SIGTERM, signal.SIGHUP):
+            signal.signal(signum, forward)
+
+        while True:
+            try:
+                reply = recv_exact(sock, REPLY.size)
+                break
+            except InterruptedError:
+                continue
+        if reply is None:
+            return 1
+        return REPLY.unpack(reply)[0]
+
+
+def control(command: str) -> Optional[int]:
+    """Send a control command (status, stop), returns the daemon pid or None"""
+    sock = connect()
+    if sock is None:
+        return None
+    with sock:
+        try:
+            send_request(sock, {"version": protocol_id(), "command": command})
+            reply = recv_exact(sock, REPLY.size)
+        except OSError:
+            return None
+    return REPLY.unpack(reply)[0] if reply else None
+
+
+def preload(cwd: str, argv: list[str]):
+    """Parse the configs a request will use, so forked children get them warm"""
+    from .config import load_toml
+    from .parse_cache import cached_parse
+    from .makefile import read_makefile, clear_shell_results
+
+    config = "vol.toml"
+    for flag in ("-c", "--config"):
+        if flag in argv[:-1]:
+            config = argv[argv.index(flag) + 1]
+
+    previous = os.getcwd()
+    try:
+        os.chdir(cwd)
+        # $(shell ...) outputs are memoized per run, and each request is a new run
+        clear_shell_results()
+        if os.path.isfile(config):
+            cached_parse("toml", config, lambda: (load_toml(config), ()))
+        if os.path.isfile("Makefile"):
+            read_makefile("Makefile")
+    except Exception:
+        # The child reports parse errors itself
+        pass
+    finally:
+        os.chdir(previous)
+
+
+def run_request(conn: "socket.socket", listener: "socket.socket", message: dict, fds: list[int]):
+    """In a forked child: become the client's process and run vol"""
+    import signal
+    from .cli import main
+    from .output import reset_console
+
+    os.setpgid(0, 0)
+    for signum in (signal.SIGINT, signal.SIGTERM, signal.SIGHUP, signal.SIGPIPE):
+        signal.signal(signum, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    listener.close()
+
+    sys.stdout.flush()
+    sys.stderr.flush()
+    for target, fd in enumerate(fds[:3]):
+        os.dup2(fd, target)
+    for fd in fds:
+        if fd > 2:
+            os.close(fd)
+
+    os.chdir(message["cwd"])
+    os.environ.clear()
+    os.environ.update(message["env"])
+    sys.argv = ["vol"] + message["argv"]
+    reset_console()
+
+    conn.sendall(REPLY.pack(os.getpid()))
+
+    code = 0
+    try:
+        main()
+    except SystemExit as e:
+        code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    except KeyboardInterrupt:
+        code = 130
+    except BaseException:
+        import traceback
+        traceback.print_exc()
+        code = 1
+
+    # os._exit skips atexit: finish uploads and write out the queued log first
+    from .artifacts import flush_remote_cache
+    from .logger import flush_logs
+    flush_remote_cache()
+    flush_logs()
+    try:
+        sys.stdout.flush()
+        sys.stderr.flush()
+    except OSError:
+        pass
+    try:
+        conn.sendall(REPLY.pack(code))
+    except OSError:
+        pass
+    os._exit(code)
+
+
+def handle(conn: "socket.socket", listener: "socket.socket") -> bool:
+    """Serve one connection. Returns False when the daemon should stop."""
+    import json
+    import socket
+    try:
+        uid = peer_uid(conn)
+        if uid is not None and uid != os.getuid():
+            return True
+        header, fds, _, _ = socket.recv_fds(conn, LENGTH.size, 3)
+        if len(header) < LENGTH.size:
+            header += recv_exact(conn, LENGTH.size - len(header)) or b""
+        payload = recv_exact(conn, LENGTH.unpack(header)[0])
+        message = json.loads(payload)
+    except (OSError, ValueError, TypeError, struct.error):
+        return True
+
+    try:
+        if message.get("version") != protocol_id():
+            conn.sendall(REPLY.pack(0))
+            return True
+
+        command = message.get("command")
+        if command in ("status", "stop"):
+            conn.sendall(REPLY.pack(os.getpid()))
+            return command != "stop"
+
+        if len(fds) < 3:
+            conn.sendall(REPLY.pack(0))
+            return True
+
+        preload(message["cwd"], message["argv"])
+
+        if os.fork() == 0:
+            run_request(conn, listener, message, fds)
+    except OSError:
+        pass
+    finally:
+        for fd in fds:
+            os.close(fd)
+    return True
+
+
+def reap_children():
+    while True:
+        try:
+            pid, _ = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            return
+        if pid == 0:
+            return
+
+
+def serve():
+    """Run the daemon in the foreground until `vol daemon stop`"""
+    global _serving
+    import errno
+    import socket
+    from .output import print_status
+    from .parse_cache import enable_memory_cache
+
+    path = socket_path()
+    if control("status") is not None:
+        print_status("warn", f"Демон уже запущен: {path}")
+        return
+    if not make_socket_dir(path):
+        print_status("error", f"Каталог сокета принадлежит другому пользователю или открыт другим: {os.path.dirname(path)}")
+        sys.exit(1)
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+    # Everything a request needs, imported once
+    from . import cli, runner, makefile, script, display, scheduler, watch  # noqa: F401
+    import rich.live, rich.syntax, rich.table, rich.panel  # noqa: F401
+    import pygments.lexers.shell  # noqa: F401
+    enable_memory_cache()
+    _serving = True
+
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    old_umask = os.umask(0o077)
+    try:
+        listener.bind(path)
+    finally:
+        os.umask(old_umask)
+    listener.listen(16)
+    listener.settimeout(ACCEPT_TIMEOUT_S)
+    print_status("info", f"Демон vol запущен (pid {os.getpid()}): {path}")
+
+    try:
+        running = True
+        while running:
+            reap_children()
+            try:
+                conn, _ = listener.accept()
+            except socket.timeout:
+                continue
+            except OSError as e:
+                if e.errno == errno.EINTR:
+                    continue
+                raise
+            with conn:
+                conn.settimeout(None)
+                running = handle(conn, listener)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        listener.close()
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
+def daemonize():
+    """Detach from the terminal (double fork), stdio to /dev/null"""
+    if os.fork() > 0:
+        return False
+    os.setsid()
+    if os.fork() > 0:
+        os._exit(0)
+    devnull = os.open(os.devnull, os.O_RDWR)
+    for fd in (0, 1, 2):
+        os.dup2(devnull, fd)
+    os.close(devnull)
+    return True
+
+
+def daemon_main(argv: list[str]):
+    """vol daemon start|stop|status|run"""
+    import time
+    import argparse
+    from .output import print_status
+
+    parser = argparse.ArgumentParser(prog="vol daemon", description="Keep vol warm in the background")
+    parser.add_argument("action", choices=["start", "stop", "status", "run"],
+                        help="start in the background, stop, show status, or run in the foreground")
+    args = parser.parse_args(argv)
+
+    if args.action == "run":
+        serve()
+    elif args.action == "start":
+        pid = control("status")
+        if pid is not None:
+            print_status("info", f"Демон уже запущен (pid {pid})")
+            return
+        if daemonize():
+            try:
+                serve()
+            finally:
+                os._exit(0)
+        # Wait for the socket so the next vol call already uses the daemon
+        for _ in range(50):
+            pid = control("status")
+            if pid is not None:
+                print_status("ok", f"Демон vol запущен (pid {pid})")
+                return
+            time.sleep(0.1)
+        print_status("error", "Не удалось запустить демон vol")
+        sys.exit(1)
+    elif args.action == "stop":
+        pid = control("stop")
+        if pid is None:
+            print_status("info", "Демон не запущен")
+        else:
+            print_status("ok", f"Демон vol остановлен (pid {pid})")
+    else:
+        pid = control("status")
+        if pid is None:
+            print_status("info", "Демон не запущен")
+        else:
+            print_status("info", f"Демон запущен (pid {pid}): {socket_path()}")
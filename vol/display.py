@@ -0,0 +1,172 @@
+"""Live display components: command headers, progress bars and parallel job panels"""
+
+import threading
+from typing import Optional
+
+from rich.console import Group
+from rich.live import Live
+from rich.panel import Panel
+from rich.table import Table
+from rich.text import Text
+from rich import box
+
+from .output import console, STATUS_WIDTHS, StatusLine
+from .buffer import OutputBuffer
+
+
+def build_command_header(description: str, start_time: str, task_name: str = None) -> StatusLine:
+    """Build the [WAIT] line shown above a running command"""
+    padding = " " * STATUS_WIDTHS.get("wait", 0)
+    return StatusLine("WAIT", "bold blue", padding, start_time, task_name, description)
+
+
+def build_output_panel(buffer: OutputBuffer) -> Panel:
+    """Build the bordered panel with the last lines of command output"""
+    from .config import get_ui_config
+    ui_config = get_ui_config()
+
+    return Panel(
+        buffer.get_display(),
+        box=box.ROUNDED,
+        border_style=ui_config.theme.panel_border,
+        padding=(0, 1),
+        width=ui_config.panel_width,
+    )
+
+
+def build_progress_bars() -> Optional[Table]:
+    """Build the compact sub/main progress bars row, or None if no progress is active"""
+    from .config import get_ui_config
+    from .progress import get_progress
+
+    progress = get_progress()
+    if progress is None:
+        return None
+
+    ui_config = get_ui_config()
+    theme = ui_config.theme
+    tasks = progress.tasks
+    bar_width = 15
+
+    # Build list of (task, color) tuples: sub bar first (index 1), then main bar (index 0)
+    bars_to_show = []
+    if len(tasks) > 1:
+        if ui_config.show_sub_progress:
+            bars_to_show.append((tasks[1], theme.sub_bar))
+        if ui_config.show_main_progress:
+            bars_to_show.append((tasks[0], theme.main_bar))
+    elif tasks:
+        if ui_config.show_main_progress:
+            bars_to_show.append((tasks[0], theme.main_bar))
+
+    row = []
+    for task, color in bars_to_show:
+        completed = task.completed
+        total = task.total or 1
+        filled = int(bar_width * completed / total)
+        empty = bar_width - filled
+        row.append(f"[{color}]{'━' * filled}[/{color}][dim]{'━' * empty}[/dim]")
+        row.append(f" {int(completed)}/{int(total)}")
+
+    if not row:
+        return None
+
+    progress_table = Table.grid(padding=(0, 2))
+    progress_table.add_row(*row)
+    return progress_table
+
+
+# Live panels are redrawn at this rate however fast output arrives
+FRAMES_PER_SECOND = 15
+
+
+class JobBoard:
+    """Live view for parallel jobs: a compact output panel per running job plus progress bars.
+
+    Status lines printed with print_status() while the board is active
+    appear above it, so finished jobs scroll up like in serial mode.
+    """
+
+    def __init__(self):
+        from .config import get_ui_config
+        ui_config = get_ui_config()
+
+        content_width = ui_config.panel_width - 6 if ui_config.panel_width > 6 else ui_config.panel_width
+        self._buffer_args = dict(
+            max_lines=ui_config.job_panel_height,
+            max_width=content_width,
+            wrap_lines=ui_config.wrap_lines,
+        )
+        self._lock = threading.Lock()
+        self._jobs: dict[int, tuple[StatusLine, OutputBuffer]] = {}
+        self._next_id = 0
+        self._live: Optional[Live] = None
+
+    def __enter__(self) -> "JobBoard":
+        global _board
+        from .ci import is_ci_mode
+        # CI mode streams every job's output instead (run_command_streamed)
+        if is_ci_mode():
+            return self
+        self._live = Live(
+            get_renderable=self._render,
+            console=console,
+            refresh_per_second=FRAMES_PER_SECOND,
+            transient=True,
+        )
+        self._live.start()
+        _board = self
+        return self
+
+    def __exit__(self, *exc):
+        global _board
+        if self._live is None:
+            return
+        _board = None
+        self._live.stop()
+
+    def add_job(self, description: str, start_time: str, task_name: str = None) -> int:
+        """Register a running command, returns its job id"""
+        header = build_command_header(description, start_time, task_name)
+        with self._lock:
+            job_id = self._next_id
+            self._next_id += 1
+            self._jobs[job_id] = (header, OutputBuffer(**self._buffer_args))
+        return job_id
+
+    def add_line(self, job_id: int, line: str):
+        """Append a line of output to a job's panel"""
+        with self._lock:
+            self._jobs[job_id][1].add_line(line)
+
+    def remove_job(self, job_id: int):
+        """Remove a finished command from the board"""
+        with self._lock:
+            self._jobs.pop(job_id, None)
+        # Refresh now so the status line printed next doesn't show a stale panel
+        self._live.refresh()
+
+    def _render(self) -> Group:
+        components = []
+        with self._lock:
+            for header, buffer in self._jobs.values():
+                components.append(header)
+                if buffer.line_count() > 0:
+                    components.append(build_output_panel(buffer))
+
+        progress_table = build_progress_bars()
+        if progress_table is not None:
+            components.append(progress_table)
+
+        # Clear to end of screen
+        components.append(Text("\033[J"))
+        return Group(*components)
+
+
+# Active job board (set while parallel jobs are running)
+_board: Optional[JobBoard] = None
+
+
+def get_job_board() -> Optional[JobBoard]:
+    """Get the active job board, if any"""
+    return _board
@@ -0,0 +1,170 @@
+"""asyncio engine driving all child processes from one event loop"""
+
+import io
+import os
+import sys
+import codecs
+import signal
+import asyncio
+import threading
+from dataclasses import dataclass
+from concurrent.futures import Future
+from typing import Callable, Optional
+
+# Bytes read from a child's pipe per read() call
+READ_CHUNK = 64 * 1024
+
+# Characters of a line without a newline held back; a longer one is passed on in pieces
+MAX_LINE = 1024 * 1024
+
+# Signals Python ignores that a child should get with their default action (as subprocess does)
+DEFAULT_SIGNALS = tuple(getattr(signal, name) for name in ("SIGPIPE", "SIGXFSZ") if hasattr(signal, name))
+
+
+@dataclass
+class Usage:
+    """Resources used by a finished command: the os.wait4 rusage of its shell and every process it waited for"""
+    user_cpu: float          # CPU seconds in user mode
+    system_cpu: float        # CPU seconds in the kernel
+    max_rss: int             # Peak resident set of the largest single process, bytes
+    in_blocks: int           # Block reads and writes (file system I/O that missed the page cache)
+    out_blocks: int
+    voluntary_switches: int  # Waits for I/O or locks
+    involuntary_switches: int  # Preemptions (CPU contention)
+
+    @classmethod
+    def from_rusage(cls, rusage) -> "Usage":
+        # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+        max_rss = rusage.ru_maxrss if sys.platform == "darwin" else rusage.ru_maxrss * 1024
+        return cls(rusage.ru_utime, rusage.ru_stime, max_rss, rusage.ru_inblock, rusage.ru_oublock,
+                   rusage.ru_nvcsw, rusage.ru_nivcsw)
+
+    @property
+    def cpu(self) -> float:
+        return self.user_cpu + self.system_cpu
+
+
+class CommandEngine:
+    """Runs shell commands on an event loop in a background thread.
+
+    Front ends (vol.toml tasks, Makefile targets, scripts) submit commands
+    from any thread and get a concurrent Future with the exit code and
+    resource usage, so any number of children share one loop instead of
+    one thread each. Output is decoded incrementally and passed line by
+    line (newline included, \\r and \\r\\n translated to \\n) to the on_line
+    callback, which runs on the loop thread and must not block.
+
+    Children are spawned and reaped here rather than by asyncio's child
+    watcher: os.wait4 is the only way to get one child's rusage.
+    """
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="vol-engine", daemon=True)
+                thread.start()
+                self._loop = loop
+            return self._loop
+
+    def submit(self, cmd: str, on_line: Callable[[str], None] = None) -> Future:
+        """Start a shell command, returns a Future resolving to (exit code, Usage)"""
+        return asyncio.run_coroutine_threadsafe(self._run(cmd, on_line), self._ensure_loop())
+
+    async def _run(self, cmd: str, on_line: Callable[[str], None]) -> tuple[int, Usage]:
+        loop = asyncio.get_running_loop()
+        read_fd, write_fd = os.pipe()
+        try:
+            # /bin/sh -c, stdout and stderr into the pipe, like create_subprocess_shell
+            pid = os.posix_spawn("/bin/sh", ["/bin/sh", "-c", cmd], os.environ,
+                                 file_actions=[(os.POSIX_SPAWN_DUP2, write_fd, 1), (os.POSIX_SPAWN_DUP2, write_fd, 2)],
+                                 setsigdef=DEFAULT_SIGNALS)
+        except BaseException:
+            os.close(read_fd)
+            raise
+        finally:
+            os.close(write_fd)
+        exited = loop.create_future()
+        threading.Thread(target=self._wait, args=(pid, loop, exited), name="vol-wait", daemon=True).start()
+
+        reader = asyncio.StreamReader(limit=READ_CHUNK, loop=loop)
+        transport, _ = await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader, loop=loop),
+                                                    os.fdopen(read_fd, "rb", buffering=0))
+        decoder = io.IncrementalNewlineDecoder(codecs.getincrementaldecoder("utf-8")(errors="replace"), translate=True)
+        # Pieces of the unfinished last line: a multi-megabyte line is joined
+        # once, not re-scanned on every chunk
+        partial = []
+        partial_size = 0
+
+        try:
+            while True:
+                chunk = await reader.read(READ_CHUNK)
+                final = not chunk
+                text = decoder.decode(chunk, final=final)
+                end = text.rfind("\n")
+                if end == -1:
+                    if text:
+                        partial.append(text)
+                        partial_size += len(text)
+                        if partial_size >= MAX_LINE:
+                            # Output that never ends its line: pass it on instead of holding all of it
+                            piece = "".join(partial)
+                            partial.clear()
+                            partial_size = 0
+                            if on_line is not None:
+                                on_line(piece + "\n")
+                else:
+                    lines = text[:end].split("\n")
+                    if partial:
+                        lines[0] = "".join(partial) + lines[0]
+                        partial.clear()
+                        partial_size = 0
+                    if end + 1 < len(text):
+                        partial.append(text[end + 1:])
+                        partial_size = len(partial[0])
+                    if on_line is not None:
+                        for line in lines:
+                            on_line(line + "\n")
+                if final:
+                    break
+        finally:
+            transport.close()
+
+        if partial and on_line is not None:
+            on_line("".join(partial))
+        return await exited
+
+    @staticmethod
+    def _wait(pid: int, loop: asyncio.AbstractEventLoop, exited: asyncio.Future):
+        # One blocking wait4 per child, like asyncio's ThreadedChildWatcher
+        try:
+            _, status, rusage = os.wait4(pid, 0)
+            result = (os.waitstatus_to_exitcode(status), Usage.from_rusage(rusage))
+        except Exception as e:
+            # Reaped by someone else (ChildProcessError), ...: the command must not hang
+            loop.call_soon_threadsafe(exited.set_exception, e)
+            return
+        loop.call_soon_threadsafe(exited.set_result, result)
+
+
+# Global engine instance
+_engine: Optional[CommandEngine] = None
+
+
+def get_engine() -> CommandEngine:
+    """Get or create the global command engine"""
+    global _engine
+    if _engine is None:
+        _engine = CommandEngine()
+    return _engine
+
+
+def run_command_capture(cmd: str) -> tuple[int, str]:
+    """Run a command to completion on the engine, returns (exit code, output)"""
+    output = []
+    return_code, _ = get_engine().submit(cmd, output.append).result()
+    return return_code, "".join(output)
@@ -0,0 +1,194 @@
+"""Content fingerprints for skipping unchanged vol.toml tasks"""
+
+import os
+import glob
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from pathlib import Path
+from typing import Optional
+
+# Project-local state directory
+STATE_DIR = Path(".vol")
+
+# Files at least this big are hashed in parallel
+LARGE_FILE_SIZE = 1024 * 1024
+
+# Files modified less than this many seconds before hashing are not trusted
+# in the stat cache: a second write within the same mtime tick would go unseen
+RACY_WINDOW_S = 2.0
+
+
+def expand_globs(patterns: list[str]) -> list[str]:
+    """Expand glob patterns (with ** support) to a sorted list of files.
+    Directories are expanded to all files below them."""
+    files = set()
+    for pattern in patterns:
+        for match in glob.glob(os.path.expandvars(pattern), recursive=True):
+            if os.path.isdir(match):
+                for root, _, names in os.walk(match):
+                    files.update(os.path.join(root, name) for name in names)
+            else:
+                files.add(match)
+    return sorted(files)
+
+
+def outputs_exist(patterns: list[str]) -> bool:
+    """Check that every declared output exists (glob outputs need at least one match)"""
+    return all(glob.glob(os.path.expandvars(p), recursive=True) for p in patterns)
+
+
+def hash_file(path: str) -> str:
+    """SHA-256 of file contents"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(1024 * 1024):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get_task_fields(task: dict, name: str) -> list[str]:
+    """Read a list field from a task dict (a single string is allowed too)"""
+    value = task.get(name, [])
+    if isinstance(value, str):
+        return [value]
+    return [str(v) for v in value]
+
+
+def is_cacheable(task: dict) -> bool:
+    """Only tasks that declare inputs or outputs are fingerprinted"""
+    return "inputs" in task or "outputs" in task
+
+
+class FingerprintStore:
+    """Fingerprints of the last successful run of each task, stored in .vol/fingerprints.json.
+
+    Also keeps a stat cache {path: [size, mtime_ns, inode, sha256]} so that
+    unchanged files are not re-read on every run.
+    """
+
+    def __init__(self, path: Path = None):
+        self.path = path or STATE_DIR / "fingerprints.json"
+        self.tasks: dict[str, str] = {}
+        self.files: dict[str, list] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.load()
+
+    def load(self):
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            self.tasks = data.get("tasks", {})
+            self.files = data.get("files", {})
+        except (OSError, ValueError):
+            self.tasks = {}
+            self.files = {}
+
+    def save(self):
+        """
+        Write the store atomically (no-op if nothing changed). Parallel jobs
+        save from several threads: the snapshot is taken and written under
+        the lock, so an older snapshot never replaces a newer one.
+        """
+        with self._lock:
+            if not self._dirty:
+                return
+            data = json.dumps({"tasks": self.tasks, "files": self.files})
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                fd, tmp_path = tempfile.mkstemp(prefix=f"{self.path.name}.", suffix=".tmp", dir=self.path.parent)
+                try:
+                    with os.fdopen(fd, "w", encoding="utf-8") as f:
+                        f.write(data)
+                    os.replace(tmp_path, self.path)
+                except OSError:
+                    os.unlink(tmp_path)
+                    raise
+                self._dirty = False
+            except OSError:
+                pass
+
+    def hash_files(self, paths: list[str]) -> dict[str, str]:
+        """Hash files, reusing cached digests for files whose stat is unchanged"""
+        from concurrent.futures import ThreadPoolExecutor
+        from .scheduler import default_jobs
+
+        digests = {}
+        to_hash = []
+        now = time.time()
+
+        for path in paths:
+            try:
+                st = os.stat(path)
+            except OSError:
+                digests[path] = "missing"
+                continue
+            key = [st.st_size, st.st_mtime_ns, st.st_ino]
+            cached = self.files.get(path)
+            if cached and cached[:3] == key:
+                digests[path] = cached[3]
+            else:
+                trusted = now - st.st_mtime_ns / 1e9 > RACY_WINDOW_S
+                to_hash.append((path, key, trusted))
+
+        def compute(item):
+            path, key, trusted = item
+            try:
+                return path, key, trusted, hash_file(path)
+            except OSError:
+                return path, key, False, "missing"
+
+        small = [item for item in to_hash if item[1][0] < LARGE_FILE_SIZE]
+        large = [item for item in to_hash if item[1][0] >= LARGE_FILE_SIZE]
+        results = [compute(item) for item in small]
+        if len(large) > 1:
+            # hashlib releases the GIL on big buffers, so threads give real parallelism
+            with ThreadPoolExecutor(max_workers=min(len(large), default_jobs())) as pool:
+                results.extend(pool.map(compute, large))
+        else:
+            results.extend(compute(item) for item in large)
+
+        with self._lock:
+            for path, key, trusted, digest in results:
+                digests[path] = digest
+                if trusted:
+                    self.files[path] = key + [digest]
+                    self._dirty = True
+
+        return digests
+
+    def task_fingerprint(self, task: dict, commands: list[str]) -> str:
+        """Fingerprint of a task: expanded commands, declared env vars, outputs and input contents"""
+        inputs = expand_globs(get_task_fields(task, "inputs"))
+        env_names = get_task_fields(task, "env")
+        data = {
+            "commands": commands,
+            "env": {name: os.environ.get(name) for name in env_names},
+            "outputs": get_task_fields(task, "outputs"),
+            "inputs": sorted(self.hash_files(inputs).items()),
+        }
+        return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+    def is_fresh(self, task_name: str, task: dict, fingerprint: str) -> bool:
+        """True if the task last succeeded with this fingerprint and its outputs still exist"""
+        return self.tasks.get(task_name) == fingerprint and outputs_exist(get_task_fields(task, "outputs"))
+
+    def record(self, task_name: str, fingerprint: str):
+        """Remember the fingerprint of a successful run"""
+        with self._lock:
+            self.tasks[task_name] = fingerprint
+            self._dirty = True
+
+
+# Global store instance
+_store: Optional[FingerprintStore] = None
+
+
+def get_fingerprint_store() -> FingerprintStore:
+    """Get or create the global fingerprint store"""
+    global _store
+    if _store is None:
+        _store = FingerprintStore()
+    return _store
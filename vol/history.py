@@ -0,0 +1,295 @@
+"""Run history: timings and outcomes of tasks and commands in .vol/history.db"""
+
+import os
+import sys
+import time
+import threading
+from dataclasses import astuple
+from pathlib import Path
+from typing import Optional
+
+# Same directory as fingerprint.STATE_DIR
+HISTORY_PATH = Path(".vol") / "history.db"
+
+# Older runs are deleted as new ones start
+KEEP_RUNS = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    started REAL NOT NULL,
+    finished REAL NOT NULL,
+    argv TEXT NOT NULL,
+    cwd TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    run_id INTEGER NOT NULL,
+    task TEXT NOT NULL,
+    started REAL NOT NULL,
+    duration REAL NOT NULL,
+    outcome TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS commands (
+    run_id INTEGER NOT NULL,
+    task TEXT,
+    description TEXT NOT NULL,
+    command TEXT NOT NULL,
+    started REAL NOT NULL,
+    duration REAL NOT NULL,
+    exit_code INTEGER NOT NULL,
+    output_chars INTEGER NOT NULL,
+    user_cpu REAL,
+    system_cpu REAL,
+    max_rss INTEGER,
+    in_blocks INTEGER,
+    out_blocks INTEGER,
+    voluntary_switches INTEGER,
+    involuntary_switches INTEGER,
+    max_rss_bound INTEGER
+);
+CREATE INDEX IF NOT EXISTS tasks_run ON tasks (run_id);
+CREATE INDEX IF NOT EXISTS commands_run ON commands (run_id);
+"""
+
+# rusage columns of `commands`, in engine.Usage field order, then max_rss_bound:
+# 1 when max_rss was no more than vol's own peak RSS, only an upper bound (summary.own_max_rss)
+USAGE_COLUMNS = ("user_cpu", "system_cpu", "max_rss", "in_blocks", "out_blocks",
+                 "voluntary_switches", "involuntary_switches", "max_rss_bound")
+
+COMMAND_COLUMNS = ("run_id", "task", "description", "command", "started", "duration", "exit_code", "output_chars",
+                   *USAGE_COLUMNS)
+INSERT_COMMAND = f"INSERT INTO commands ({', '.join(COMMAND_COLUMNS)}) VALUES ({', '.join('?' * len(COMMAND_COLUMNS))})"
+
+
+class History:
+    """
+    SQLite store with one row per vol run, task and command.
+
+    Opened on the first record, so runs that execute nothing leave no
+    trace. Writes come from parallel jobs too and are serialized by a lock;
+    any database error turns history off for the rest of the run rather
+    than failing the build.
+    """
+
+    def __init__(self, path: Path = None):
+        self.path = path or HISTORY_PATH
+        self._db = None
+        self._run_id: Optional[int] = None
+        self._lock = threading.Lock()
+        self._broken = False
+
+    def connect(self):
+        """Open the database (WAL: readers such as `vol history` don't block a build)"""
+        import sqlite3
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        db = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.executescript(SCHEMA)
+        return db
+
+    def record_task(self, task: str, started: float, duration: float, outcome: str):
+        self._insert("INSERT INTO tasks VALUES (?, ?, ?, ?, ?)", (task, started, duration, outcome), started)
+
+    def record_command(self, task: Optional[str], description: str, command: str,
+                       started: float, duration: float, exit_code: int, output_chars: int, usage=None):
+        values = (task, description, command, started, duration, exit_code, output_chars)
+        if usage is not None:
+            from .summary import own_max_rss
+            values += astuple(usage) + (int(usage.max_rss <= own_max_rss()),)
+        else:
+            values += (None,) * len(USAGE_COLUMNS)
+        self._insert(INSERT_COMMAND, values, started)
+
+    def _insert(self, sql: str, values: tuple, started: float):
+        import sqlite3
+        with self._lock:
+            if self._broken:
+                return
+            try:
+                if self._db is None:
+                    self._db = self.connect()
+                with self._db:
+                    if self._run_id is None:
+                        self._run_id = self._start_run(started)
+                    self._db.execute(sql, (self._run_id,) + values)
+                    # A run spans its first task or command to the last one
+                    self._db.execute("UPDATE runs SET started = MIN(started, ?), finished = ? WHERE id = ?",
+                                     (started, time.time(), self._run_id))
+            except (sqlite3.Error, OSError):
+                self._broken = True
+
+    def _start_run(self, started: float) -> int:
+        cursor = self._db.execute("INSERT INTO runs (started, finished, argv, cwd) VALUES (?, ?, ?, ?)",
+                                  (started, time.time(), " ".join(sys.argv[1:]), os.getcwd()))
+        run_id = cursor.lastrowid
+        oldest = run_id - KEEP_RUNS
+        if oldest > 0 and run_id % 100 == 0:
+            for table in ("commands", "tasks"):
+                self._db.execute(f"DELETE FROM {table} WHERE run_id <= ?", (oldest,))
+            self._db.execute("DELETE FROM runs WHERE id <= ?", (oldest,))
+        return run_id
+
+
+# Global history instance
+_history: Optional[History] = None
+
+# Task the current thread is running, for commands started without a task name
+_current = threading.local()
+
+
+def get_history() -> Optional[History]:
+    """History of this run, or None when disabled (history = false)"""
+    global _history
+    from .config import get_ui_config
+    if not get_ui_config().history:
+        return None
+    if _history is None:
+        _history = History()
+    return _history
+
+
+def current_task() -> Optional[str]:
+    return getattr(_current, "task", None)
+
+
+class task_scope:
+    """Time a task or Makefile target; commands run inside it are attributed to it"""
+
+    def __init__(self, task: str):
+        self.task = task
+        # "ok", "failed", "fresh" (up to date), "restored" (from the artifact cache)
+        self.outcome: Optional[str] = None
+
+    def __enter__(self) -> "task_scope":
+        self._previous = current_task()
+        _current.task = self.task
+        self.started = time.time()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        _current.task = self._previous
+        history = get_history()
+        if history is not None:
+            history.record_task(self.task, self.started, time.perf_counter() - self._start, self.outcome or "failed")
+        return False
+
+
+def record_command(task: Optional[str], description: str, command: str,
+                   started: float, duration: float, exit_code: int, output_chars: int, usage=None):
+    """Record a finished command (no-op when history is disabled); usage is its engine.Usage"""
+    history = get_history()
+    if history is not None:
+        history.record_command(task or current_task(), description, command,
+                               started, duration, exit_code, output_chars, usage)
+
+
+# `vol history` reports
+
+def open_for_reading(path: Path = None):
+    import sqlite3
+    path = path or HISTORY_PATH
+    if not path.exists():
+        return None
+    return sqlite3.connect(path, timeout=5)
+
+
+RECENT_RUNS = """
+SELECT r.id, r.started, r.finished - r.started, r.argv,
+       (SELECT COUNT(*) FROM commands c WHERE c.run_id = r.id),
+       (SELECT COUNT(*) FROM commands c WHERE c.run_id = r.id AND c.exit_code != 0)
+FROM runs r ORDER BY r.id DESC LIMIT ?
+"""
+
+# Over the last N runs (`runs` parameter), grouped by command
+LAST_RUNS = "run_id IN (SELECT id FROM runs ORDER BY id DESC LIMIT :runs)"
+
+SLOWEST = f"""
+SELECT description, command, COUNT(*), AVG(duration), MAX(duration), SUM(exit_code != 0),
+       AVG(user_cpu + system_cpu), MAX(max_rss), MAX(CASE WHEN max_rss_bound THEN NULL ELSE max_rss END)
+FROM commands WHERE {LAST_RUNS}
+GROUP BY command ORDER BY AVG(duration) DESC LIMIT :limit
+"""
+
+FLAKY = f"""
+SELECT description, command, COUNT(*), AVG(duration), MAX(duration), SUM(exit_code != 0),
+       AVG(user_cpu + system_cpu), MAX(max_rss), MAX(CASE WHEN max_rss_bound THEN NULL ELSE max_rss END)
+FROM commands WHERE {LAST_RUNS}
+GROUP BY command HAVING SUM(exit_code != 0) > 0 AND SUM(exit_code = 0) > 0
+ORDER BY SUM(exit_code != 0) * 1.0 / COUNT(*) DESC, COUNT(*) DESC LIMIT :limit
+"""
+
+
+def format_duration(seconds: float) -> str:
+    if seconds < 60:
+        return f"{seconds:.2f}s"
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"{minutes}m{seconds:02d}s"
+
+
+def history_main(argv: list[str]):
+    """vol history: recent runs, slowest and flaky commands"""
+    import argparse
+    import sqlite3
+    from datetime import datetime
+    from rich.table import Table
+    from rich import box
+    from .output import console, print_status
+    from .summary import format_rss
+
+    parser = argparse.ArgumentParser(prog="vol history", description="Query timings and outcomes of past vol runs")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--slowest", action="store_true", help="Slowest commands, by average wall time")
+    mode.add_argument("--flaky", action="store_true", help="Commands that both passed and failed")
+    parser.add_argument("-r", "--runs", type=int, default=50, help="Look at the last N runs (default: 50)")
+    parser.add_argument("-n", "--limit", type=int, default=20, help="Rows to show (default: 20)")
+    args = parser.parse_args(argv)
+
+    db = open_for_reading()
+    if db is None:
+        print_status("info", f"История пуста: {HISTORY_PATH}")
+        return
+
+    try:
+        if args.slowest or args.flaky:
+            rows = db.execute(SLOWEST if args.slowest else FLAKY, {"runs": args.runs, "limit": args.limit}).fetchall()
+            title = "Самые медленные команды" if args.slowest else "Нестабильные команды"
+            table = Table(title=f"{title} (последние {args.runs} запусков)", box=box.ROUNDED)
+            table.add_column("Описание", style="cyan bold")
+            table.add_column("Команда", style="white", overflow="fold")
+            table.add_column("Запусков", justify="right")
+            table.add_column("Среднее", justify="right")
+            table.add_column("Макс.", justify="right")
+            table.add_column("CPU", justify="right")
+            table.add_column("Память", justify="right")
+            table.add_column("Ошибок", justify="right", style="red")
+            for desc, cmd, count, avg, longest, failures, cpu, rss, exact_rss in rows:
+                # Commands recorded before resource accounting have no usage; the
+                # peak is only a bound unless a run with an exact peak reached it
+                bound = rss is not None and (exact_rss is None or exact_rss < rss)
+                table.add_row(desc, cmd, str(count), format_duration(avg), format_duration(longest),
+                              format_duration(cpu) if cpu is not None else "-",
+                              format_rss(rss, bound) if rss is not None else "-", str(failures))
+        else:
+            rows = db.execute(RECENT_RUNS, (args.limit,)).fetchall()
+            table = Table(title="Последние запуски", box=box.ROUNDED)
+            table.add_column("#", style="dim", justify="right")
+            table.add_column("Начало", style="dim")
+            table.add_column("Аргументы", style="cyan bold")
+            table.add_column("Время", justify="right")
+            table.add_column("Команд", justify="right")
+            table.add_column("Ошибок", justify="right", style="red")
+            for run_id, started, wall, argv_text, commands, failures in rows:
+                when = datetime.fromtimestamp(started).strftime("%Y-%m-%d %H:%M:%S")
+                table.add_row(str(run_id), when, argv_text or "-", format_duration(wall), str(commands), str(failures))
+    except sqlite3.Error as e:
+        print_status("error", f"Не удалось прочитать {HISTORY_PATH}: {e}")
+        return
+    finally:
+        db.close()
+
+    if not rows:
+        print_status("info", "Нет данных за выбранные запуски")
+        return
+    console.print(table)
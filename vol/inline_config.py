@@ -75,21 +75,35 @@ def apply_inline_config(content: str, comment_prefix: str = "#") -> bool:
     return True
 
 
-def load_config_from_script(filename: str) -> bool:
-    """Load inline config from a shell script"""
-    try:
+def read_inline_config(filename: str, comment_prefix: str = "#") -> Optional[dict]:
+    """Inline config of a file, served from the parse cache while the file is unchanged"""
+    from .parse_cache import cached_parse
+
+    def parse():
         with open(filename, "r", encoding="utf-8") as f:
             content = f.read()
-        return apply_inline_config(content, "#")
+        return parse_inline_config(content, comment_prefix), ()
+
+    return cached_parse("inline", filename, parse)
+
+
+def load_inline_config(filename: str, comment_prefix: str = "#") -> bool:
+    """Apply the inline config of a file. Returns True if one was found."""
+    try:
+        config_dict = read_inline_config(filename, comment_prefix)
     except:
         return False
+    if config_dict is None:
+        return False
+    set_ui_config(UIConfig.from_dict(config_dict))
+    return True
+
+
+def load_config_from_script(filename: str) -> bool:
+    """Load inline config from a shell script"""
+    return load_inline_config(filename, "#")
 
 
 def load_config_from_makefile(filename: str = "Makefile") -> bool:
     """Load inline config from a Makefile"""
-    try:
-        with open(filename, "r", encoding="utf-8") as f:
-            content = f.read()
-        return apply_inline_config(content, "#")
-    except:
-        return False
+    return load_inline_config(filename, "#")
@@ -1,24 +1,320 @@
 """Logging utilities"""
 
-from datetime import datetime
+import os
+import time
+import queue
+import atexit
+import signal
+import tempfile
+import threading
+from collections import deque
 from pathlib import Path
+from typing import IO, Optional
+
+# Records waiting for the flusher; producers faster than the disk wait once it is full
+QUEUE_SIZE = 4096
+
+# Most bytes gathered into one write
+MAX_WRITE = 1024 * 1024
+
+# Characters of each command's output kept in memory for the failure summary
+TAIL_CHARS = 64 * 1024
+
+# Lines of output gathered before they are spilled (and timestamped) together
+SPILL_BATCH = 256
+
+# Spilled command output is copied into the log in writes of about this size;
+# longer lines are logged in pieces of this size
+COPY_CHUNK = 256 * 1024
+
+# Seconds a SIGTERM waits for queued records before the process dies anyway
+TERM_FLUSH_S = 2.0
+
+
+class LogWriter:
+    """
+    Appends to one log file from a background thread.
+
+    The file stays open with O_APPEND, and whatever is queued when the
+    flusher wakes up goes out in one write() of whole records, so vol runs
+    sharing a log never interleave partial lines. Queued text is written
+    before the process exits (flush_logs).
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._fd: Optional[int] = None
+        self._queue: queue.Queue = queue.Queue(QUEUE_SIZE)
+        # Held while queueing items that must stay together (one command's status and output)
+        self.lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="vol-log", daemon=True)
+        self._thread.start()
+
+    def write(self, text: str):
+        """Queue whole records (each ending with a newline)"""
+        self._queue.put(text)
+
+    def write_file(self, file: IO[str]):
+        """Queue a file of whole records, copied into the log by the flusher and closed"""
+        self._queue.put(file)
+
+    def flush(self):
+        """Wait until everything queued so far is on disk"""
+        self._queue.join()
+
+    def drain(self, deadline: float) -> bool:
+        """
+        Wait for the queue to be written out, until `deadline` (time.monotonic()).
+        Takes no lock: a signal handler may have interrupted this thread in put().
+        """
+        while self._queue.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            size = len(batch[0]) if isinstance(batch[0], str) else MAX_WRITE
+            while size < MAX_WRITE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+                size += len(batch[-1]) if isinstance(batch[-1], str) else MAX_WRITE
+            try:
+                self._write_batch(batch)
+            except Exception:
+                # A record that can't be written is lost, the flusher carries on (flush() must return)
+                pass
+            finally:
+                for item in batch:
+                    if not isinstance(item, str):
+                        try:
+                            item.close()
+                        except OSError:
+                            pass
+                    self._queue.task_done()
+
+    def _write_batch(self, batch: list):
+        texts = []
+        for item in batch:
+            if isinstance(item, str):
+                texts.append(item)
+                continue
+            if texts:
+                self._write("".join(texts).encode("utf-8", "replace"))
+                texts = []
+            item.seek(0)
+            while True:
+                # Whole records only: a chunk ends at a newline
+                chunk = item.read(COPY_CHUNK)
+                if not chunk:
+                    break
+                if not chunk.endswith("\n"):
+                    chunk += item.readline()
+                self._write(chunk.encode("utf-8", "replace"))
+        if texts:
+            self._write("".join(texts).encode("utf-8", "replace"))
+
+    def _write(self, data: bytes):
+        if self._fd is None:
+            self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        view = memoryview(data)
+        while view:
+            view = view[os.write(self._fd, view):]
+
+
+# One writer per log file in this process
+_writers: dict[Path, LogWriter] = {}
+_writers_lock = threading.Lock()
+
+
+def get_log_writer(path: Path) -> LogWriter:
+    """Get or create the writer for a log file"""
+    key = path.absolute()
+    with _writers_lock:
+        writer = _writers.get(key)
+        if writer is None:
+            writer = _writers[key] = LogWriter(path)
+            _flush_on_sigterm()
+        return writer
+
+
+def flush_logs():
+    """Write out everything queued (at exit; the daemon's children leave via os._exit)"""
+    for writer in list(_writers.values()):
+        writer.flush()
+
+
+def _terminated(signum, frame):
+    # Killed: give the flushers a moment to write out what is queued (never
+    # block on the queue here), then die of the signal as before
+    deadline = time.monotonic() + TERM_FLUSH_S
+    for writer in list(_writers.values()):
+        writer.drain(deadline)
+    signal.signal(signum, signal.SIG_DFL)
+    os.kill(os.getpid(), signum)
+
+
+def _flush_on_sigterm():
+    """Flush logs on SIGTERM too (atexit does not run); handlers set by others are kept"""
+    if threading.current_thread() is not threading.main_thread():
+        return
+    if signal.getsignal(signal.SIGTERM) == signal.SIG_DFL:
+        signal.signal(signal.SIGTERM, _terminated)
+
+
+def _forget_writers():
+    # Flusher threads don't survive fork: a child starts its own writers
+    global _writers_lock
+    _writers.clear()
+    _writers_lock = threading.Lock()
+
+
+atexit.register(flush_logs)
+os.register_at_fork(after_in_child=_forget_writers)
+
+
+class Timestamps:
+    """"[%Y-%m-%d %H:%M:%S] " prefixes, formatted once per second"""
+
+    def __init__(self):
+        # (second, prefix), replaced as a whole so threads never see a torn pair
+        self._cached = (None, "")
+
+    def prefix(self) -> str:
+        second = int(time.time())
+        cached = self._cached
+        if cached[0] != second:
+            cached = self._cached = (second, time.strftime("[%Y-%m-%d %H:%M:%S] ", time.localtime(second)))
+        return cached[1]
 
 
 class Logger:
     """Log all output to file"""
-    
+
     def __init__(self, log_file: str = "./vol.log"):
         self.log_file = Path(log_file)
         self.log_file.parent.mkdir(parents=True, exist_ok=True)
-    
+        self.writer = get_log_writer(self.log_file)
+        self.timestamps = Timestamps()
+
     def log(self, message: str):
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        with open(self.log_file, "a", encoding="utf-8") as f:
-            f.write(f"[{timestamp}] {message}\n")
-    
+        self.writer.write(f"{self.timestamps.prefix()}{message}\n")
+
     def log_command_output(self, task: str, cmd: str, output: str, success: bool):
-        self.log(f"{'SUCCESS' if success else 'FAILED'}: {task}")
-        self.log(f"  Command: {cmd}")
-        if output.strip():
-            for line in output.strip().split("\n"):
-                self.log(f"  | {line}")
+        sink = self.output_sink()
+        for line in output.split("\n"):
+            sink.add(line)
+        sink.finish(task, cmd, success)
+
+    def output_sink(self) -> "CommandOutput":
+        """Collect one command's output line by line, logged by finish()"""
+        return CommandOutput(self)
+
+
+class CommandOutput:
+    """
+    Output of one running command on its way to the log.
+
+    Lines are spilled to an anonymous temporary file as log records, and
+    only the last TAIL_CHARS stay in memory, so a command printing
+    gigabytes costs disk, not RAM. finish() logs the status line and
+    copies the records after it. Surrounding whitespace of the whole
+    output is dropped, as in the log format written from a joined string.
+    """
+
+    def __init__(self, logger: Logger):
+        self.logger = logger
+        self.tail: deque[str] = deque()
+        self._tail_chars = 0
+        self._spill: Optional[IO[str]] = None
+        # Characters of output so far
+        self.size = 0
+        # Lines added since the last batch was spilled
+        self._lines: list[str] = []
+        # Not yet recorded: the last non-blank line and the blank lines after it
+        self._last: Optional[str] = None
+        self._blanks: list[str] = []
+
+    def add(self, line: str):
+        """Add one line of output (a trailing newline is removed)"""
+        if len(line) > COPY_CHUNK:
+            # Logged in pieces, so no record held back in memory is longer than COPY_CHUNK
+            stop = len(line) - 1 if line.endswith("\n") else len(line)
+            starts = range(0, stop, COPY_CHUNK)
+            self._lines.extend(line[start:start + COPY_CHUNK] for start in starts[:-1])
+            self._lines.append(line[starts[-1]:])
+            self._spill_lines()
+            return
+        self._lines.append(line)
+        if len(self._lines) >= SPILL_BATCH:
+            self._spill_lines()
+
+    def tail_text(self) -> str:
+        """The last TAIL_CHARS of output"""
+        if self._lines:
+            self._spill_lines()
+        return "\n".join(self.tail).strip()
+
+    def finish(self, task: str, cmd: str, success: bool):
+        """Log the status and command, then the output"""
+        if self._lines:
+            self._spill_lines()
+        if self._last is not None:
+            self._write_records([f"{self.logger.timestamps.prefix()}  | {self._last.rstrip()}\n"])
+            self._last = None
+            self._blanks = []
+
+        logger = self.logger
+        prefix = logger.timestamps.prefix()
+        header = f"{prefix}{'SUCCESS' if success else 'FAILED'}: {task}\n{prefix}  Command: {cmd}\n"
+        with logger.writer.lock:
+            logger.writer.write(header)
+            if self._spill is not None:
+                logger.writer.write_file(self._spill)
+        self._spill = None
+
+    def _spill_lines(self):
+        self.size += sum(map(len, self._lines))
+        lines = [line[:-1] if line.endswith("\n") else line for line in self._lines]
+        self._lines = []
+        self._keep_tail(lines)
+
+        # The last non-blank line waits for the next one: trailing whitespace is dropped at the end
+        prefix = f"{self.logger.timestamps.prefix()}  | "
+        records = []
+        last, blanks = self._last, self._blanks
+        for line in lines:
+            if not line.strip():
+                if last is not None:
+                    blanks.append(line)
+                continue
+            if last is None:
+                line = line.lstrip()
+            else:
+                records.append(f"{prefix}{last}\n")
+                if blanks:
+                    records.extend(f"{prefix}{blank}\n" for blank in blanks)
+                    blanks = []
+            last = line
+        self._last, self._blanks = last, blanks
+        if records:
+            self._write_records(records)
+
+    def _keep_tail(self, lines: list[str]):
+        tail = self.tail
+        tail.extend(lines)
+        self._tail_chars += sum(map(len, lines)) + len(lines)
+        while self._tail_chars > TAIL_CHARS and len(tail) > 1:
+            self._tail_chars -= len(tail.popleft()) + 1
+        if self._tail_chars > TAIL_CHARS:
+            tail[0] = tail[0][-TAIL_CHARS:]
+            self._tail_chars = len(tail[0]) + 1
+
+    def _write_records(self, records: list[str]):
+        if self._spill is None:
+            self._spill = tempfile.TemporaryFile("w+", encoding="utf-8", errors="replace", newline="\n")
+        self._spill.write("".join(records))
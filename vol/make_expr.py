@@ -0,0 +1,462 @@
+"""
+Make expressions ($(VAR), ${VAR}, $(func args)) parsed once into a small
+AST and evaluated against a variable table.
+
+Parsing is a single left-to-right pass; the AST of each distinct source
+text is cached, so commands and prerequisite lists that are expanded again
+and again (one per target) are only parsed once.
+
+References to unknown variables and unknown functions keep their literal
+text, and `$$` is left as is (the shell gets it, like before). Automatic
+variables ($@, $<, $^, $+, $*, $?) are references too, bound by the
+scope a recipe is expanded in.
+
+Recursive variables (`VAR = ...`) are stored unexpanded as Deferred values
+and expanded where they are referenced, like make does.
+"""
+
+import threading
+from collections import ChainMap
+from functools import lru_cache
+from typing import Callable, Mapping
+
+# $(call) nesting limit (recursive user functions)
+MAX_CALL_DEPTH = 64
+
+CLOSERS = {"(": ")", "{": "}"}
+
+# Automatic variables, referenced without parentheses ($@, $*, ...): bound per recipe
+AUTOMATIC_NAMES = "@<^+*?"
+
+
+class ExpansionState(threading.local):
+    """Expansion in progress, per thread: -j workers expand commands at the same time"""
+
+    def __init__(self):
+        # Recursive variables being expanded right now (self-reference detection)
+        self.expanding: set[str] = set()
+        # Bumped by functions whose result can change while vol runs ($(shell), $(wildcard))
+        self.impure_calls = 0
+        # $(call) nesting
+        self.call_depth = 0
+
+
+_state = ExpansionState()
+
+
+class Deferred:
+    """Value of a recursive variable (`VAR = text`), expanded on every reference"""
+    __slots__ = ("text",)
+
+    def __init__(self, text: str):
+        self.text = text
+
+    def __repr__(self) -> str:
+        return f"Deferred({self.text!r})"
+
+
+class Variables(dict):
+    """
+    Variable table: plain strings for simple variables (`:=`) and Deferred
+    values for recursive ones. Expansions of recursive variables that
+    depend only on other variables are memoized until a variable is set.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.memo: dict[str, str] = {}
+
+    def __setitem__(self, name: str, value):
+        super().__setitem__(name, value)
+        self.memo.clear()
+
+    def __reduce__(self):
+        # The memo is not part of the parse result (parse cache)
+        return (Variables, (dict(self),))
+
+
+def resolve(name: str, value: Deferred, variables: Mapping) -> str:
+    """Expand a recursive variable in the scope it is referenced from"""
+    # Inside $(foreach)/$(call) the result may depend on the bound variables
+    memo = variables.memo if isinstance(variables, Variables) else None
+    if memo is not None and name in memo:
+        return memo[name]
+    state = _state
+    if name in state.expanding:
+        raise ValueError(f"Recursive variable '{name}' references itself (eventually)")
+
+    impure_before = state.impure_calls
+    state.expanding.add(name)
+    try:
+        result = expand(value.text, variables)
+    finally:
+        state.expanding.discard(name)
+    if memo is not None and state.impure_calls == impure_before:
+        memo[name] = result
+    return result
+
+
+class Text:
+    """Literal text"""
+    __slots__ = ("text",)
+
+    def __init__(self, text: str):
+        self.text = text
+
+    def evaluate(self, variables: Mapping) -> str:
+        return self.text
+
+
+class Reference:
+    """$(NAME) or ${NAME}; the name may itself contain references: $($(ARCH)_FLAGS)"""
+    __slots__ = ("name", "opener")
+
+    def __init__(self, name, opener: str):
+        self.name = name  # str, or an Expression for computed names
+        self.opener = opener
+
+    def evaluate(self, variables: Mapping) -> str:
+        name = self.name if isinstance(self.name, str) else self.name.evaluate(variables)
+        value = variables.get(name)
+        if value is None:
+            return f"${self.opener}{name}{CLOSERS.get(self.opener, '')}"
+        if value.__class__ is Deferred:
+            return resolve(name, value, variables)
+        return value
+
+
+class Call:
+    """$(function arg,arg,...) of a known function"""
+    __slots__ = ("function", "args")
+
+    def __init__(self, function: str, args: list["Expression"]):
+        self.function = function
+        self.args = args
+
+    def evaluate(self, variables: Mapping) -> str:
+        lazy = LAZY_FUNCTIONS.get(self.function)
+        if lazy is not None:
+            return lazy(self.args, variables)
+        return FUNCTIONS[self.function][1]([arg.evaluate(variables) for arg in self.args])
+
+
+class Expression:
+    """A sequence of Text, Reference and Call nodes"""
+    __slots__ = ("parts",)
+
+    def __init__(self, parts: list):
+        self.parts = parts
+
+    def evaluate(self, variables: Mapping) -> str:
+        parts = self.parts
+        if len(parts) == 1:
+            return parts[0].evaluate(variables)
+        return "".join(part.evaluate(variables) for part in parts)
+
+
+class Parser:
+    """Recursive descent over the source text, one character at a time"""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.pos = 0
+
+    def parse(self) -> Expression:
+        return self.parse_until("", "")
+
+    def parse_until(self, closer: str, separators: str) -> Expression:
+        """
+        Parse up to an unbalanced `closer` or a top-level separator (`,`),
+        leaving pos on it. Plain parentheses in the text are balanced, so
+        `$(shell echo (a))` ends at the last `)`.
+        """
+        text = self.text
+        parts = []
+        start = self.pos
+        depth = 0
+        opener = {")": "(", "}": "{"}.get(closer, "")
+        while self.pos < len(text):
+            char = text[self.pos]
+            if char == "$":
+                if self.pos > start:
+                    parts.append(Text(text[start:self.pos]))
+                parts.append(self.parse_dollar())
+                start = self.pos
+                continue
+            if depth == 0 and (char == closer or char in separators):
+                break
+            if opener and char == opener:
+                depth += 1
+            elif char == closer:
+                depth -= 1
+            self.pos += 1
+        if self.pos > start:
+            parts.append(Text(text[start:self.pos]))
+        return Expression(merge_text(parts))
+
+    def parse_dollar(self):
+        """Parse a `$...` at pos; anything that is not a reference stays literal"""
+        text = self.text
+        start = self.pos
+        nxt = text[start + 1:start + 2]
+        if nxt == "$":
+            self.pos += 2
+            return Text("$$")
+        if nxt and nxt in AUTOMATIC_NAMES:
+            self.pos += 2
+            return Reference(nxt, "")
+        if nxt not in CLOSERS:
+            self.pos += 1
+            return Text("$")
+
+        closer = CLOSERS[nxt]
+        self.pos += 2
+        function = self.function_name()
+        if function is not None:
+            node = self.parse_call(function, closer)
+        else:
+            name = self.parse_until(closer, "")
+            if len(name.parts) == 1 and isinstance(name.parts[0], Text):
+                name = name.parts[0].text
+            elif not name.parts:
+                name = ""
+            node = Reference(name, nxt)
+
+        if self.pos >= len(text):
+            # Unterminated: keep the rest as written
+            self.pos = len(text)
+            return Text(text[start:])
+        self.pos += 1
+        return node
+
+    def function_name(self):
+        """A known function name followed by whitespace at pos, or None"""
+        text = self.text
+        end = self.pos
+        while end < len(text) and (text[end].isalnum() or text[end] == "-"):
+            end += 1
+        name = text[self.pos:end]
+        if name in FUNCTIONS and end < len(text) and text[end] in " \t":
+            # Leading whitespace of the first argument is not part of it
+            while end < len(text) and text[end] in " \t":
+                end += 1
+            self.pos = end
+            return name
+        return None
+
+    def parse_call(self, function: str, closer: str) -> Call:
+        arity = FUNCTIONS[function][0]
+        args = []
+        while True:
+            # The last argument takes the remaining commas (arity 0 = any number)
+            separators = "," if arity == 0 or len(args) < arity - 1 else ""
+            args.append(self.parse_until(closer, separators))
+            if self.pos < len(self.text) and self.text[self.pos] == ",":
+                self.pos += 1
+                continue
+            return Call(function, args)
+
+
+def merge_text(parts: list) -> list:
+    """Join neighbouring Text nodes"""
+    merged = []
+    for part in parts:
+        if merged and isinstance(part, Text) and isinstance(merged[-1], Text):
+            merged[-1] = Text(merged[-1].text + part.text)
+        else:
+            merged.append(part)
+    return merged
+
+
+@lru_cache(maxsize=8192)
+def parse_expression(text: str) -> Expression:
+    """AST of an expression, cached by its source text"""
+    return Parser(text).parse()
+
+
+def expand(text: str, variables: Mapping) -> str:
+    """Expand variable references and function calls in text"""
+    if "$" not in text:
+        return text
+    return parse_expression(text).evaluate(variables)
+
+
+# --- Functions -------------------------------------------------------------
+
+def match_word(pattern: str, word: str) -> str | None:
+    """Stem of word matched against a `%` pattern (exact match without `%`), or None"""
+    prefix, percent, suffix = pattern.partition("%")
+    if not percent:
+        return "" if word == pattern else None
+    if len(word) < len(prefix) + len(suffix) or not word.startswith(prefix) or not word.endswith(suffix):
+        return None
+    return word[len(prefix):len(word) - len(suffix)]
+
+
+def fn_shell(args: list[str]) -> str:
+    from .makefile import note_source, run_shell_function
+    from .parse_cache import VOLATILE
+    _state.impure_calls += 1
+    # Command output may change without any file changing
+    note_source(VOLATILE)
+    return run_shell_function(args[0].strip())
+
+
+def fn_word(args: list[str]) -> str:
+    # $(word n,text) - returns nth word (1-indexed)
+    if len(args) == 2:
+        try:
+            n = int(args[0].strip())
+        except ValueError:
+            return ""
+        words = args[1].split()
+        if 1 <= n <= len(words):
+            return words[n - 1]
+    return ""
+
+
+def fn_subst(args: list[str]) -> str:
+    # $(subst from,to,text)
+    if len(args) == 3:
+        return args[2].replace(args[0], args[1]) if args[0] else args[2]
+    return ",".join(args)
+
+
+def fn_patsubst(args: list[str]) -> str:
+    # $(patsubst pattern,replacement,text) - pattern substitution with %
+    if len(args) != 3:
+        return ",".join(args)
+    pattern, replacement = args[0].strip(), args[1].strip()
+    result = []
+    for word in args[2].split():
+        stem = match_word(pattern, word)
+        if stem is None:
+            result.append(word)
+        elif "%" in pattern:
+            result.append(replacement.replace("%", stem, 1))
+        else:
+            result.append(replacement)
+    return " ".join(result)
+
+
+def fn_filter(args: list[str], keep: bool = True) -> str:
+    # $(filter patterns,text) / $(filter-out patterns,text)
+    if len(args) != 2:
+        return ""
+    patterns = args[0].split()
+    return " ".join(word for word in args[1].split()
+                    if any(match_word(p, word) is not None for p in patterns) == keep)
+
+
+def fn_dir(args: list[str]) -> str:
+    # $(dir names) - directory part, with trailing slash
+    return " ".join(w[:w.rindex("/") + 1] if "/" in w else "./" for w in args[0].split())
+
+
+def fn_suffix(args: list[str]) -> str:
+    from pathlib import Path
+    return " ".join(Path(w).suffix for w in args[0].split() if Path(w).suffix)
+
+
+def fn_basename(args: list[str]) -> str:
+    from pathlib import Path
+    return " ".join(str(Path(w).with_suffix("")) for w in args[0].split())
+
+
+def fn_addsuffix(args: list[str]) -> str:
+    if len(args) == 2:
+        return " ".join(w + args[0] for w in args[1].split())
+    return ",".join(args)
+
+
+def fn_addprefix(args: list[str]) -> str:
+    if len(args) == 2:
+        return " ".join(args[0] + w for w in args[1].split())
+    return ",".join(args)
+
+
+def fn_wildcard(args: list[str]) -> str:
+    import glob
+    from .makefile import note_globs
+    _state.impure_calls += 1
+    note_globs(args[0])
+    return " ".join(match for pattern in args[0].split() for match in glob.glob(pattern))
+
+
+# name -> (number of arguments, 0 = any; implementation over expanded arguments)
+FUNCTIONS: dict[str, tuple[int, Callable[[list[str]], str]]] = {
+    "shell": (1, fn_shell),
+    "word": (2, fn_word),
+    "words": (1, lambda args: str(len(args[0].split()))),
+    "firstword": (1, lambda args: (args[0].split() or [""])[0]),
+    "lastword": (1, lambda args: (args[0].split() or [""])[-1]),
+    "subst": (3, fn_subst),
+    "patsubst": (3, fn_patsubst),
+    "strip": (1, lambda args: " ".join(args[0].split())),
+    "sort": (1, lambda args: " ".join(sorted(set(args[0].split())))),
+    "dir": (1, fn_dir),
+    "notdir": (1, lambda args: " ".join(w.rsplit("/", 1)[-1] for w in args[0].split())),
+    "suffix": (1, fn_suffix),
+    "basename": (1, fn_basename),
+    "addsuffix": (2, fn_addsuffix),
+    "addprefix": (2, fn_addprefix),
+    "wildcard": (1, fn_wildcard),
+    "filter": (2, fn_filter),
+    "filter-out": (2, lambda args: fn_filter(args, keep=False)),
+    "foreach": (3, None),
+    "if": (3, None),
+    "call": (0, None),
+}
+
+
+def fn_foreach(args: list[Expression], variables: Mapping) -> str:
+    # $(foreach var,list,text) - text expanded once per word, with var set to it
+    if len(args) != 3:
+        return ""
+    name = args[0].evaluate(variables).strip()
+    scope = {}
+    bound = ChainMap(scope, variables)
+    results = []
+    for word in args[1].evaluate(variables).split():
+        scope[name] = word
+        results.append(args[2].evaluate(bound))
+    return " ".join(results)
+
+
+def fn_if(args: list[Expression], variables: Mapping) -> str:
+    # $(if condition,then[,else]) - only the chosen branch is expanded
+    if args[0].evaluate(variables).strip():
+        return args[1].evaluate(variables) if len(args) > 1 else ""
+    return args[2].evaluate(variables) if len(args) > 2 else ""
+
+
+def fn_call(args: list[Expression], variables: Mapping) -> str:
+    # $(call name,param,...) - the variable's value expanded with $(1), $(2), ... set
+    values = [arg.evaluate(variables) for arg in args]
+    name = values[0].strip()
+    body = variables.get(name)
+    if body is None:
+        return ""
+    if body.__class__ is Deferred:
+        body = body.text
+    if _state.call_depth >= MAX_CALL_DEPTH:
+        raise ValueError(f"$(call {name}) nested deeper than {MAX_CALL_DEPTH} levels")
+    params = {str(i): value for i, value in enumerate(values)}
+    params["0"] = name
+    # Parameters of an outer call (and foreach variables) are not visible inside this one
+    base = variables
+    while isinstance(base, ChainMap):
+        base = base.maps[-1]
+    _state.call_depth += 1
+    try:
+        return expand(body, ChainMap(params, base))
+    finally:
+        _state.call_depth -= 1
+
+
+# Functions that expand their own arguments (only what they need, with extra variables bound)
+LAZY_FUNCTIONS = {
+    "foreach": fn_foreach,
+    "if": fn_if,
+    "call": fn_call,
+}
@@ -1,226 +1,141 @@
 """Makefile parsing and execution"""
 
+import os
 import re
-import subprocess
+from collections import ChainMap
 from pathlib import Path
 
-from .output import print_status
-from .runner import run_command_with_output
 from .logger import Logger
+from .make_expr import expand, Deferred, Variables
 
 
-def find_matching_paren(text: str, start: int) -> int:
-    """Find the matching closing parenthesis, handling nested parens"""
-    depth = 0
-    for i, char in enumerate(text[start:]):
-        if char == '(':
-            depth += 1
-        elif char == ')':
-            depth -= 1
-            if depth == 0:
-                return start + i
-    return -1
-
-
-def expand_make_functions(text: str) -> str:
-    """Expand all GNU Make function calls like $(shell ...), $(word ...), etc."""
-    result = text
-    max_iterations = 100  # Prevent infinite loops
-    
-    for _ in range(max_iterations):
-        # Find innermost function call first (to handle nesting)
-        # Look for $(func where func is a known function name
-        functions = ['shell', 'word', 'words', 'firstword', 'lastword', 
-                     'subst', 'patsubst', 'strip', 'sort', 'dir', 'notdir',
-                     'suffix', 'basename', 'addsuffix', 'addprefix', 'wildcard']
-        
-        found = False
-        for func in functions:
-            pattern = f'$({func} '
-            idx = result.find(pattern)
-            if idx != -1:
-                end = find_matching_paren(result, idx + 1)  # +1 to skip $
-                if end > idx:
-                    full_expr = result[idx:end + 1]
-                    inner = result[idx + len(pattern):end]
-                    
-                    # Recursively expand inner content first
-                    inner = expand_make_functions(inner)
-                    
-                    # Now evaluate the function
-                    value = evaluate_make_function(func, inner)
-                    result = result[:idx] + value + result[end + 1:]
-                    found = True
-                    break
-        
-        if not found:
-            break
-    
-    return result
+# Files and directories the Makefile being parsed depends on (see read_makefile_sources)
+_parse_sources: set | None = None
 
 
-def evaluate_make_function(func: str, args: str) -> str:
-    """Evaluate a single Make function"""
-    
-    if func == 'shell':
+# $(shell ...) outputs of this run: {(command, cwd): output}
+_shell_results: dict[tuple[str, str], str] = {}
+
+
+def note_source(path: str):
+    """Record a file whose changes invalidate the Makefile being parsed"""
+    if _parse_sources is not None:
+        _parse_sources.add(path)
+
+
+def note_globs(patterns: str):
+    """
+    Record the glob patterns (or plain file names) a result was built from:
+    the cache is invalid once they match other files. Directory mtimes
+    would also change on unrelated files (vol's own logs), so matches are compared.
+    """
+    if _parse_sources is None:
+        return
+    import glob
+    from .parse_cache import GLOB_PREFIX
+    for pattern in patterns.split():
+        _parse_sources.add(GLOB_PREFIX + pattern if glob.has_magic(pattern) else pattern)
+
+
+def run_shell_function(command: str) -> str:
+    """
+    Output of $(shell command), run at most once per run for each command
+    and working directory. With `shell_cache_ttl` set, successful outputs
+    are also reused across runs for that many seconds.
+    """
+    cwd = os.getcwd()
+    key = (command, cwd)
+    if key in _shell_results:
+        return _shell_results[key]
+
+    from .config import get_ui_config
+    ttl = get_ui_config().shell_cache_ttl
+    output = None
+    if ttl > 0:
+        from .shell_cache import get_shell_cache
+        output = get_shell_cache().get(command, cwd, ttl)
+
+    if output is None:
+        import subprocess
         try:
             proc = subprocess.run(
-                args.strip(),
+                command,
                 shell=True,
                 capture_output=True,
                 text=True,
                 timeout=30
             )
-            return proc.stdout.strip()
+            output = proc.stdout.strip()
+            if ttl > 0 and proc.returncode == 0:
+                get_shell_cache().put(command, cwd, output)
         except Exception:
-            return ""
-    
-    elif func == 'word':
-        # $(word n,text) - returns nth word (1-indexed)
-        parts = args.split(',', 1)
-        if len(parts) == 2:
-            try:
-                n = int(parts[0].strip())
-                words = parts[1].strip().split()
-                if 1 <= n <= len(words):
-                    return words[n - 1]
-            except (ValueError, IndexError):
-                pass
-        return ""
-    
-    elif func == 'words':
-        # $(words text) - returns number of words
-        return str(len(args.strip().split()))
-    
-    elif func == 'firstword':
-        # $(firstword text) - returns first word
-        words = args.strip().split()
-        return words[0] if words else ""
-    
-    elif func == 'lastword':
-        # $(lastword text) - returns last word
-        words = args.strip().split()
-        return words[-1] if words else ""
-    
-    elif func == 'subst':
-        # $(subst from,to,text) - substitutes text
-        parts = args.split(',', 2)
-        if len(parts) == 3:
-            from_str = parts[0]
-            to_str = parts[1]
-            text = parts[2]
-            return text.replace(from_str, to_str)
-        return args
-    
-    elif func == 'patsubst':
-        # $(patsubst pattern,replacement,text) - pattern substitution with %
-        parts = args.split(',', 2)
-        if len(parts) == 3:
-            pattern = parts[0].strip()
-            replacement = parts[1].strip()
-            text = parts[2].strip()
-            
-            words = text.split()
-            result = []
-            for word in words:
-                if '%' in pattern:
-                    # Pattern matching with %
-                    prefix = pattern.split('%')[0]
-                    suffix = pattern.split('%')[1] if '%' in pattern else ''
-                    if word.startswith(prefix) and word.endswith(suffix):
-                        stem = word[len(prefix):len(word) - len(suffix) if suffix else None]
-                        new_word = replacement.replace('%', stem)
-                        result.append(new_word)
-                    else:
-                        result.append(word)
-                else:
-                    if word == pattern:
-                        result.append(replacement)
-                    else:
-                        result.append(word)
-            return ' '.join(result)
-        return args
-    
-    elif func == 'strip':
-        # $(strip text) - removes leading/trailing whitespace, collapses internal
-        return ' '.join(args.split())
-    
-    elif func == 'sort':
-        # $(sort list) - sorts words and removes duplicates
-        words = args.strip().split()
-        return ' '.join(sorted(set(words)))
-    
-    elif func == 'dir':
-        # $(dir names) - extracts directory part
-        words = args.strip().split()
-        return ' '.join(str(Path(w).parent) + '/' if '/' in w else './' for w in words)
-    
-    elif func == 'notdir':
-        # $(notdir names) - extracts non-directory part
-        words = args.strip().split()
-        return ' '.join(Path(w).name for w in words)
-    
-    elif func == 'suffix':
-        # $(suffix names) - extracts suffix
-        words = args.strip().split()
-        return ' '.join(Path(w).suffix for w in words if Path(w).suffix)
-    
-    elif func == 'basename':
-        # $(basename names) - removes suffix
-        words = args.strip().split()
-        return ' '.join(str(Path(w).with_suffix('')) for w in words)
-    
-    elif func == 'addsuffix':
-        # $(addsuffix suffix,names)
-        parts = args.split(',', 1)
-        if len(parts) == 2:
-            suffix = parts[0]
-            words = parts[1].strip().split()
-            return ' '.join(w + suffix for w in words)
-        return args
-    
-    elif func == 'addprefix':
-        # $(addprefix prefix,names)
-        parts = args.split(',', 1)
-        if len(parts) == 2:
-            prefix = parts[0]
-            words = parts[1].strip().split()
-            return ' '.join(prefix + w for w in words)
-        return args
-    
-    elif func == 'wildcard':
-        # $(wildcard pattern) - expands to matching files
-        import glob
-        matches = glob.glob(args.strip())
-        return ' '.join(matches)
-    
-    return ""
+            output = ""
+
+    _shell_results[key] = output
+    return output
+
+
+def clear_shell_results():
+    """Forget the $(shell ...) outputs of this run (daemon: one run per request)"""
+    _shell_results.clear()
 
 
 def expand_variables(text: str, variables: dict) -> str:
-    """Expand Make variables $(VAR) or ${VAR} in text"""
-    # First expand all Make functions
-    text = expand_make_functions(text)
-    
-    def replace_var(match):
-        var_name = match.group(1) or match.group(2)
-        return variables.get(var_name, match.group(0))
-    
-    # Match $(VAR) or ${VAR} - simple variable names only
-    pattern = r'\$\(([A-Za-z_][A-Za-z0-9_]*)\)|\$\{([A-Za-z_][A-Za-z0-9_]*)\}'
-    return re.sub(pattern, replace_var, text)
+    """Expand Make variables $(VAR) or ${VAR} and function calls like $(patsubst ...) in text"""
+    return expand(text, variables)
+
+
+
+# Target line: one or more names, a single or double colon (not :=), then prerequisites
+TARGET_RE = re.compile(r'^([^\s:#=][^:#=]*?)\s*::?(?!=)\s*(.*)$')
+
+# Special built-in targets like .PHONY, .SUFFIXES, .DEFAULT
+SPECIAL_TARGET_RE = re.compile(r'^\.[A-Z_]+$')
+
+# Variable assignment: name, operator, value
+VARIABLE_RE = re.compile(r'^([A-Za-z_][A-Za-z0-9_]*)\s*(::?=|\?=|\+=|=)\s*(.*)$')
+
+# include / -include / sinclude directives
+INCLUDE_RE = re.compile(r'^(-|s)?include\s+(.+)$')
 
 
+# How many pattern rules may be chained to make one file (%.o <- %.c <- %.y ...)
+MAX_PATTERN_CHAIN = 4
 
-def parse_variable_line(line: str) -> tuple[str, str] | None:
-    """Parse a variable assignment line. Returns (name, value) or None."""
-    # Match VAR := value or VAR = value or VAR ?= value
-    match = re.match(r'^([A-Za-z_][A-Za-z0-9_]*)\s*[:?]?=\s*(.*)$', line.strip())
+
+def parse_variable_line(line: str) -> tuple[str, str, str] | None:
+    """Parse a variable assignment line. Returns (name, operator, value) or None."""
+    # VAR = value, VAR := value, VAR ::= value, VAR ?= value or VAR += value
+    match = VARIABLE_RE.match(line.strip())
     if match:
-        return match.group(1), match.group(2).strip()
+        return match.group(1), match.group(2), match.group(3).strip()
     return None
 
 
+def assign_variable(variables: "Variables", name: str, operator: str, value: str):
+    """
+    Apply an assignment like make: `:=` expands the value now, `=` keeps it
+    for expansion where the variable is used, `?=` only defines an unset
+    variable and `+=` appends in the variable's own flavour.
+    """
+    if operator in (":=", "::="):
+        variables[name] = expand_variables(value, variables)
+    elif operator == "?=":
+        if name not in variables:
+            variables[name] = Deferred(value)
+    elif operator == "+=":
+        current = variables.get(name)
+        if current is None:
+            variables[name] = Deferred(value)
+        elif isinstance(current, Deferred):
+            variables[name] = Deferred(f"{current.text} {value}" if current.text else value)
+        else:
+            value = expand_variables(value, variables)
+            variables[name] = f"{current} {value}" if current else value
+    else:
+        variables[name] = Deferred(value)
+
+
 def parse_command(cmd_line: str) -> tuple[str, str, bool, bool]:
     """
     Parse a Makefile command line.
@@ -267,8 +182,58 @@ def parse_makefile(filename: str = "Makefile") -> dict[str, dict]:
     Returns dict of {target_name: {"description": str, "depends": list, "commands": list}}
     Commands are tuples of (cmd, description, silent)
     
+    Pattern rules (`%.o: %.c`) are not returned here, see read_makefile().
+    
     Returns (targets_dict, variables_dict)
     """
+    targets, variables, _ = read_makefile(filename)
+    return targets, variables
+
+
+def read_makefile(filename: str = "Makefile") -> tuple[dict, dict, "PatternIndex"]:
+    """Parse a Makefile like parse_makefile(), also returning its pattern rules"""
+    from .parse_cache import cached_parse
+    return cached_parse("makefile", filename, lambda: read_makefile_sources(filename))
+
+
+def read_makefile_sources(filename: str, evaluate: bool = True) -> tuple[tuple[dict, dict, "PatternIndex"], set]:
+    """Parse a Makefile, returning the result and the files/directories it was built from"""
+    global _parse_sources
+    _parse_sources = set()
+    try:
+        return parse_makefile_file(filename, evaluate), _parse_sources
+    finally:
+        _parse_sources = None
+        from .shell_cache import save_shell_cache
+        save_shell_cache()
+
+
+def parse_makefile_file(filename: str, evaluate: bool = True) -> tuple[dict, dict, "PatternIndex"]:
+    """
+    Parse a Makefile and the files it includes. With evaluate=False
+    (listing targets) nothing is expanded: no variables are recorded, names
+    and prerequisites stay as written and generated dependency files are
+    not read.
+    """
+    reader = MakefileReader(evaluate)
+    reader.read(filename)
+    return reader.result()
+
+
+def read_statements(filename: str) -> list[tuple]:
+    """Statements of one Makefile or included fragment, cached per file"""
+    from .parse_cache import cached_parse
+    return cached_parse("makefile-statements", filename, lambda: (parse_statements(filename), ()))
+
+
+def parse_statements(filename: str) -> list[tuple]:
+    """
+    Split a Makefile into statements without expanding anything, so that
+    the result depends on the file alone and can be cached per file:
+        ("blank",), ("description", text), ("assign", name, operator, value),
+        ("include", optional, names), ("rule", names, rest),
+        ("command", cmd, desc, silent, is_info), ("other",)
+    """
     with open(filename, "r", encoding="utf-8") as f:
         raw_lines = f.readlines()
     
@@ -287,108 +252,513 @@ def parse_makefile(filename: str = "Makefile") -> dict[str, dict]:
     if current_line:
         lines.append(current_line)
     
-    targets = {}
-    variables = {}
-    current_description = None
-    current_target = None
-    
+    statements = []
     for line in lines:
         stripped = line.strip()
         
-        # Skip empty lines in target context, reset description
         if not stripped:
-            if current_target is None:
-                current_description = None
+            statements.append(("blank",))
+            continue
+        
+        # Command (starts with tab)
+        if line.startswith("\t"):
+            cmd, desc, silent, is_info = parse_command(line[1:].rstrip())
+            if cmd or is_info:  # Include info-only lines
+                statements.append(("command", cmd, desc, silent, is_info))
             continue
         
         # Comment before target = description
-        if stripped.startswith("#") and not line.startswith("\t"):
+        if stripped.startswith("#"):
             # Check if it's a description comment (not a directive like #!)
             comment = stripped[1:].strip()
             if comment and not comment.startswith("!") and not comment.startswith("-"):
-                current_description = comment
+                statements.append(("description", comment))
             continue
         
-        # Variable assignment (VAR := value or VAR = value)
+        # Variable assignment (VAR := value, VAR = value, ...)
         var_result = parse_variable_line(stripped)
-        if var_result and not line.startswith("\t"):
-            var_name, var_value = var_result
-            # Expand variables in the value
-            var_value = expand_variables(var_value, variables)
-            variables[var_name] = var_value
+        if var_result:
+            statements.append(("assign", *var_result))
             continue
         
-        # Target definition: name: [deps]  ## optional description
-        target_match = re.match(r'^([a-zA-Z_][a-zA-Z0-9_-]*)\s*:\s*(.*)$', line.rstrip())
-        if target_match and not line.startswith("\t"):
-            target_name = target_match.group(1)
-            rest = target_match.group(2)
-            
-            # Check for inline description (## comment)
-            if "##" in rest:
-                deps_part, desc = rest.split("##", 1)
-                deps = [d.strip() for d in deps_part.split() if d.strip()]
-                description = desc.strip()
-            else:
-                deps = [d.strip() for d in rest.split() if d.strip()]
-                description = current_description or target_name
-            
-            targets[target_name] = {
-                "description": description,
-                "depends": deps,
-                "commands": [],
-            }
-            current_target = target_name
-            current_description = None
+        # include / -include / sinclude
+        include_match = INCLUDE_RE.match(line.rstrip())
+        if include_match:
+            statements.append(("include", bool(include_match.group(1)), include_match.group(2)))
             continue
         
-        # Command (starts with tab)
-        if line.startswith("\t") and current_target:
-            cmd_line = line[1:].rstrip()  # Remove leading tab
-            if cmd_line:
-                cmd, desc, silent, is_info = parse_command(cmd_line)
-                if cmd or is_info:  # Include info-only lines
-                    targets[current_target]["commands"].append({
+        # Target definition: name [name...]: [deps]  ## optional description
+        target_match = TARGET_RE.match(line.rstrip())
+        if target_match:
+            statements.append(("rule", target_match.group(1), target_match.group(2)))
+            continue
+        
+        statements.append(("other",))
+    return statements
+
+
+class MakefileReader:
+    """Evaluates Makefile statements into targets, variables and pattern rules, following includes"""
+    
+    def __init__(self, evaluate: bool = True):
+        self.evaluate = evaluate
+        self.targets = {}
+        self.variables = Variables()
+        self.patterns = PatternIndex()
+        self.phony = set()
+        # Files being read, outermost first (include cycles)
+        self.including: list[str] = []
+    
+    def expand(self, text: str) -> str:
+        return expand_variables(text, self.variables) if self.evaluate else text
+    
+    def result(self) -> tuple[dict, dict, "PatternIndex"]:
+        for name, target in self.targets.items():
+            target["phony"] = name in self.phony
+        self.patterns.phony = self.phony
+        return self.targets, self.variables, self.patterns
+    
+    def read(self, filename: str):
+        """Evaluate one file; descriptions and command blocks do not continue across files"""
+        path = os.path.abspath(filename)
+        if path in self.including:
+            raise ValueError(f"{filename} includes itself")
+        self.including.append(path)
+        try:
+            self.run(read_statements(filename), filename)
+        finally:
+            self.including.pop()
+    
+    def run(self, statements: list[tuple], filename: str):
+        current_description = None
+        # Rules (explicit targets or pattern rules) that following command lines belong to
+        current_targets = []
+        
+        for statement in statements:
+            kind = statement[0]
+            
+            # Skip empty lines in target context, reset description
+            if kind == "blank":
+                if not current_targets:
+                    current_description = None
+            
+            elif kind == "description":
+                current_description = statement[1]
+            
+            elif kind == "assign":
+                if self.evaluate:
+                    assign_variable(self.variables, *statement[1:])
+            
+            elif kind == "include":
+                self.include(statement[1], statement[2], filename)
+                current_targets = []
+            
+            elif kind == "rule":
+                current_targets = self.rule(statement[1], statement[2], current_description)
+                current_description = None
+            
+            elif kind == "command" and current_targets:
+                _, cmd, desc, silent, is_info = statement
+                for rule in current_targets:
+                    rule["commands"].append({
                         "cmd": cmd,
                         "desc": desc,
                         "silent": silent,
                         "is_info": is_info,
                     })
-            continue
+            
+            else:
+                # Anything else resets the current target
+                current_targets = []
+    
+    def include(self, optional: bool, names: str, filename: str):
+        """
+        include / -include: paths are relative to the including file and may
+        be globs. Generated dependency files (*.d, gcc -MMD) only add
+        prerequisites and stay unlisted; other files are read as Makefiles.
+        """
+        import glob
+        if not self.evaluate and "$" in names:
+            # Listing does not expand variables
+            return
+        base = os.path.dirname(filename)
+        paths = [name if os.path.isabs(name) else os.path.join(base, name)
+                 for name in self.expand(names).split()]
+        # A missing file that appears later must invalidate the parse cache too
+        note_globs(" ".join(paths))
         
-        # Anything else resets the current target
-        current_target = None
+        for pattern in paths:
+            if glob.has_magic(pattern):
+                matches = sorted(glob.glob(pattern))
+            else:
+                matches = [pattern] if os.path.isfile(pattern) else []
+                if not matches and not optional and self.evaluate:
+                    raise ValueError(f"included file not found: {pattern}")
+            
+            for path in matches:
+                if path.endswith(".d"):
+                    if self.evaluate:
+                        note_source(path)
+                        for names_list, deps in parse_dependency_file(path):
+                            add_rule(self.targets, names_list, deps, implicit=True)
+                else:
+                    note_source(path)
+                    self.read(path)
     
-    return targets, variables
+    def rule(self, names_text: str, rest: str, current_description: str | None) -> list[dict]:
+        """Add a rule line; returns the rules its command lines belong to"""
+        targets = self.targets
+        names = self.expand(names_text).split()
+        
+        # Check for inline description (## comment)
+        if "##" in rest:
+            deps_part, desc = rest.split("##", 1)
+            description = desc.strip()
+        else:
+            deps_part = rest.split("#", 1)[0]
+            description = current_description
+        
+        # Target-specific variables (target: VAR = value) are not supported
+        if "=" in deps_part:
+            return []
+        
+        # Static pattern rule: targets: target-pattern: prereq-patterns
+        target_pattern = None
+        if ":" in deps_part:
+            target_pattern, deps_part = deps_part.split(":", 1)
+            target_pattern = self.expand(target_pattern).strip()
+        
+        deps, order_only = split_prerequisites(self.expand(deps_part))
+        
+        if names == [".PHONY"]:
+            self.phony.update(deps)
+            return []
+        
+        # Other special targets (.SUFFIXES, .DEFAULT, ...) are ignored
+        names = [n for n in names if not SPECIAL_TARGET_RE.match(n)]
+        
+        if target_pattern is not None:
+            current_targets = []
+            for name in names:
+                stem = match_pattern(target_pattern, name)
+                if stem is None:
+                    continue
+                add_rule(targets, [name], substitute_stem(deps, stem), description,
+                         substitute_stem(order_only, stem))
+                targets[name]["stem"] = stem
+                current_targets.append(targets[name])
+            return current_targets
+        
+        if any("%" in n for n in names):
+            # Pattern rule; a bare `%` (match-anything rule) is not supported
+            return [
+                self.patterns.add(n, deps, order_only, description)
+                for n in names if "%" in n and n != "%"
+            ]
+        
+        if not names:
+            return []
+        
+        add_rule(targets, names, deps, description, order_only)
+        return [targets[n] for n in names]
 
 
-def run_makefile_target(target_name: str, targets: dict, variables: dict, logger: Logger, executed: set = None) -> bool:
-    """Run a Makefile target with its dependencies"""
-    from .progress import advance_progress
+def add_rule(targets: dict, names: list[str], deps: list[str], description: str = None,
+             order_only: list[str] = None, implicit: bool = False):
+    """
+    Add a rule to targets; repeated rules for a target merge their prerequisites.
+    Implicit targets (only known from dependency files or pattern rules) are
+    not listed as available targets.
+    """
+    for name in names:
+        target = targets.get(name)
+        if target is None:
+            targets[name] = {
+                "description": description or name,
+                "depends": list(dict.fromkeys(deps)),
+                "order_only": list(order_only or []),
+                "commands": [],
+                "implicit": implicit,
+            }
+            continue
+        merge_prerequisites(target["depends"], deps)
+        merge_prerequisites(target["order_only"], order_only or [])
+        if description:
+            target["description"] = description
+        if not implicit:
+            target["implicit"] = False
+
+
+def merge_prerequisites(existing: list[str], new: list[str]):
+    """Append new prerequisites that are not already listed, keeping order"""
+    seen = set(existing)
+    for dep in new:
+        if dep not in seen:
+            seen.add(dep)
+            existing.append(dep)
+
+
+def split_prerequisites(text: str) -> tuple[list[str], list[str]]:
+    """Split a prerequisite list into normal and order-only (after `|`) prerequisites"""
+    normal, _, order_only = text.partition("|")
+    return normal.split(), order_only.split()
+
+
+def match_pattern(pattern: str, name: str) -> str | None:
+    """
+    Match a file name against a `%` pattern, returning the stem or None.
+    Like make, a pattern without a slash matches the file part of the name
+    and the directory becomes part of the stem.
+    """
+    prefix, _, suffix = pattern.partition("%")
+    directory = ""
+    if "/" not in pattern and "/" in name:
+        directory, name = name.rsplit("/", 1)
+        directory += "/"
+    if len(name) < len(prefix) + len(suffix) or not name.startswith(prefix) or not name.endswith(suffix):
+        return None
+    return directory + name[len(prefix):len(name) - len(suffix)]
+
+
+def substitute_stem(patterns: list[str], stem: str) -> list[str]:
+    """Replace `%` in prerequisite patterns with a stem (directory-aware, like make)"""
+    directory, _, base = stem.rpartition("/")
+    result = []
+    for pattern in patterns:
+        if "%" not in pattern:
+            result.append(pattern)
+        elif "/" in pattern or not directory:
+            result.append(pattern.replace("%", stem, 1))
+        else:
+            result.append(f"{directory}/{pattern.replace('%', base, 1)}")
+    return result
+
+
+class PatternIndex:
+    """
+    Pattern rules (`%.o: %.c`) indexed by the text after `%` in the target.
     
-    if executed is None:
-        executed = set()
+    Finding the rules for a file name costs one dict lookup per distinct
+    suffix length instead of a scan of every rule, and each name is
+    resolved at most once, so fanning out to many files stays cheap.
+    """
     
-    if target_name in executed:
-        return True
+    def __init__(self):
+        self.by_suffix: dict[str, list[dict]] = {}
+        self.suffix_lengths: list[int] = []
+        self.phony: set = set()
+        self._count = 0
+    
+    def __len__(self) -> int:
+        return self._count
+    
+    def add(self, target: str, deps: list[str], order_only: list[str], description: str = None) -> dict:
+        """Add a pattern rule, returns it so command lines can be attached"""
+        suffix = target.split("%", 1)[1]
+        rule = {
+            "target": target,
+            "depends": deps,
+            "order_only": order_only,
+            "commands": [],
+            "description": description,
+            "order": self._count,
+        }
+        self._count += 1
+        self.by_suffix.setdefault(suffix, []).append(rule)
+        if len(suffix) not in self.suffix_lengths:
+            self.suffix_lengths.append(len(suffix))
+        return rule
+    
+    def candidates(self, name: str) -> list[tuple[str, dict]]:
+        """Rules whose target pattern matches name, as (stem, rule), most specific first"""
+        matches = []
+        for length in self.suffix_lengths:
+            if length > len(name):
+                continue
+            for rule in self.by_suffix.get(name[len(name) - length:], ()):
+                # A rule without a recipe only cancels built-in rules in make
+                if not rule["commands"]:
+                    continue
+                stem = match_pattern(rule["target"], name)
+                if stem is not None:
+                    matches.append((stem, rule))
+        # make prefers the shortest stem, then the rule defined first
+        matches.sort(key=lambda match: (len(match[0]), match[1]["order"]))
+        return matches
+
+
+def expand_pattern_rules(target_name: str, targets: dict, patterns: PatternIndex):
+    """
+    Add targets for files reachable from target_name that are built by
+    pattern rules (recipe, prerequisites and stem for $*). Explicit rules
+    with a recipe always win; prerequisites from explicit rules and
+    dependency files are kept after the ones from the pattern.
+    """
+    if not len(patterns):
+        return
+    
+    resolved: dict[str, bool] = {}
+    
+    def can_make(name: str, depth: int) -> bool:
+        """True if name exists, has an explicit rule, or a pattern rule can make it"""
+        if name in resolved:
+            return resolved[name]
+        resolved[name] = False  # Breaks cycles
+        target = targets.get(name)
+        result = target is not None or os.path.exists(name)
+        if (target is None or not target["commands"]) and name not in patterns.phony and depth < MAX_PATTERN_CHAIN:
+            for stem, rule in patterns.candidates(name):
+                deps = substitute_stem(rule["depends"], stem)
+                if all(can_make(dep, depth + 1) for dep in deps):
+                    apply_pattern(name, stem, rule, deps)
+                    result = True
+                    break
+        resolved[name] = result
+        return result
+    
+    def apply_pattern(name: str, stem: str, rule: dict, deps: list[str]):
+        target = targets.get(name)
+        if target is None:
+            add_rule(targets, [name], [], rule["description"] or name, implicit=True)
+            target = targets[name]
+            target["phony"] = False
+        target["depends"][:0] = [d for d in deps if d not in target["depends"]]
+        merge_prerequisites(target["order_only"], substitute_stem(rule["order_only"], stem))
+        target["commands"] = rule["commands"]
+        target["stem"] = stem
+    
+    # Walk everything the target needs, resolving each file once
+    stack = [target_name]
+    visited = set()
+    while stack:
+        name = stack.pop()
+        if name in visited:
+            continue
+        visited.add(name)
+        can_make(name, 0)
+        target = targets.get(name)
+        if target is not None:
+            stack.extend(target["depends"])
+            stack.extend(target["order_only"])
+
+
+def automatic_variables(name: str, target: dict) -> dict[str, str]:
+    """Values of $@, $<, $^, $+, $* and $? for a target"""
+    deps = target["depends"]
+    mtime = target_mtime(name)
+    newer = [
+        dep for dep in deps
+        if mtime is None or (target_mtime(dep) or 0) > mtime
+    ]
+    return {
+        "@": name,
+        "<": deps[0] if deps else "",
+        "^": " ".join(deps),
+        "+": " ".join(deps),
+        "*": target.get("stem", ""),
+        "?": " ".join(newer),
+    }
+
+
+def recipe_scope(name: str, target: dict, variables: dict) -> ChainMap:
+    """
+    Variables a target's recipe is expanded with: $@, $<, $^, ... and their
+    $(@D)/$(@F) directory and file forms over the Makefile's own, so that
+    recursive variables see them too (DEPFLAGS = -MT $@ -MF $*.d)
+    """
+    auto_vars = automatic_variables(name, target)
+    scope = dict(auto_vars)
+    for var, value in auto_vars.items():
+        words = value.split()
+        scope[var + "D"] = " ".join(os.path.dirname(w) or "." for w in words)
+        scope[var + "F"] = " ".join(os.path.basename(w) for w in words)
+    return ChainMap(scope, variables)
+
+
+def parse_dependency_file(filename: str) -> list[tuple[list[str], list[str]]]:
+    """
+    Parse a generated dependency file (gcc -MMD -MP output).
+    Returns list of (targets, prerequisites) rules.
+    """
+    try:
+        with open(filename, "r", encoding="utf-8", errors="replace") as f:
+            content = f.read()
+    except OSError:
+        return []
+    
+    rules = []
+    for line in content.replace("\\\n", " ").splitlines():
+        line = line.split("#", 1)[0]
+        match = TARGET_RE.match(line)
+        if match:
+            rules.append((match.group(1).split(), match.group(2).split()))
+    return rules
+
+
+def target_mtime(name: str) -> int | None:
+    """Modification time of a file target in ns, or None if there is no such file"""
+    try:
+        return os.stat(name).st_mtime_ns
+    except OSError:
+        return None
+
+
+def is_target_up_to_date(name: str, targets: dict, rebuilt: set) -> bool:
+    """
+    Check if a file target is newer than all its prerequisites (make semantics).
     
-    if target_name not in targets:
-        print_status("error", f"Цель '{target_name}' не найдена в Makefile")
+    A target is out of date when it is phony, its file does not exist, a
+    prerequisite is phony, was rebuilt in this run, is missing or is newer.
+    """
+    target = targets[name]
+    if target.get("phony"):
         return False
     
-    target = targets[target_name]
+    mtime = target_mtime(name)
+    if mtime is None:
+        return False
     
-    # Run dependencies first
     for dep in target["depends"]:
-        if dep in targets:  # Only run if it's a defined target
-            if not run_makefile_target(dep, targets, variables, logger, executed):
-                return False
+        if dep in rebuilt:
+            return False
+        dep_target = targets.get(dep)
+        if dep_target is not None and dep_target.get("phony"):
+            return False
+        dep_mtime = target_mtime(dep)
+        if dep_mtime is None or dep_mtime > mtime:
+            return False
     
-    # Run commands
-    from .progress import create_sub_progress, remove_sub_progress, advance_sub_progress
+    return True
+
+
+def makefile_graph(target_name: str, targets: dict) -> dict[str, list[str]]:
+    """Return {target: [target deps]} for the target and everything it needs, in run order"""
+    graph = {}
+    
+    def visit(name: str, visiting: set):
+        if name in graph or name in visiting or name not in targets:
+            return
+        visiting.add(name)
+        target = targets[name]
+        deps = [dep for dep in target["depends"] + target.get("order_only", []) if dep in targets]
+        for dep in deps:
+            visit(dep, visiting)
+        graph[name] = deps
     
-    cmds = target["commands"]
-    if cmds:
+    visit(target_name, set())
+    return graph
+
+
+def run_target_commands(target_name: str, targets: dict, variables: dict, logger: Logger, parallel: bool = False) -> bool:
+    """Run the commands of a single target (dependencies are not run)"""
+    from .progress import advance_progress, create_sub_progress, remove_sub_progress, advance_sub_progress
+    from .output import print_status
+    from .runner import run_command_with_output, run_command_captured, run_command_quiet
+    
+    cmds = targets[target_name]["commands"]
+    scope = recipe_scope(target_name, targets[target_name], variables)
+    # Sub progress tracks a single target, not meaningful with parallel jobs
+    if cmds and not parallel:
         create_sub_progress(len(cmds), f"{target_name}")
     
     try:
@@ -398,10 +768,15 @@ def run_makefile_target(target_name: str, targets: dict, variables: dict, logger
             is_info = cmd_info.get("is_info", False)
             silent = cmd_info.get("silent", False)
             
-            # Expand Make variables in cmd and desc
-            if cmd:
-                cmd = expand_variables(cmd, variables)
-            desc = expand_variables(desc, variables)
+            # Expand automatic and Make variables in cmd and desc
+            try:
+                if cmd:
+                    cmd = expand_variables(cmd, scope)
+                desc = expand_variables(desc, scope)
+            except ValueError as e:
+                # Self-referencing recursive variable, runaway $(call)
+                print_status("error", f"{target_name}: {e}")
+                return False
             
             if is_info:
                 # Info-only line - only print if not silent
@@ -411,10 +786,10 @@ def run_makefile_target(target_name: str, targets: dict, variables: dict, logger
                 # Run command - silently if @ prefixed
                 if silent:
                     # Silent mode - run without status output
-                    import subprocess
-                    result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-                    logger.log_command_output(desc, cmd, result.stdout + result.stderr, result.returncode == 0)
-                    if result.returncode != 0:
+                    if run_command_quiet(cmd, desc, logger, target_name) != 0:
+                        return False
+                elif parallel:
+                    if not run_command_captured(cmd, desc, False, logger, target_name):
                         return False
                 else:
                     success = run_command_with_output(cmd, desc, False, logger, target_name)
@@ -423,19 +798,72 @@ def run_makefile_target(target_name: str, targets: dict, variables: dict, logger
             
             # Advance progress bars
             advance_progress(1)
-            advance_sub_progress(1)
+            if not parallel:
+                advance_sub_progress(1)
             
     finally:
-        remove_sub_progress()
+        if not parallel:
+            remove_sub_progress()
     
-    executed.add(target_name)
     return True
 
 
-def run_makefile(target_name: str, extra_args: list[str] = None, makefile: str = "Makefile") -> bool:
+def run_makefile_target(target_name: str, targets: dict, variables: dict, logger: Logger, executed: set = None,
+                        jobs: int = 1, keep_going: bool = False) -> bool:
+    """Run a Makefile target with its dependencies, up to `jobs` targets at once"""
+    from .output import print_status
+    from .scheduler import run_graph
+    
+    if executed is None:
+        executed = set()
+    
+    if target_name in executed:
+        return True
+    
+    if target_name not in targets:
+        print_status("error", f"Цель '{target_name}' не найдена в Makefile")
+        return False
+    
+    graph = {
+        name: deps for name, deps in makefile_graph(target_name, targets).items()
+        if name not in executed
+    }
+    parallel = jobs > 1
+    rebuilt = set()
+    
+    def run_node(name: str) -> bool:
+        if is_target_up_to_date(name, targets, rebuilt):
+            from .progress import advance_progress
+            advance_progress(len(targets[name]["commands"]))
+        else:
+            # Only targets that run are timed: up-to-date files would flood the history
+            from .history import task_scope
+            with task_scope(name) as scope:
+                success = run_target_commands(name, targets, variables, logger, parallel)
+                scope.outcome = "ok" if success else "failed"
+            if not success:
+                return False
+            rebuilt.add(name)
+        executed.add(name)
+        return True
+    
+    if not parallel:
+        success = run_graph(graph, run_node, jobs, keep_going)
+    else:
+        from .display import JobBoard
+        with JobBoard():
+            success = run_graph(graph, run_node, jobs, keep_going)
+    
+    if success and not any(targets[name]["commands"] for name in rebuilt):
+        print_status("info", f"Цель '{target_name}' не требует обновления")
+    return success
+
+
+def run_makefile(target_name: str, extra_args: list[str] = None, makefile: str = "Makefile",
+                 jobs: int = 1, keep_going: bool = False) -> bool:
     """Run a target from a Makefile"""
+    from .output import print_status
     from .inline_config import load_config_from_makefile
-    from .progress import create_progress, advance_progress, stop_progress
     
     if not Path(makefile).exists():
         print_status("error", f"Makefile не найден: {makefile}")
@@ -445,7 +873,7 @@ def run_makefile(target_name: str, extra_args: list[str] = None, makefile: str =
     load_config_from_makefile(makefile)
     
     try:
-        targets, variables = parse_makefile(makefile)
+        targets, variables, patterns = read_makefile(makefile)
         
         # Override variables from extra_args (e.g. VERSION=2.0.1)
         if extra_args:
@@ -458,43 +886,45 @@ def run_makefile(target_name: str, extra_args: list[str] = None, makefile: str =
         print_status("error", f"Ошибка парсинга Makefile: {e}")
         return False
     
-    if not targets:
+    if not targets and not len(patterns):
         print_status("warn", "Makefile не содержит целей")
         return True
     
+    # Instantiate pattern rules for every file the target needs
+    expand_pattern_rules(target_name, targets, patterns)
+    
     if target_name not in targets:
         print_status("error", f"Цель '{target_name}' не найдена")
-        print_status("info", f"Доступные цели: {', '.join(targets.keys())}")
+        available = [name for name, target in targets.items() if not target.get("implicit")]
+        print_status("info", f"Доступные цели: {', '.join(available)}")
         return False
     
-    # Count total commands across all targets to be executed
-    def count_commands(name: str, visited: set) -> int:
-        if name in visited or name not in targets:
-            return 0
-        visited.add(name)
-        target = targets[name]
-        count = len(target["commands"])
-        for dep in target["depends"]:
-            count += count_commands(dep, visited)
-        return count
+    return build_makefile_target(target_name, targets, variables, Logger("./vol.log"), jobs, keep_going)
+
+
+def build_makefile_target(target_name: str, targets: dict, variables: dict, logger: Logger,
+                          jobs: int = 1, keep_going: bool = False, executed: set = None) -> bool:
+    """Run a parsed target with progress bars; targets in `executed` are treated as done"""
+    from .progress import create_progress, stop_progress
     
-    visited_targets = set()
-    total_cmds = count_commands(target_name, visited_targets)
+    # Count total commands across all targets to be executed
+    graph = makefile_graph(target_name, targets)
+    total_cmds = sum(len(targets[name]["commands"]) for name in graph if name not in (executed or ()))
     
-    if visited_targets:
-        max_len = max(len(t) for t in visited_targets)
+    if graph:
+        max_len = max(len(t) for t in graph)
         from .output import set_max_task_name_length
         set_max_task_name_length(max_len)
     
-    logger = Logger("./vol.log")
-    
     if total_cmds > 0:
         create_progress(total_cmds, f"make:{target_name}")
     
     try:
-        return run_makefile_target(target_name, targets, variables, logger)
+        return run_makefile_target(target_name, targets, variables, logger, executed, jobs, keep_going)
     finally:
         stop_progress()
+        from .shell_cache import save_shell_cache
+        save_shell_cache()
 
 
 def list_makefile_targets(makefile: str = "Makefile") -> dict[str, dict]:
@@ -503,8 +933,11 @@ def list_makefile_targets(makefile: str = "Makefile") -> dict[str, dict]:
         return {}
     
     try:
-        targets, _ = parse_makefile(makefile)
-        return targets
+        from .parse_cache import cached_parse
+        # Listing never evaluates variables ($(shell ...) may be slow): names stay as written
+        targets = cached_parse("makefile-list", makefile,
+                               lambda: read_makefile_sources(makefile, evaluate=False))[0]
+        return {name: target for name, target in targets.items() if not target.get("implicit")}
     except:
         return {}
 
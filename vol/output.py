@@ -2,6 +2,7 @@
 
 import sys
 from datetime import datetime
+from functools import lru_cache
 from typing import Optional
 
 from rich.console import Console
@@ -9,6 +10,11 @@ from rich.text import Text
 
 console = Console()
 
+
+def reset_console():
+    """Re-detect terminal, size and colors after stdio was replaced (daemon requests)"""
+    console.__init__()
+
 # Status labels
 STATUS_LABELS = {
     "wait": "WAIT",
@@ -46,9 +52,10 @@ def get_status_color(status: str) -> str:
 
 
 def clear_screen():
-    """Clear terminal screen"""
-    import os
-    os.system('clear')
+    """Clear the visible terminal screen without running a process (the scrollback is kept)"""
+    if console.is_terminal:
+        from .terminal import CLEAR_SCREEN, write
+        write(CLEAR_SCREEN)
 
 
 def clear_line():
@@ -65,8 +72,13 @@ def get_terminal_height() -> int:
 def setup_terminal_for_progress():
     """Clear screen and add padding to push content to bottom"""
     from .config import get_ui_config
+    from .ci import is_ci_mode
     ui = get_ui_config()
     
+    # Output in CI mode is a plain stream: no clearing, no padding
+    if is_ci_mode():
+        return
+    
     if ui.clear_screen:
         clear_screen()
     
@@ -74,8 +86,8 @@ def setup_terminal_for_progress():
         height = get_terminal_height()
         padding = height - 1
         if padding > 0:
-            for _ in range(padding):
-                console.print()
+            from .terminal import write
+            write("\n" * padding)
 
 
 # Max length for task name column
@@ -101,19 +113,71 @@ def format_task_name(task_name: str) -> str:
     return f" {padded}"
 
 
-def print_status(status: str, message: str, time_str: Optional[str] = None, task_name: Optional[str] = None):
-    """Print formatted status line: [STATUS] [TIME] [TASK] message"""
-    from .config import get_ui_config
-    ui = get_ui_config()
-    
-    if time_str is None:
-        time_str = datetime.now().strftime("%H:%M:%S")
-    
-    color = get_status_color(status)
-    label = STATUS_LABELS.get(status, status.upper())
-    padding = " " * STATUS_WIDTHS.get(status, 0)
-    
-    from rich.syntax import Syntax
+# Substrings that mark a description as a shell command (highlighted as bash)
+SHELL_INDICATORS = ['echo ', 'sleep ', 'cd ', 'make ', 'mkdir ', 'rm ', 'cp ', 'mv ', 
+                    'cat ', 'grep ', 'sed ', 'awk ', 'find ', 'ls ', 'pwd', 'export ',
+                    'source ', 'pip ', 'python ', 'npm ', 'node ', 'git ', 'docker ',
+                    '|', '&', '>', '<', ';', '$(', '`', '&&', '||']
+
+
+def is_shell_command(text: str) -> bool:
+    """Detect if text is a shell command or plain text description"""
+    return any(ind in text for ind in SHELL_INDICATORS)
+
+
+# Status lines kept rendered (segments and ANSI) for reuse
+RENDER_CACHE_SIZE = 512
+
+
+class StatusLine:
+    """
+    [STATUS] [TIME] [TASK] message, rendered through render_status_line.
+
+    The console, a Live panel redrawing it every frame and the tmp log all
+    reuse one rendering (one syntax highlighting pass) per width and theme.
+    The time changes every second, so lines are rendered with a placeholder
+    of the same width and the time is put in afterwards.
+    """
+
+    def __init__(self, label: str, label_style: str, padding: str, time_str: str,
+                 task_name: Optional[str], message: str):
+        from .config import get_ui_config
+        ui = get_ui_config()
+        self.time_str = time_str if ui.show_time else None
+        # "00:00:00" for "12:34:56"; anything but plain ASCII is rendered as is
+        time_slot = self.time_str
+        if time_slot is not None and time_slot.isascii() and time_slot.isprintable():
+            time_slot = "0" * len(time_slot)
+        self.key = (
+            f"[{label}]" if ui.show_status_label else None, label_style, padding, time_slot,
+            format_task_name(task_name) if ui.show_task_name and task_name else None,
+            message, ui.syntax_theme,
+        )
+
+    def __rich_console__(self, console: Console, options):
+        from rich.segment import Segment
+        new_line = Segment.line()
+        lines = render_status_line(*self.key, options.max_width)[0]
+        for index, line in enumerate(lines):
+            if index == 0 and self.time_str != self.key[3]:
+                # The time is a segment of its own (own style) on the first line
+                slot = f" [{self.key[3]}]"
+                line = [Segment(f" [{self.time_str}]", s.style, s.control) if s.text == slot else s for s in line]
+            yield from line
+            yield new_line
+
+    def ansi(self, width: int) -> str:
+        """The line as ANSI text, as written to a terminal"""
+        text = render_status_line(*self.key, width)[1]
+        if self.time_str != self.key[3]:
+            text = text.replace(f" [{self.key[3]}]", f" [{self.time_str}]", 1)
+        return text
+
+
+@lru_cache(maxsize=RENDER_CACHE_SIZE)
+def render_status_line(label: Optional[str], label_style: str, padding: str, time_str: Optional[str],
+                       task_name: Optional[str], message: str, syntax_theme: str, width: int):
+    """(lines of segments, ANSI text) of a status line; None fields are hidden"""
     from rich.table import Table
     
     grid = Table.grid(padding=(0, 2))
@@ -121,48 +185,81 @@ def print_status(status: str, message: str, time_str: Optional[str] = None, task
     status_text = Text()
     
     # Status label [OK]/[WAIT] etc
-    if ui.show_status_label:
-        status_text.append(f"[{label}]", style=f"bold {color}")
-        status_text.append(f"{padding}", style="dim")
+    if label is not None:
+        status_text.append(label, style=label_style)
+        status_text.append(padding, style="dim")
     
     # Time
-    if ui.show_time:
+    if time_str is not None:
         status_text.append(f" [{time_str}]", style="bold dim")
     
     # Task name
-    if ui.show_task_name and task_name:
-        formatted_task = format_task_name(task_name)
-        status_text.append(formatted_task, style="bold cyan")
+    if task_name is not None:
+        status_text.append(task_name, style="bold cyan")
     
     # Detect if message is a shell command or plain text description
-    shell_indicators = ['echo ', 'sleep ', 'cd ', 'make ', 'mkdir ', 'rm ', 'cp ', 'mv ', 
-                        'cat ', 'grep ', 'sed ', 'awk ', 'find ', 'ls ', 'pwd', 'export ',
-                        'source ', 'pip ', 'python ', 'npm ', 'node ', 'git ', 'docker ',
-                        '|', '&', '>', '<', ';', '$(', '`', '&&', '||']
-    
-    is_shell = any(message.startswith(ind) or ind in message for ind in shell_indicators)
-    
-    if is_shell:
-        syntax = Syntax(message, "bash", theme=ui.syntax_theme, background_color="default", word_wrap=True)
+    if is_shell_command(message):
+        from rich.syntax import Syntax
+        syntax = Syntax(message, "bash", theme=syntax_theme, background_color="default", word_wrap=True)
         grid.add_row(status_text, syntax)
     else:
         status_text.append(f"  {message}", style="bold")
         grid.add_row(status_text)
     
-    console.print(grid)
+    lines = console.render_lines(grid, console.options.update(width=width), pad=False)
+    
+    # ANSI with colors even when stdout is not a terminal (.vol.tmp is replayed on one)
+    from rich.segment import Segment, Segments
+    ansi_console = get_ansi_console()
+    with ansi_console.capture() as capture:
+        # soft_wrap: the lines are laid out already, nothing may be cropped or wrapped again
+        ansi_console.print(Segments([segment for line in lines for segment in line + [Segment.line()]]),
+                           end="", soft_wrap=True)
+    return lines, capture.get().rstrip("\n")
+
+
+# Renders ANSI for .vol.tmp, created on first use
+_ansi_console: Optional[Console] = None
+
+
+def get_ansi_console() -> Console:
+    global _ansi_console
+    if _ansi_console is None:
+        from io import StringIO
+        _ansi_console = Console(file=StringIO(), force_terminal=True)
+    return _ansi_console
+
+
+def print_status(status: str, message: str, time_str: Optional[str] = None, task_name: Optional[str] = None):
+    """Print formatted status line: [STATUS] [TIME] [TASK] message"""
+    from .config import get_ui_config
+    ui = get_ui_config()
+    
+    if time_str is None:
+        time_str = datetime.now().strftime("%H:%M:%S")
+    
+    label = STATUS_LABELS.get(status, status.upper())
+    padding = " " * STATUS_WIDTHS.get(status, 0)
+    
+    # CI mode: plain text, and nothing is kept for redraws
+    from .ci import get_plain_output
+    plain = get_plain_output()
+    if plain is not None:
+        plain.write_lines([plain.status_line(label, padding, time_str, task_name, message)])
+        return
+    
+    color = get_status_color(status)
+    line = StatusLine(label, f"bold {color}", padding, time_str, task_name, message)
+    
+    console.print(line)
     
     # Log static output (non-WAIT statuses) to tmp log for redraw (only in slow mode)
     if status != "wait" and not ui.speed_mode:
         from .tmp_log import get_tmp_log
-        from io import StringIO
-        from rich.console import Console as RichConsole
-        
-        # Capture output with ANSI colors
-        string_io = StringIO()
-        temp_console = RichConsole(file=string_io, force_terminal=True, width=console.width)
-        temp_console.print(grid)
-        ansi_line = string_io.getvalue().rstrip('\n')
-        get_tmp_log().add_line(ansi_line)
+        from .terminal import note_static_line
+        tmp_log = get_tmp_log()
+        note_static_line(len(tmp_log.lines))
+        tmp_log.add_line(line.ansi(console.width))
 
 
 
@@ -189,49 +286,44 @@ def print_error_footer():
 
 
 
-def redraw_from_tmp_log():
-    """Clear screen and redraw static output from .vol.tmp file.
+def redraw_from_tmp_log(skip_if_synced: bool = False):
+    """Redraw static output from .vol.tmp file over the visible screen.
     
     This is called when opening/closing command output panels to
     restore the static output (OK/ERROR lines) from the tmp log.
+    Only the lines that fit on the screen are replayed, in a single
+    write that repaints the screen in place: earlier output stays in the
+    terminal's scrollback. With skip_if_synced nothing is drawn if the
+    screen already shows the log (only status lines were printed since
+    the last redraw).
     """
     from .config import get_ui_config
     from .tmp_log import get_tmp_log
+    from .terminal import last_rows, repaint, write, mark_synced, is_synced
     
     ui = get_ui_config()
-    tmp_log = get_tmp_log()
+    lines = get_tmp_log().lines
+    if skip_if_synced and is_synced(len(lines)):
+        return
     
-    # Read lines from tmp log
-    lines = tmp_log.get_lines()
-    
-    # Clear screen first
-    if ui.clear_screen:
-        clear_screen()
-    
-    # Calculate content height including header (3 lines if shown)
-    header_height = 3 if ui.show_header else 0
-    content_height = len(lines) + header_height
-    
-    # For bottom_up mode, add padding to push content to bottom of screen
-    height = get_terminal_height()
-    padding = max(0, height - content_height - 1)
-    
-    # Print padding lines first
-    if padding > 0:
-        sys.stdout.write("\n" * padding)
-        sys.stdout.flush()
-    
-    # Print header after padding
+    # Header (3 rows if shown) and saved lines, of which only the last screenful is visible
+    rows = []
     if ui.show_header:
-        console.print()
-        console.print(f"[bold]{ui.header_text}[/bold]", style=ui.theme.header)
-        console.print()
+        with console.capture() as capture:
+            console.print(f"[bold]{ui.header_text}[/bold]", style=ui.theme.header)
+        rows = ["", capture.get().rstrip("\n"), ""]
+    height = get_terminal_height()
+    rows = last_rows(rows + lines, max(0, height - 1))
+    content_height = sum(row.count("\n") + 1 for row in rows)
     
-    # Print all saved lines with ANSI colors preserved
-    for line in lines:
-        # Lines already contain ANSI codes, use sys.stdout directly
-        sys.stdout.write(line + "\n")
-    sys.stdout.flush()
+    # For bottom_up mode, content starts below padding so it ends at the bottom of the screen
+    padding = max(0, height - content_height - 1)
+    # Lines already contain ANSI codes
+    if ui.clear_screen and console.is_terminal:
+        write(repaint([""] * padding + rows))
+    else:
+        write("\n" * padding + "".join(row + "\n" for row in rows))
+    mark_synced(len(lines))
 
 
 def log_static_output(line: str):
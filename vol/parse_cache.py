@@ -0,0 +1,195 @@
+"""Cache of parsed Makefiles, vol.toml files and scripts, invalidated when their files change"""
+
+import os
+from typing import Any, Callable, Optional
+
+# {(kind, path): (stamps, result)}; None until the daemon enables it.
+# Callers may mutate what they get back, so results are only cached in a
+# process that hands them to forked children (copy-on-write keeps them intact).
+_memory: Optional[dict] = None
+
+
+# Bumped when the layout of cached results changes
+CACHE_FORMAT = 1
+
+# A source that is never fresh: the result depends on something other than
+# files ($(shell ...) output), so it is neither reused nor written to disk
+VOLATILE = "<volatile>"
+
+# Sources starting with this are glob patterns, stamped by the files they match
+GLOB_PREFIX = "glob:"
+
+# Files modified this recently may change again within the same mtime tick
+# (coarse filesystem timestamps), so results built from them are not stored
+RACY_WINDOW_NS = 2_000_000_000
+
+
+# {source: stamp} of the results cached_parse hands out while recorded_stamps() runs
+_recorded: Optional[dict] = None
+
+
+def enable_memory_cache():
+    """Keep parse results in memory for the lifetime of the process (daemon)"""
+    global _memory
+    if _memory is None:
+        _memory = {}
+
+
+def file_stamp(path: str) -> Optional[tuple[int, int]]:
+    """(mtime_ns, size) of a file or directory, None if it does not exist"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def source_stamp(source: str):
+    """Stamp of a source: file_stamp(), or the sorted matches of a glob pattern"""
+    if source.startswith(GLOB_PREFIX):
+        import glob
+        return tuple(sorted(glob.glob(source[len(GLOB_PREFIX):])))
+    return file_stamp(source)
+
+
+def absolute_source(source: str) -> str:
+    if source == VOLATILE:
+        return source
+    if source.startswith(GLOB_PREFIX):
+        return GLOB_PREFIX + os.path.abspath(source[len(GLOB_PREFIX):])
+    return os.path.abspath(source)
+
+
+def cache_version() -> str:
+    """Results pickled by another vol or cache format are ignored"""
+    import sys
+    from . import __version__
+    return f"{CACHE_FORMAT}:{__version__}:{sys.version_info[0]}.{sys.version_info[1]}"
+
+
+def disk_dir() -> str:
+    """
+    Pickled parse results survive between runs in the per-user cache,
+    ~/.cache/vol/parse (or $XDG_CACHE_HOME/vol/parse, next to the artifact
+    store): never in the project, where anyone who can write a file could
+    make vol unpickle it.
+    """
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "vol", "parse")
+
+
+def disk_path(kind: str, abspath: str) -> str:
+    import hashlib
+    digest = hashlib.sha1(abspath.encode("utf-8", "surrogateescape")).hexdigest()[:24]
+    return os.path.join(disk_dir(), f"{kind}-{digest}.pickle")
+
+
+def is_fresh(stamps: list) -> bool:
+    return all(p != VOLATILE and source_stamp(p) == stamp for p, stamp in stamps)
+
+
+def load_from_disk(kind: str, abspath: str) -> Optional[tuple[list, Any]]:
+    """(stamps, result) stored by an earlier run, None if missing, stale or unreadable"""
+    import pickle
+    try:
+        with open(disk_path(kind, abspath), "rb") as f:
+            # Only files this user wrote and nobody else can change are unpickled
+            st = os.fstat(f.fileno())
+            if st.st_uid != os.getuid() or st.st_mode & 0o022:
+                return None
+            entry = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception:
+        # Truncated or written by an incompatible vol: parse again and overwrite
+        return None
+    if not isinstance(entry, dict) or entry.get("version") != cache_version() or entry.get("path") != abspath:
+        return None
+    if not is_fresh(entry["stamps"]):
+        return None
+    return entry["stamps"], entry["result"]
+
+
+def store_on_disk(kind: str, abspath: str, stamps: list, result: Any, started_ns: int):
+    """Pickle a result atomically; skipped when it can't be trusted or written"""
+    import pickle
+    for path, stamp in stamps:
+        if path == VOLATILE:
+            return
+        if stamp is not None and not path.startswith(GLOB_PREFIX) and stamp[0] >= started_ns - RACY_WINDOW_NS:
+            return
+    entry = {"version": cache_version(), "path": abspath, "stamps": stamps, "result": result}
+    target = disk_path(kind, abspath)
+    tmp = f"{target}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(disk_dir(), mode=0o700, exist_ok=True)
+        with open(os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600), "wb") as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, target)
+    except Exception:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+
+
+def recorded_stamps(build: Callable[[], Any]) -> tuple[Any, dict]:
+    """
+    build()'s result and {source: stamp} of every parse result it used,
+    for results derived from them (the completion index)
+    """
+    global _recorded
+    _recorded = {}
+    try:
+        return build(), _recorded
+    finally:
+        _recorded = None
+
+
+def hand_out(stamps: list, result: Any) -> Any:
+    if _recorded is not None:
+        _recorded.update(stamps)
+    return result
+
+
+def cached_parse(kind: str, path: str, parse: Callable[[], tuple[Any, set]]) -> Any:
+    """
+    Return parse()'s result, reusing the cached one while the files it was
+    built from are unchanged.
+
+    parse() returns (result, sources): the files and directories whose
+    changes invalidate the result (the parsed file itself, includes,
+    GLOB_PREFIX patterns used by $(wildcard), ...). A result with VOLATILE among
+    its sources is never reused.
+
+    Results are looked up in memory (daemon only), then in disk_dir(),
+    keyed by path, size, mtime and vol version.
+    """
+    import time
+
+    abspath = os.path.abspath(path)
+    key = (kind, abspath)
+    if _memory is not None:
+        cached = _memory.get(key)
+        if cached is not None and is_fresh(cached[0]):
+            return hand_out(*cached)
+
+    if not os.environ.get("VOL_NO_PARSE_CACHE"):
+        cached = load_from_disk(kind, abspath)
+        if cached is not None:
+            if _memory is not None:
+                _memory[key] = cached
+            return hand_out(*cached)
+
+    # Stamp before parsing so a change made during the parse is not missed
+    started_ns = time.time_ns()
+    before = file_stamp(path)
+    result, sources = parse()
+    stamps = [(source, source_stamp(source)) for source in map(absolute_source, sources)]
+    stamps.append((abspath, before))
+
+    if before is not None and not os.environ.get("VOL_NO_PARSE_CACHE"):
+        store_on_disk(kind, abspath, stamps, result, started_ns)
+    if _memory is not None:
+        _memory[key] = (stamps, result)
+    return hand_out(stamps, result)
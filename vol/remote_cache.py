@@ -0,0 +1,342 @@
+"""Shared remote cache for task outputs (GET/PUT by digest over HTTP)"""
+
+import os
+import re
+import gzip
+import json
+import time
+import queue
+import atexit
+import hashlib
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Optional
+
+# Keys: task fingerprints (ac/) and object names (cas/, "x" suffix = executable)
+KEY_RE = re.compile(r'^[0-9a-f]{64}x?$')
+KINDS = ("ac", "cas")
+
+# Network timeout for every request (seconds)
+REQUEST_TIMEOUT_S = 2.0
+
+# Pending uploads; when the queue is full new uploads are dropped
+MAX_PENDING_UPLOADS = 64
+
+# How long vol waits at exit for queued uploads to finish
+FLUSH_TIMEOUT_S = 30.0
+
+
+class CacheBackend(ABC):
+    """Storage for cache blobs. kind is "ac" (entries) or "cas" (objects)."""
+
+    @abstractmethod
+    def get(self, kind: str, key: str) -> Optional[bytes]:
+        """The blob, None if the backend does not have it"""
+
+    def has(self, kind: str, key: str) -> bool:
+        return self.get(kind, key) is not None
+
+    @abstractmethod
+    def put(self, kind: str, key: str, data: bytes):
+        """Store a blob (overwriting is harmless: keys name their content)"""
+
+
+class DirectoryCacheBackend(CacheBackend):
+    """Blobs stored gzip-compressed in a directory (file:// URLs, and the reference server)"""
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+
+    def path(self, kind: str, key: str) -> Path:
+        if kind not in KINDS or not KEY_RE.match(key):
+            raise ValueError(f"bad cache key: {kind}/{key}")
+        return self.root / kind / key[:2] / key
+
+    def get_compressed(self, kind: str, key: str) -> Optional[bytes]:
+        try:
+            return self.path(kind, key).read_bytes()
+        except OSError:
+            return None
+
+    def get(self, kind: str, key: str) -> Optional[bytes]:
+        data = self.get_compressed(kind, key)
+        return gzip.decompress(data) if data is not None else None
+
+    def has(self, kind: str, key: str) -> bool:
+        return self.path(kind, key).exists()
+
+    def put_compressed(self, kind: str, key: str, data: bytes):
+        path = self.path(kind, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+
+    def put(self, kind: str, key: str, data: bytes):
+        self.put_compressed(kind, key, gzip.compress(data, compresslevel=1))
+
+
+class HttpCacheBackend(CacheBackend):
+    """GET/HEAD/PUT {url}/{kind}/{key}, bodies gzip-compressed"""
+
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+
+    def _request(self, method: str, kind: str, key: str, data: bytes = None):
+        import urllib.request
+        headers = {"Accept-Encoding": "gzip"}
+        if data is not None:
+            headers["Content-Encoding"] = "gzip"
+            headers["Content-Type"] = "application/octet-stream"
+        request = urllib.request.Request(f"{self.url}/{kind}/{key}", data=data, method=method, headers=headers)
+        return urllib.request.urlopen(request, timeout=REQUEST_TIMEOUT_S)
+
+    def get(self, kind: str, key: str) -> Optional[bytes]:
+        import urllib.error
+        try:
+            with self._request("GET", kind, key) as response:
+                body = response.read()
+                if response.headers.get("Content-Encoding") == "gzip":
+                    body = gzip.decompress(body)
+                return body
+        except urllib.error.HTTPError as e:
+            if e.code == 404:
+                return None
+            raise
+
+    def has(self, kind: str, key: str) -> bool:
+        import urllib.error
+        try:
+            with self._request("HEAD", kind, key):
+                return True
+        except urllib.error.HTTPError as e:
+            if e.code == 404:
+                return False
+            raise
+
+    def put(self, kind: str, key: str, data: bytes):
+        with self._request("PUT", kind, key, gzip.compress(data, compresslevel=1)):
+            pass
+
+
+# URL scheme -> backend class
+BACKENDS = {
+    "http": HttpCacheBackend,
+    "https": HttpCacheBackend,
+}
+
+
+def create_backend(url: str) -> CacheBackend:
+    """Create a cache backend from a URL (http://, https://, file://)"""
+    scheme = url.split("://", 1)[0] if "://" in url else ""
+    if scheme == "file":
+        return DirectoryCacheBackend(url[len("file://"):])
+    if scheme not in BACKENDS:
+        raise ValueError(f"unsupported remote cache URL: {url}")
+    return BACKENDS[scheme](url)
+
+
+class RemoteCache:
+    """Remote cache in front of the local ArtifactStore.
+
+    Downloads happen on a local miss with a short timeout; the first
+    network error disables the remote for the rest of the run so a dead
+    server costs at most one timeout. Uploads go through a bounded queue
+    drained by a background thread and never wait on the build.
+    """
+
+    def __init__(self, backend: CacheBackend, push: bool = True):
+        self.backend = backend
+        self.push = push
+        self.disabled = False
+        self._queue: queue.Queue = queue.Queue(maxsize=MAX_PENDING_UPLOADS)
+        self._thread: Optional[threading.Thread] = None
+        # The error that disabled the remote, until report() prints it
+        self._error: Optional[Exception] = None
+
+    def _fail(self, error: Exception):
+        # No printing here: the upload thread would write over the live panel
+        if not self.disabled:
+            self._error = error
+            self.disabled = True
+
+    def report(self):
+        """Print the error that disabled the remote, once (from threads that print statuses)"""
+        error, self._error = self._error, None
+        if error is not None:
+            from .output import print_status
+            print_status("warn", f"Удалённый кэш недоступен: {error}")
+
+    def fetch(self, store, fingerprint: str) -> bool:
+        """Download an entry and its missing objects into the local store"""
+        if self.disabled:
+            return False
+        try:
+            entry = self.backend.get("ac", fingerprint)
+            if entry is None:
+                return False
+            from .artifacts import parse_entry
+            try:
+                # Names and paths are checked before anything is written
+                files = parse_entry(entry)["files"]
+            except ValueError:
+                return False
+            for _, name in files:
+                obj = store.object_path(name)
+                if obj.exists():
+                    continue
+                data = self.backend.get("cas", name)
+                if data is None or hashlib.sha256(data).hexdigest() != name[:64]:
+                    return False
+                obj.parent.mkdir(parents=True, exist_ok=True)
+                tmp = obj.with_name(f"{obj.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+                tmp.write_bytes(data)
+                os.chmod(tmp, 0o555 if name.endswith("x") else 0o444)
+                os.replace(tmp, obj)
+            store.put_entry(fingerprint, entry)
+            return True
+        except Exception as e:
+            self._fail(e)
+            self.report()
+            return False
+
+    def upload(self, store, fingerprint: str):
+        """Queue an entry and its objects for upload (dropped if the queue is full)"""
+        if self.disabled or not self.push:
+            return
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._worker, args=(store,), daemon=True)
+            self._thread.start()
+            atexit.register(self.flush)
+        try:
+            self._queue.put_nowait(fingerprint)
+        except queue.Full:
+            pass
+
+    def _worker(self, store):
+        while True:
+            fingerprint = self._queue.get()
+            try:
+                if not self.disabled:
+                    self._upload_now(store, fingerprint)
+            except FileNotFoundError:
+                # Evicted from the local store before it could be uploaded
+                pass
+            except Exception as e:
+                self._fail(e)
+            finally:
+                self._queue.task_done()
+
+    def _upload_now(self, store, fingerprint: str):
+        entry = store.entry_path(fingerprint).read_bytes()
+        # Objects first, so a visible entry never points at missing objects
+        for _, name in json.loads(entry)["files"]:
+            if not self.backend.has("cas", name):
+                self.backend.put("cas", name, store.object_path(name).read_bytes())
+        self.backend.put("ac", fingerprint, entry)
+
+    def flush(self, timeout: float = FLUSH_TIMEOUT_S):
+        """Wait (bounded) for queued uploads to finish, then report an upload failure"""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline and not self.disabled:
+            time.sleep(0.05)
+        self.report()
+
+
+def create_remote_cache() -> Optional[RemoteCache]:
+    """Remote cache from $VOL_REMOTE_CACHE or the remote_cache config option"""
+    from .config import get_ui_config
+    ui = get_ui_config()
+    url = os.environ.get("VOL_REMOTE_CACHE") or ui.remote_cache
+    if not url:
+        return None
+    try:
+        return RemoteCache(create_backend(url), push=ui.remote_cache_push)
+    except ValueError as e:
+        from .output import print_status
+        print_status("warn", str(e))
+        return None
+
+
+def serve(directory: str, host: str = "127.0.0.1", port: int = 8765):
+    """Run the reference cache server (blocking)"""
+    from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+    backend = DirectoryCacheBackend(directory)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _key(self):
+            parts = self.path.strip("/").split("/")
+            if len(parts) != 2 or parts[0] not in KINDS or not KEY_RE.match(parts[1]):
+                self.send_error(400)
+                return None
+            return parts[0], parts[1]
+
+        def _send(self, code: int, body: bytes = b"", gzipped: bool = False, head: bool = False):
+            self.send_response(code)
+            self.send_header("Content-Length", str(len(body)))
+            if gzipped:
+                self.send_header("Content-Encoding", "gzip")
+            self.end_headers()
+            if not head:
+                self.wfile.write(body)
+
+        def do_GET(self, head: bool = False):
+            key = self._key()
+            if key is None:
+                return
+            data = backend.get_compressed(*key)
+            if data is None:
+                self._send(404, head=head)
+            elif "gzip" in self.headers.get("Accept-Encoding", ""):
+                self._send(200, data, gzipped=True, head=head)
+            else:
+                self._send(200, gzip.decompress(data), head=head)
+
+        def do_HEAD(self):
+            self.do_GET(head=True)
+
+        def do_PUT(self):
+            key = self._key()
+            if key is None:
+                return
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            try:
+                raw = gzip.decompress(body) if self.headers.get("Content-Encoding") == "gzip" else body
+            except (OSError, EOFError):
+                self._send(400)
+                return
+            kind, name = key
+            # Objects are content-addressed: reject bodies that don't match the key
+            if kind == "cas" and hashlib.sha256(raw).hexdigest() != name[:64]:
+                self._send(400)
+                return
+            # Entries must be well-formed, with paths inside the project and digest object names
+            if kind == "ac":
+                from .artifacts import parse_entry
+                try:
+                    parse_entry(raw)
+                except ValueError:
+                    self._send(400)
+                    return
+            if kind == "cas" and backend.has(kind, name):
+                self._send(204)
+                return
+            backend.put_compressed(kind, name, gzip.compress(raw, compresslevel=1) if raw is body else body)
+            self._send(201)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    from .output import print_status
+    print_status("info", f"Кэш-сервер: http://{host}:{server.server_port} ({directory})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
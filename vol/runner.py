@@ -1,18 +1,82 @@
 """Command execution and task running"""
 
 import os
-import sys
-import subprocess
+import time
+import threading
+from collections import deque
 from datetime import datetime
 
-from rich.panel import Panel
 from rich.live import Live
-from rich import box
 
-from .output import console, print_status
+from .output import console, print_status, STATUS_LABELS, STATUS_WIDTHS
 from .buffer import OutputBuffer
-from .logger import Logger
+from .logger import Logger, CommandOutput
 from .config import VolConfig, expand_env_vars
+from .fingerprint import is_cacheable, get_fingerprint_store, get_task_fields, expand_globs, outputs_exist
+from .artifacts import get_artifact_store
+from .history import record_command, task_scope, current_task
+from .ci import get_plain_output
+from .engine import Usage
+from .summary import get_summary, CommandStats
+from .display import build_command_header, build_output_panel, build_progress_bars, get_job_board, FRAMES_PER_SECOND
+
+
+def new_output_buffer() -> OutputBuffer:
+    """Buffer sized to the output panel"""
+    from .config import get_ui_config
+    ui_config = get_ui_config()
+    panel_width = ui_config.panel_width
+    # Account for panel border (2 chars each side) and padding
+    content_width = panel_width - 6 if panel_width > 6 else panel_width
+    return OutputBuffer(
+        max_lines=ui_config.panel_height,
+        max_width=content_width,
+        wrap_lines=ui_config.wrap_lines
+    )
+
+
+# Keeps a failed command's output right under its status line when jobs run in parallel
+_report_lock = threading.Lock()
+
+
+def report_result(return_code: int, description: str, ignore_errors: bool, start_time: str, task_name: str = None,
+                  output: CommandOutput = None) -> bool:
+    """
+    Print the final status line of a command. Returns True if the build may continue.
+    A failed command's last lines of output are shown under it (its live panel is gone).
+    """
+    with _report_lock:
+        if return_code == 0:
+            print_status("ok", description, start_time, task_name)
+            return True
+        if ignore_errors:
+            print_status("warn", f"{description} (код {return_code})", start_time, task_name)
+            return True
+        print_status("error", f"{description} (код {return_code})", start_time, task_name)
+        tail = output.tail_text() if output is not None else ""
+        plain = get_plain_output()
+        if tail and plain is not None:
+            # Streamed already, repeated because it is folded away in the CI log
+            from .config import get_ui_config
+            prefix = plain.prefix(task_name or current_task())
+            plain.write_lines([prefix + line for line in tail.split("\n")[-get_ui_config().panel_height:]])
+        elif tail:
+            from .terminal import mark_dirty
+            buffer = new_output_buffer()
+            buffer.add_lines(tail.split("\n"))
+            console.print(build_output_panel(buffer))
+            mark_dirty()
+        return False
+
+
+def record_result(task_name: str, description: str, cmd: str, started: float, return_code: int,
+                  output: CommandOutput, usage: Usage):
+    """Record a finished command in the run history and the build summary"""
+    duration = time.time() - started
+    record_command(task_name, description, cmd, started, duration, return_code, output.size, usage)
+    summary = get_summary()
+    if summary is not None:
+        summary.add(CommandStats(task_name or current_task(), description, started, duration, return_code, usage))
 
 
 def run_command_with_output(cmd: str, description: str, ignore_errors: bool, logger: Logger, task_name: str = None) -> bool:
@@ -21,257 +85,103 @@ def run_command_with_output(cmd: str, description: str, ignore_errors: bool, log
     Shows Live display only if command takes longer than 100ms.
     Returns True if successful.
     """
-    import time
+    from concurrent.futures import TimeoutError as FutureTimeout
     from rich.console import Group
     from rich.text import Text
     from .progress import get_progress
     from .config import get_ui_config
+    from .engine import get_engine
+    
+    if get_plain_output() is not None:
+        return run_command_streamed(cmd, description, ignore_errors, logger, task_name, group=True)
     
     ui_config = get_ui_config()
     
     start_time = datetime.now().strftime("%H:%M:%S")
-    start_timestamp = time.time()
-    PANEL_WIDTH = ui_config.panel_width
-    # Account for panel border (2 chars each side) and padding
-    content_width = PANEL_WIDTH - 6 if PANEL_WIDTH > 6 else PANEL_WIDTH
-    buffer = OutputBuffer(
-        max_lines=ui_config.panel_height,
-        max_width=content_width,
-        wrap_lines=ui_config.wrap_lines
-    )
+    buffer = new_output_buffer()
     DELAY_MS = ui_config.delay_ms
     
     # Expand environment variables in command  
     cmd = expand_env_vars(cmd)
+    started = time.time()
     
     try:
-        process = subprocess.Popen(
-            cmd,
-            shell=True,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            text=True,
-            encoding="utf-8",
-            errors="replace",
-        )
+        # Lines arrive on the engine thread and go straight to the log sink
+        # (a full pipe slows the child, not vol's memory); only as many as the
+        # panel can show wait for the next frame
+        output = logger.output_sink()
+        pending = deque(maxlen=buffer.max_lines)
         
-        full_output = []
-        progress = get_progress()
-        
-        # Create description header
-        from .output import STATUS_WIDTHS
-        from rich.table import Table
-        from rich.syntax import Syntax
-        
-        padding = " " * STATUS_WIDTHS.get("wait", 0)
-        
-        desc_grid = Table.grid(padding=(0, 2))
-        
-        status_text = Text()
-        
-        # Status label
-        if ui_config.show_status_label:
-            status_text.append("[WAIT]", style="bold blue")
-            status_text.append(f"{padding}", style="dim")
+        def on_line(line: str):
+            output.add(line)
+            pending.append(line)
         
-        # Time
-        if ui_config.show_time:
-            status_text.append(f" [{start_time}]", style="bold dim")
+        future = get_engine().submit(cmd, on_line)
         
-        # Task name
-        if ui_config.show_task_name and task_name:
-             from .output import format_task_name
-             formatted_task = format_task_name(task_name)
-             status_text.append(formatted_task, style="bold cyan")
+        def drain():
+            buffer.add_lines([pending.popleft() for _ in range(len(pending))])
         
-        # Detect if description is a shell command or plain text
-        shell_indicators = ['echo ', 'sleep ', 'cd ', 'make ', 'mkdir ', 'rm ', 'cp ', 'mv ', 
-                            'cat ', 'grep ', 'sed ', 'awk ', 'find ', 'ls ', 'pwd', 'export ',
-                            'source ', 'pip ', 'python ', 'npm ', 'node ', 'git ', 'docker ',
-                            '|', '&', '>', '<', ';', '$(', '`', '&&', '||']
+        progress = get_progress()
         
-        is_shell = any(description.startswith(ind) or ind in description for ind in shell_indicators)
+        # Create description header
+        desc_grid = build_command_header(description, start_time, task_name)
         
-        if is_shell:
-            cmd_syntax = Syntax(description, "bash", theme=ui_config.syntax_theme, background_color="default", word_wrap=True)
-            desc_grid.add_row(status_text, cmd_syntax)
-        else:
-            status_text.append(f"  {description}", style="bold")
-            desc_grid.add_row(status_text)
+        def render() -> Group:
+            components = [desc_grid]
+            
+            # Only add panel if there's output
+            if buffer.line_count() > 0:
+                components.append(build_output_panel(buffer))
+            
+            # Add progress bar if active
+            progress_table = build_progress_bars()
+            if progress_table is not None:
+                components.append(progress_table)
+            
+            # Add clear to end of screen
+            components.append(Text("\033[J"))
+            return Group(*components)
         
         # Wait for DELAY_MS to see if command finishes quickly
-        while (time.time() - start_timestamp) * 1000 < DELAY_MS:
-            if process.poll() is not None:
-                break
-            time.sleep(0.01)
-        
-        # Collect any output that came during wait using select
-        import select
-        
-        while True:
-            # Check if there's data to read (timeout=0 for non-blocking)
-            readable, _, _ = select.select([process.stdout], [], [], 0)
-            if not readable:
-                break
-            line = process.stdout.readline()
-            if not line:
-                break
-            full_output.append(line)
-            buffer.add_line(line)
+        try:
+            future.result(timeout=DELAY_MS / 1000)
+        except FutureTimeout:
+            pass
+        drain()
         
         # If process still running OR progress bar is active, use Live display
-        if process.poll() is None or progress is not None:
+        if not future.done() or progress is not None:
             # In slow mode, redraw static output before showing Live panel
+            # (unless only status lines were printed since the last panel closed)
             from .output import redraw_from_tmp_log
             if not ui_config.speed_mode:
-                redraw_from_tmp_log()
+                redraw_from_tmp_log(skip_if_synced=True)
             
-            with Live(console=console, refresh_per_second=15, transient=True) as live:
-                # Build initial components with panel if any output already
-                initial_components = [desc_grid]
-
-                
-                if buffer.line_count() > 0:
-                    panel = Panel(
-                        buffer.get_display(),
-                        box=box.ROUNDED,
-                        border_style=ui_config.theme.panel_border,
-                        padding=(0, 1),
-                        width=PANEL_WIDTH,
-                    )
-                    initial_components.append(panel)
-                
-                if progress is not None:
-                    from rich.table import Table
-                    progress_table = Table.grid(padding=(0, 2))
-                    bar_width = 15
-                    
-                    row = []
-                    tasks = progress.tasks
-                    theme = ui_config.theme
-                    
-                    # Build list of (task, color, show) tuples
-                    bars_to_show = []
-                    if len(tasks) > 1:
-                        # Sub bar first (index 1), then Main bar (index 0)
-                        if ui_config.show_sub_progress:
-                            bars_to_show.append((tasks[1], theme.sub_bar))
-                        if ui_config.show_main_progress:
-                            bars_to_show.append((tasks[0], theme.main_bar))
-                    else:
-                        if ui_config.show_main_progress:
-                            bars_to_show.append((tasks[0], theme.main_bar))
-                        
-                    for task, color in bars_to_show:
-                        completed = task.completed
-                        total = task.total or 1
-                        percentage = completed / total
-                        filled = int(bar_width * percentage)
-                        empty = bar_width - filled
-                        bar_str = f"[{color}]{'━' * filled}[/{color}][dim]{'━' * empty}[/dim]"
-                        row.append(bar_str)
-                        row.append(f" {int(completed)}/{int(total)}")
-                    
-                    if row:
-                        progress_table.add_row(*row)
-                        initial_components.append(progress_table)
-                initial_components.append(Text("\033[J"))
-                live.update(Group(*initial_components))
+            # The engine thread keeps emptying the pipe into `pending`; this loop
+            # only draws, one frame per interval however fast the child writes
+            frame_interval = 1 / FRAMES_PER_SECOND
+            with Live(console=console, auto_refresh=False, transient=True) as live:
+                live.update(render(), refresh=True)
                 
                 while True:
-                    # Non-blocking read
-                    readable, _, _ = select.select([process.stdout], [], [], 0.05)
-                    
-                    if readable:
-                        line = process.stdout.readline()
-                        if line:
-                            full_output.append(line)
-                            buffer.add_line(line)
-                        else:
-                            # EOF
-                            break
-                    else:
-                        if process.poll() is not None:
-                            break
-                    
-                    # Build display components
-                    components = [desc_grid]
-                    
-                    # Only add panel if there's output
-                    if buffer.line_count() > 0:
-                        panel = Panel(
-                            buffer.get_display(),
-                            box=box.ROUNDED,
-                            border_style=ui_config.theme.panel_border,
-                            padding=(0, 1),
-                            width=PANEL_WIDTH,
-                        )
-                        components.append(panel)
-                    
-                    # Add progress bar if active
-                    if progress is not None:
-                        from rich.table import Table
-                        progress_table = Table.grid(padding=(0, 2))
-                        bar_width = 15
-                        
-                        row = []
-                        tasks = progress.tasks
-                        theme = ui_config.theme
-                        
-                        bars_to_show = []
-                        if len(tasks) > 1:
-                            if ui_config.show_sub_progress:
-                                bars_to_show.append((tasks[1], theme.sub_bar))
-                            if ui_config.show_main_progress:
-                                bars_to_show.append((tasks[0], theme.main_bar))
-                        else:
-                            if ui_config.show_main_progress:
-                                bars_to_show.append((tasks[0], theme.main_bar))
-                            
-                        for task, color in bars_to_show:
-                            completed = task.completed
-                            total = task.total or 1
-                            percentage = completed / total
-                            filled = int(bar_width * percentage)
-                            empty = bar_width - filled
-                            bar_str = f"[{color}]{'━' * filled}[/{color}][dim]{'━' * empty}[/dim]"
-                            row.append(bar_str)
-                            row.append(f" {int(completed)}/{int(total)}")
-                        
-                        if row:
-                            progress_table.add_row(*row)
-                            components.append(progress_table)
-                    
-                    # Add clear to end of screen
-                    components.append(Text("\033[J"))
-                    display = Group(*components)
-                    live.update(display)
+                    try:
+                        future.result(timeout=frame_interval)
+                        break
+                    except FutureTimeout:
+                        pass
+                    drain()
+                    live.update(render(), refresh=True)
             # Live handles cleanup with transient=True
             # In slow mode, redraw static output after Live panel closes
             if not ui_config.speed_mode:
                 redraw_from_tmp_log()
-
-        else:
-            # Process finished quickly, just read remaining output
-            for line in process.stdout:
-                full_output.append(line)
-                buffer.add_line(line)
-        
-        return_code = process.wait()
-        output_text = "".join(full_output)
         
-        logger.log_command_output(description, cmd, output_text, return_code == 0)
+        return_code, usage = future.result()
+        drain()
+        output.finish(description, cmd, return_code == 0)
+        record_result(task_name, description, cmd, started, return_code, output, usage)
         
-        if return_code == 0:
-            print_status("ok", description, start_time, task_name)
-            return True
-        else:
-            if ignore_errors:
-                print_status("warn", f"{description} (код {return_code})", start_time, task_name)
-                return True
-            else:
-                print_status("error", f"{description} (код {return_code})", start_time, task_name)
-                return False
+        return report_result(return_code, description, ignore_errors, start_time, task_name, output)
                 
     except Exception as e:
         logger.log(f"EXCEPTION: {description} - {e}")
@@ -279,16 +189,121 @@ def run_command_with_output(cmd: str, description: str, ignore_errors: bool, log
         return False
 
 
+def run_command_captured(cmd: str, description: str, ignore_errors: bool, logger: Logger, task_name: str = None) -> bool:
+    """
+    Run command without its own live panel (used for parallel jobs).
+    Output goes to the active job board, if any, and to the log.
+    Safe to call from several threads at once.
+    Returns True if successful.
+    """
+    from .engine import get_engine
+    
+    if get_plain_output() is not None:
+        return run_command_streamed(cmd, description, ignore_errors, logger, task_name, group=False)
+    
+    start_time = datetime.now().strftime("%H:%M:%S")
+    cmd = expand_env_vars(cmd)
+    started = time.time()
+    board = get_job_board()
+    job_id = board.add_job(description, start_time, task_name) if board else None
+    
+    output = logger.output_sink()
+    
+    def on_line(line: str):
+        output.add(line)
+        if board:
+            board.add_line(job_id, line)
+    
+    try:
+        return_code, usage = get_engine().submit(cmd, on_line).result()
+        
+        if board:
+            board.remove_job(job_id)
+        output.finish(description, cmd, return_code == 0)
+        record_result(task_name, description, cmd, started, return_code, output, usage)
+        
+        return report_result(return_code, description, ignore_errors, start_time, task_name, output)
+    
+    except Exception as e:
+        if board:
+            board.remove_job(job_id)
+        logger.log(f"EXCEPTION: {description} - {e}")
+        print_status("error", f"{description} ({e})", start_time, task_name)
+        return False
+
+
+def run_command_streamed(cmd: str, description: str, ignore_errors: bool, logger: Logger, task_name: str = None,
+                         group: bool = True) -> bool:
+    """
+    Run command in CI mode: output streams to stdout line by line as
+    `[task] line`, inside a collapsible group if `group` and the CI
+    service supports one. No Live panel, no screen control, no tmp log.
+    Safe to call from several threads at once (group=False for parallel jobs).
+    Returns True if successful.
+    """
+    from .engine import get_engine
+    
+    plain = get_plain_output()
+    start_time = datetime.now().strftime("%H:%M:%S")
+    cmd = expand_env_vars(cmd)
+    started = time.time()
+    output = logger.output_sink()
+    prefix = plain.prefix(task_name or current_task())
+    
+    def on_line(line: str):
+        output.add(line)
+        plain.output_line(prefix, line)
+    
+    title = plain.status_line(STATUS_LABELS["wait"], " " * STATUS_WIDTHS["wait"], start_time, task_name, description)
+    section = plain.begin_command(title, group)
+    try:
+        return_code, usage = get_engine().submit(cmd, on_line).result()
+    except Exception as e:
+        plain.end_command(section)
+        logger.log(f"EXCEPTION: {description} - {e}")
+        print_status("error", f"{description} ({e})", start_time, task_name)
+        return False
+    
+    plain.end_command(section)
+    output.finish(description, cmd, return_code == 0)
+    record_result(task_name, description, cmd, started, return_code, output, usage)
+    
+    # The output is on screen already, unless its group is folded
+    return report_result(return_code, description, ignore_errors, start_time, task_name,
+                         output if section is not None else None)
+
+
+def run_command_quiet(cmd: str, description: str, logger: Logger, task_name: str = None) -> int:
+    """Run a command without any status output (silent `@` lines). Returns its exit code."""
+    from .engine import get_engine
+    
+    started = time.time()
+    output = logger.output_sink()
+    return_code, usage = get_engine().submit(cmd, output.add).result()
+    output.finish(description, cmd, return_code == 0)
+    record_result(task_name, description, cmd, started, return_code, output, usage)
+    return return_code
+
 
 class VolRunner:
     """Execute tasks from configuration"""
     
-    def __init__(self, config: VolConfig):
+    def __init__(self, config: VolConfig, jobs: int = 1, keep_going: bool = False, force: bool = False):
         self.config = config
         self.logger = Logger(config.log_file)
+        self.jobs = jobs
+        self.keep_going = keep_going
+        self.force = force
     
     def run_task(self, task_name: str) -> bool:
-        """Run a single task with all its steps"""
+        """Run a single task with all its steps, timed in the run history"""
+        with task_scope(task_name) as scope:
+            success = self.run_task_steps(task_name, scope)
+            if scope.outcome is None:
+                scope.outcome = "ok" if success else "failed"
+        return success
+    
+    def run_task_steps(self, task_name: str, scope: task_scope) -> bool:
         task = self.config.get_task(task_name)
         if not task:
             print_status("error", f"Задача '{task_name}' не найдена")
@@ -299,6 +314,7 @@ class VolRunner:
         default_desc = task.get("description", task_name)
         ignore_errors = task.get("ignore_errors", False)
         
+        steps = []
         for item in commands:
             if isinstance(item, dict):
                 # Command with custom description: {cmd = "...", desc = "..."}
@@ -311,18 +327,56 @@ class VolRunner:
                 desc = default_desc
                 cmd_ignore = ignore_errors
             
-            if not cmd:
-                continue
-                
-            success = run_command_with_output(cmd, desc, cmd_ignore, self.logger)
+            if cmd:
+                steps.append((cmd, desc, cmd_ignore))
+        
+        # Tasks with inputs/outputs are skipped when nothing changed since the last run
+        store = None
+        if is_cacheable(task) and not self.force:
+            store = get_fingerprint_store()
+            fingerprint = store.task_fingerprint(task, [cmd for cmd, _, _ in steps])
+            if store.is_fresh(task_name, task, fingerprint):
+                print_status("info", f"Задача '{task_name}' не требует обновления")
+                scope.outcome = "fresh"
+                return True
+            
+            # Seen this exact state before (e.g. switched branches back) - restore outputs
+            if "outputs" in task and get_artifact_store().restore(fingerprint, get_task_fields(task, "outputs")):
+                store.record(task_name, fingerprint)
+                store.save()
+                print_status("ok", f"Задача '{task_name}' восстановлена из кэша")
+                scope.outcome = "restored"
+                return True
+        
+        if "outputs" in task:
+            get_artifact_store().unshare(get_task_fields(task, "outputs"))
+        
+        for cmd, desc, cmd_ignore in steps:
+            if self.jobs > 1:
+                # Several tasks share the terminal - output goes to the job board
+                success = run_command_captured(cmd, desc, cmd_ignore, self.logger, task_name)
+            else:
+                success = run_command_with_output(cmd, desc, cmd_ignore, self.logger, task_name)
             if not success and not cmd_ignore:
                 print_status("info", f"Подробности в логе: {self.config.log_file}")
                 return False
         
+        if is_cacheable(task):
+            # Fingerprint again: the task may have rewritten its own inputs (formatters)
+            store = store or get_fingerprint_store()
+            fingerprint = store.task_fingerprint(task, [cmd for cmd, _, _ in steps])
+            store.record(task_name, fingerprint)
+            store.save()
+            
+            outputs = get_task_fields(task, "outputs")
+            if outputs and outputs_exist(outputs):
+                digests = store.hash_files(expand_globs(outputs))
+                get_artifact_store().save(fingerprint, outputs, digests)
+        
         return True
     
-    def run_with_deps(self, task_name: str, extra_args: list[str] = None) -> bool:
-        """Run task with all its dependencies"""
+    def run_with_deps(self, task_name: str, extra_args: list[str] = None, only: set = None) -> bool:
+        """Run task with all its dependencies (or only the tasks in `only`, if given)"""
         # Inject extra args as environment variables
         if extra_args:
             import os
@@ -331,14 +385,24 @@ class VolRunner:
                     key, value = arg.split("=", 1)
                     os.environ[key] = value
         
-        tasks_to_run = self.config.resolve_dependencies(task_name)
+        graph = self.config.dependency_graph(task_name)
         
-        if not tasks_to_run:
+        if not graph:
             print_status("error", f"Задача '{task_name}' не найдена")
             return False
         
-        for name in tasks_to_run:
-            if not self.run_task(name):
-                return False
+        if only is not None:
+            graph = {name: deps for name, deps in graph.items() if name in only}
+            if not graph:
+                return True
         
-        return True
+        from .scheduler import run_graph
+        if self.jobs == 1:
+            return run_graph(graph, self.run_task, self.jobs, self.keep_going)
+        
+        from .output import set_max_task_name_length
+        from .display import JobBoard
+        set_max_task_name_length(max(len(name) for name in graph))
+        
+        with JobBoard():
+            return run_graph(graph, self.run_task, self.jobs, self.keep_going)
@@ -0,0 +1,83 @@
+"""Parallel execution of task dependency graphs"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable
+
+
+def default_jobs() -> int:
+    """Number of CPUs this process is allowed to run on"""
+    try:
+        return max(1, len(os.sched_getaffinity(0)))
+    except AttributeError:
+        # sched_getaffinity is Linux-only
+        return os.cpu_count() or 1
+
+
+def run_graph(graph: dict[str, list[str]], run_node: Callable[[str], bool],
+              jobs: int = 1, keep_going: bool = False) -> bool:
+    """
+    Run nodes of a dependency graph, up to `jobs` at a time.
+
+    graph: {node: [dependencies]} in topological order. Dependencies that
+    are not keys of the graph are ignored.
+    run_node: called with the node name, returns True on success.
+
+    A node starts as soon as all its dependencies have succeeded.
+    By default the first failure stops scheduling new nodes (already
+    running ones are allowed to finish). With keep_going=True every node
+    that does not depend on a failed one is still run.
+
+    Returns True if every node succeeded.
+    """
+    waiting = {name: {d for d in deps if d in graph} for name, deps in graph.items()}
+    dependents: dict[str, list[str]] = {name: [] for name in graph}
+    for name, deps in waiting.items():
+        for dep in deps:
+            dependents[dep].append(name)
+
+    # Preserve graph order among ready nodes so -j 1 matches the serial order
+    order = {name: i for i, name in enumerate(graph)}
+    ready = [name for name, deps in waiting.items() if not deps]
+    failed = False
+    completed = 0
+
+    def finish(name: str, ok: bool):
+        nonlocal failed, completed
+        if not ok:
+            failed = True
+            return
+        completed += 1
+        for child in dependents[name]:
+            waiting[child].discard(name)
+            if not waiting[child]:
+                ready.append(child)
+        ready.sort(key=order.get)
+
+    if jobs <= 1:
+        # Serial: run in the calling thread (keeps Live and Ctrl+C on the main thread)
+        while ready and (keep_going or not failed):
+            name = ready.pop(0)
+            finish(name, run_node(name))
+        return not failed and completed == len(graph)
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        running = {}
+        while True:
+            while ready and len(running) < jobs and (keep_going or not failed):
+                name = ready.pop(0)
+                running[pool.submit(run_node, name)] = name
+
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    ok = future.result()
+                except Exception:
+                    ok = False
+                finish(name, ok)
+
+    return not failed and completed == len(graph)
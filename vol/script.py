@@ -1,8 +1,7 @@
 """Shell script parsing and execution"""
 
-import subprocess
 from .output import print_status
-from .runner import run_command_with_output
+from .runner import run_command_with_output, run_command_quiet
 from .logger import Logger
 
 
@@ -19,6 +18,11 @@ def parse_script(filename: str) -> list[tuple[str, str, bool, bool]]:
     
     Returns list of (command, description, ignore_errors, silent)
     """
+    from .parse_cache import cached_parse
+    return cached_parse("script", filename, lambda: (parse_script_file(filename), ()))
+
+
+def parse_script_file(filename: str) -> list[tuple[str, str, bool, bool]]:
     with open(filename, "r", encoding="utf-8") as f:
         content = f.read()
 
@@ -158,9 +162,8 @@ def run_script(filename: str, logger: Logger, extra_args: list[str] = None) -> b
         for i, (cmd, desc, ignore, silent) in enumerate(commands):
             if silent:
                 # Silent execution - no status output
-                result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-                logger.log_command_output(desc or cmd[:30], cmd, result.stdout + result.stderr, result.returncode == 0)
-                if result.returncode != 0 and not ignore:
+                return_code = run_command_quiet(cmd, desc or cmd[:30], logger, script_name)
+                if return_code != 0 and not ignore:
                     return False
             else:
                 # Extract script basename for task name
@@ -0,0 +1,93 @@
+"""Opt-in persistent cache of $(shell ...) output with a time-to-live"""
+
+import os
+import json
+import time
+from pathlib import Path
+from typing import Optional
+
+# Same directory as fingerprint.STATE_DIR
+CACHE_PATH = Path(".vol") / "shell.json"
+
+
+class ShellCache:
+    """
+    {cwd + "\\n" + command: [unix time, output]} stored in .vol/shell.json.
+
+    Only used when `shell_cache_ttl` is set: meant for expensive queries
+    whose answer rarely changes (`git describe`, `pkg-config --cflags ...`).
+    """
+
+    def __init__(self, path: Path = None):
+        self.path = path or CACHE_PATH
+        self.entries: dict[str, list] = {}
+        self._dirty = False
+        self.load()
+
+    def load(self):
+        try:
+            self.entries = json.loads(self.path.read_text(encoding="utf-8"))
+            if not isinstance(self.entries, dict):
+                self.entries = {}
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def save(self):
+        """Write the cache atomically (no-op if nothing changed)"""
+        if not self._dirty:
+            return
+        self._dirty = False
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            tmp_path.write_text(json.dumps(self.entries), encoding="utf-8")
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass
+
+    def get(self, command: str, cwd: str, ttl: float) -> Optional[str]:
+        """Cached output, or None if missing or older than ttl seconds"""
+        entry = self.entries.get(f"{cwd}\n{command}")
+        if entry and 0 <= time.time() - entry[0] < ttl:
+            return entry[1]
+        return None
+
+    def put(self, command: str, cwd: str, output: str):
+        self.entries[f"{cwd}\n{command}"] = [time.time(), output]
+        self._dirty = True
+
+    def clear(self):
+        if self.entries:
+            self.entries = {}
+            self._dirty = True
+
+
+# Global cache instance
+_cache: Optional[ShellCache] = None
+
+# Set by `vol --refresh-shell`: cached outputs are dropped and re-queried
+_refresh = False
+
+
+def get_shell_cache() -> ShellCache:
+    """Get or create the global shell cache"""
+    global _cache
+    if _cache is None:
+        _cache = ShellCache()
+        if _refresh:
+            _cache.clear()
+    return _cache
+
+
+def set_shell_refresh(refresh: bool):
+    """Invalidate the persistent cache for this run"""
+    global _refresh
+    _refresh = refresh
+    if refresh and _cache is not None:
+        _cache.clear()
+
+
+def save_shell_cache():
+    """Persist new entries, if the cache was used in this run"""
+    if _cache is not None:
+        _cache.save()
@@ -0,0 +1,142 @@
+"""End-of-build summary: the costliest commands and the time vol added around them"""
+
+import time
+import threading
+from dataclasses import dataclass
+from typing import Optional
+
+from .engine import Usage
+
+
+@dataclass
+class CommandStats:
+    """One finished command of this run"""
+    task: Optional[str]
+    description: str
+    started: float
+    duration: float
+    exit_code: int
+    usage: Usage
+
+
+class BuildSummary:
+    """
+    Commands finished in this run, for the summary table (--summary).
+
+    vol's own share of the wall time is what is left after removing every
+    moment at least one command was running: parsing, fingerprinting,
+    rendering and the gaps between commands.
+    """
+
+    def __init__(self, started: float):
+        self.started = started
+        self.commands: list[CommandStats] = []
+        self._lock = threading.Lock()
+
+    def add(self, stats: CommandStats):
+        with self._lock:
+            self.commands.append(stats)
+
+    def busy_time(self) -> float:
+        """Wall time during which at least one command was running"""
+        busy = 0.0
+        end = 0.0
+        for stats in sorted(self.commands, key=lambda s: s.started):
+            start, finish = max(stats.started, end), stats.started + stats.duration
+            if finish > start:
+                busy += finish - start
+                end = finish
+        return busy
+
+    def top(self, count: int) -> list[CommandStats]:
+        """The `count` slowest, most CPU-hungry and largest commands, slowest first"""
+        rankings = (
+            sorted(self.commands, key=lambda s: s.duration, reverse=True),
+            sorted(self.commands, key=lambda s: s.usage.cpu, reverse=True),
+            sorted(self.commands, key=lambda s: s.usage.max_rss, reverse=True),
+        )
+        chosen = {id(s): s for ranking in rankings for s in ranking[:count]}
+        return sorted(chosen.values(), key=lambda s: s.duration, reverse=True)
+
+
+# Summary of the current run, started by the CLI
+_summary: Optional[BuildSummary] = None
+
+
+def start_summary(started: float) -> BuildSummary:
+    global _summary
+    _summary = BuildSummary(started)
+    return _summary
+
+
+def get_summary() -> Optional[BuildSummary]:
+    return _summary
+
+
+def format_size(size: int) -> str:
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f}{unit}"
+        size /= 1024
+    return f"{size:.1f}GB"
+
+
+def own_max_rss() -> int:
+    """
+    vol's own peak RSS. A child's peak starts at it (exec records the RSS
+    of the process it replaces), so smaller peaks are only known to be below it.
+    """
+    import resource
+    return Usage.from_rusage(resource.getrusage(resource.RUSAGE_SELF)).max_rss
+
+
+def format_rss(size: int, bound: bool) -> str:
+    """Peak RSS, marked ≤ when it is only an upper bound (see own_max_rss)"""
+    return f"≤{format_size(size)}" if bound else format_size(size)
+
+
+def print_summary():
+    """Print the summary table of this run (`--summary` or show_summary = true)"""
+    import resource
+    from rich.table import Table
+    from rich.text import Text
+    from rich import box
+    from .config import get_ui_config
+    from .history import format_duration
+    from .output import console, print_status
+
+    summary = get_summary()
+    if summary is None or not summary.commands:
+        return
+    ui = get_ui_config()
+
+    table = Table(title=f"Итоги сборки (топ-{ui.summary_top} по времени, CPU и памяти)", box=box.ROUNDED)
+    table.add_column("Команда", overflow="fold", min_width=16)
+    # Numbers never wrap: the command column gives way on narrow terminals
+    for column in ("Время", "CPU", "sys", "RSS", "Блоки i/o", "Перекл."):
+        table.add_column(column, justify="right", no_wrap=True)
+    
+    own_rss = own_max_rss()
+    for stats in summary.top(ui.summary_top):
+        usage = stats.usage
+        command = Text(f"[{stats.task}] " if stats.task and stats.task != stats.description else "", style="dim")
+        command.append(stats.description, style="bold red" if stats.exit_code else "bold cyan")
+        table.add_row(
+            command, format_duration(stats.duration),
+            format_duration(usage.cpu), format_duration(usage.system_cpu),
+            format_rss(usage.max_rss, usage.max_rss <= own_rss),
+            f"{usage.in_blocks}/{usage.out_blocks}",
+            f"{usage.voluntary_switches}/{usage.involuntary_switches}",
+        )
+    console.print(table)
+
+    wall = time.time() - summary.started
+    busy = summary.busy_time()
+    overhead = max(0.0, wall - busy)
+    child_cpu = sum(s.usage.cpu for s in summary.commands)
+    share = overhead / wall * 100 if wall > 0 else 0
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    print_status("info", f"Сборка {format_duration(wall)}: команды {format_duration(busy)} "
+                         f"({len(summary.commands)} шт., CPU {format_duration(child_cpu)}), "
+                         f"vol сверх них {format_duration(overhead)} ({share:.0f}%, "
+                         f"CPU vol {format_duration(own.ru_utime + own.ru_stime)})")
@@ -0,0 +1,72 @@
+"""ANSI terminal control written straight to stdout"""
+
+import sys
+from typing import Optional
+
+# Cursor home and erase the screen; the scrollback (earlier build output) is kept
+CLEAR_SCREEN = "\033[H\033[2J"
+
+# Erase from the cursor to the end of the line, and to the end of the screen
+ERASE_LINE = "\033[K"
+ERASE_BELOW = "\033[J"
+
+
+def cursor_to(row: int, column: int = 1) -> str:
+    """Move the cursor to a 1-based screen position"""
+    return f"\033[{row};{column}H"
+
+
+def repaint(rows: list[str], top: int = 1) -> str:
+    """
+    Sequence drawing rows over the screen from row `top` down, erasing what
+    each overwritten line and the rest of the screen showed. Nothing is
+    scrolled or erased above: the scrollback stays as it was printed.
+    """
+    body = "".join(row.replace("\n", ERASE_LINE + "\n") + ERASE_LINE + "\n" for row in rows)
+    return cursor_to(top) + body + ERASE_BELOW
+
+
+def write(text: str):
+    """Write escape sequences and text in one go"""
+    sys.stdout.write(text)
+    sys.stdout.flush()
+
+
+def last_rows(lines: list[str], rows: int) -> list[str]:
+    """The trailing lines that fit in `rows` screen rows (a line may span several)"""
+    used = 0
+    start = len(lines)
+    while start > 0:
+        height = lines[start - 1].count("\n") + 1
+        if used + height > rows:
+            break
+        used += height
+        start -= 1
+    return lines[start:]
+
+
+# Static lines (tmp log entries) the screen is known to show, None if unknown:
+# a redraw is skipped while only logged status lines were printed since the last one
+_synced_lines: Optional[int] = None
+
+
+def mark_synced(line_count: int):
+    global _synced_lines
+    _synced_lines = line_count
+
+
+def note_static_line(line_count: int):
+    """A logged status line was printed; line_count is the log size before it"""
+    global _synced_lines
+    if _synced_lines == line_count:
+        _synced_lines = line_count + 1
+
+
+def mark_dirty():
+    """Something other than logged status lines reached the screen"""
+    global _synced_lines
+    _synced_lines = None
+
+
+def is_synced(line_count: int) -> bool:
+    return _synced_lines == line_count
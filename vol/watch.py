@@ -0,0 +1,378 @@
+"""Watch mode: re-run tasks and Makefile targets when their files change"""
+
+import os
+import time
+import struct
+import select
+import fnmatch
+from pathlib import Path
+from typing import Callable, Optional
+
+from .output import print_status, print_error_footer
+
+# Directories never watched
+IGNORED_DIRS = {".git", ".hg", ".svn", ".vol", "__pycache__", "node_modules"}
+
+# Events closer together than this are handled as one change
+DEBOUNCE_S = 0.2
+
+# Poll interval when inotify is not available
+POLL_INTERVAL_S = 0.5
+
+# inotify event masks (see inotify(7))
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+
+# struct inotify_event header: wd, mask, cookie, len
+EVENT_HEADER = struct.Struct("iIII")
+
+
+def is_ignored(path: str) -> bool:
+    """Paths vol writes itself (state, logs, temp files) never trigger a run"""
+    parts = Path(path).parts
+    if any(part in IGNORED_DIRS for part in parts[:-1]):
+        return True
+    name = parts[-1] if parts else ""
+    return name.endswith(".log") or (name.startswith(".vol") and name.endswith(".tmp"))
+
+
+def walk_dirs(root: str):
+    """Yield root and all subdirectories that are not ignored"""
+    for dirpath, dirnames, _ in os.walk(root):
+        dirnames[:] = [d for d in dirnames if d not in IGNORED_DIRS]
+        yield dirpath
+
+
+def normalize(path: str) -> str:
+    """Path relative to the current directory, as tasks and Makefiles spell it"""
+    return os.path.normpath(os.path.relpath(path))
+
+
+class InotifyWatcher:
+    """Recursive directory watcher on Linux inotify (through ctypes, no dependencies)"""
+
+    def __init__(self, root: str = "."):
+        import ctypes
+        import ctypes.util
+
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._dirs: dict[int, str] = {}
+        for path in walk_dirs(root):
+            self._add(path)
+
+    def _add(self, path: str):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd >= 0:
+            self._dirs[wd] = path
+
+    def wait(self, timeout: float) -> set[str]:
+        """Wait up to timeout seconds, returns changed paths"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+
+        changed = set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return changed
+
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                # Lost events: report the whole tree as changed
+                changed.add(".")
+                continue
+            if mask & IN_IGNORED:
+                self._dirs.pop(wd, None)
+                continue
+            directory = self._dirs.get(wd)
+            if directory is None:
+                continue
+            path = os.path.join(directory, name) if name else directory
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO) and os.path.basename(path) not in IGNORED_DIRS:
+                    # New directory: watch it and report files created before the watch was added
+                    for sub in walk_dirs(path):
+                        self._add(sub)
+                        changed.update(os.path.join(sub, f) for f in os.listdir(sub))
+                continue
+            changed.add(path)
+
+        return {normalize(p) for p in changed}
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Fallback watcher comparing file modification times"""
+
+    def __init__(self, root: str = "."):
+        self.root = root
+        self._snapshot = self._scan()
+
+    def _scan(self) -> dict[str, tuple]:
+        snapshot = {}
+        for dirpath in walk_dirs(self.root):
+            try:
+                names = os.listdir(dirpath)
+            except OSError:
+                continue
+            for name in names:
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                if not os.path.isdir(path):
+                    snapshot[path] = (st.st_mtime_ns, st.st_size)
+        return snapshot
+
+    def wait(self, timeout: float) -> set[str]:
+        """Wait up to timeout seconds, returns changed paths"""
+        deadline = time.monotonic() + timeout
+        while True:
+            snapshot = self._scan()
+            changed = {p for p in snapshot.keys() | self._snapshot.keys()
+                       if snapshot.get(p) != self._snapshot.get(p)}
+            self._snapshot = snapshot
+            remaining = deadline - time.monotonic()
+            if changed or remaining <= 0:
+                return {normalize(p) for p in changed}
+            time.sleep(min(POLL_INTERVAL_S, remaining))
+
+    def close(self):
+        pass
+
+
+def create_watcher(root: str = "."):
+    """inotify watcher on Linux, polling elsewhere"""
+    try:
+        return InotifyWatcher(root)
+    except (OSError, AttributeError, TypeError):
+        return PollingWatcher(root)
+
+
+def wait_for_changes(watcher, is_relevant: Callable[[str], bool]) -> set[str]:
+    """Block until relevant files change, then wait until events settle (debounce)"""
+    changed = set()
+    while not changed:
+        changed = {p for p in watcher.wait(3600) if not is_ignored(p) and is_relevant(p)}
+    while True:
+        more = {p for p in watcher.wait(DEBOUNCE_S) if not is_ignored(p) and is_relevant(p)}
+        if not more:
+            return changed
+        changed |= more
+
+
+def discard_pending(watcher):
+    """Drop events caused by the build that just finished"""
+    while watcher.wait(0):
+        pass
+
+
+def matches_patterns(path: str, patterns: list[str]) -> bool:
+    """Check a path against task input/output globs (also matches deleted files)"""
+    for pattern in patterns:
+        pattern = os.path.normpath(os.path.expandvars(pattern))
+        if path == pattern or path.startswith(pattern + os.sep) or fnmatch.fnmatch(path, pattern):
+            return True
+    return False
+
+
+def dependents_closure(graph: dict[str, list[str]], names: set[str]) -> set[str]:
+    """The given nodes plus everything in the graph that depends on them"""
+    dependents: dict[str, list[str]] = {name: [] for name in graph}
+    for name, deps in graph.items():
+        for dep in deps:
+            if dep in dependents:
+                dependents[dep].append(name)
+
+    result = set()
+    stack = list(names)
+    while stack:
+        name = stack.pop()
+        if name in result or name not in graph:
+            continue
+        result.add(name)
+        stack.extend(dependents[name])
+    return result
+
+
+def parse_sources(stamps: dict) -> tuple[set[str], list[str]]:
+    """
+    Files and glob patterns a parse result was built from (recorded_stamps),
+    spelled like the changed paths the watcher reports
+    """
+    from .parse_cache import GLOB_PREFIX, VOLATILE
+    files, patterns = set(), []
+    for source in stamps:
+        if source == VOLATILE:
+            continue
+        if source.startswith(GLOB_PREFIX):
+            patterns.append(normalize(source[len(GLOB_PREFIX):]))
+        else:
+            files.add(normalize(source))
+    return files, patterns
+
+
+def report_changes(changed: set[str]):
+    files = sorted(changed)
+    shown = ", ".join(files[:3]) + (f" и ещё {len(files) - 3}" if len(files) > 3 else "")
+    print_status("info", f"Изменено: {shown}")
+
+
+def watch_loop(run: Callable[[Optional[set]], bool], is_relevant: Callable[[str], bool]):
+    """Run once, then re-run on every change until Ctrl+C.
+
+    run(changed) gets None for the first run and the set of changed paths after that.
+    """
+    watcher = create_watcher()
+    try:
+        changed = None
+        while True:
+            if changed is not None and "." in changed:
+                # Events were lost: treat as a fresh start
+                changed = None
+            if not run(changed):
+                print_error_footer()
+            discard_pending(watcher)
+            print_status("info", "Ожидание изменений... (Ctrl+C для выхода)")
+            changed = wait_for_changes(watcher, is_relevant)
+            report_changes(changed)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+
+
+def watch_tasks(config_path: str, task_name: str, extra_args: list[str] = None,
+                jobs: int = 1, keep_going: bool = False, force: bool = False):
+    """vol --watch <task>: re-run the tasks whose inputs changed, and what depends on them"""
+    from .config import VolConfig
+    from .runner import VolRunner
+    from .fingerprint import get_task_fields
+
+    state = {}
+
+    def load():
+        config = VolConfig(config_path)
+        graph = config.dependency_graph(task_name)
+        state["runner"] = VolRunner(config, jobs=jobs, keep_going=keep_going, force=force)
+        state["graph"] = graph
+        state["inputs"] = {name: get_task_fields(config.get_task(name), "inputs") for name in graph}
+        state["outputs"] = [p for name in graph for p in get_task_fields(config.get_task(name), "outputs")]
+
+    def affected_tasks(changed: set[str]) -> Optional[set]:
+        if os.path.normpath(config_path) in changed:
+            load()
+            return None
+        graph, inputs = state["graph"], state["inputs"]
+        if not any(inputs.values()):
+            # No task declares inputs: any change re-runs the whole chain
+            return None
+        touched = {name for name in graph if any(matches_patterns(p, inputs[name]) for p in changed)}
+        return dependents_closure(graph, touched)
+
+    def run(changed: Optional[set]) -> bool:
+        only = affected_tasks(changed) if changed is not None else None
+        if only is not None and not only:
+            return True
+        return state["runner"].run_with_deps(task_name, extra_args, only)
+
+    def is_relevant(path: str) -> bool:
+        return not matches_patterns(path, state["outputs"])
+
+    load()
+    if not state["graph"]:
+        print_status("error", f"Задача '{task_name}' не найдена")
+        return
+    watch_loop(run, is_relevant)
+
+
+def watch_makefile(target_name: str, extra_args: list[str] = None, makefile: str = "Makefile",
+                   jobs: int = 1, keep_going: bool = False):
+    """vol --watch make:<target>: re-run the targets whose prerequisites changed, and what depends on them"""
+    from .logger import Logger
+    from .makefile import read_makefile, expand_pattern_rules, makefile_graph, build_makefile_target, clear_shell_results
+    from .parse_cache import recorded_stamps
+
+    logger = Logger("./vol.log")
+    state = {}
+
+    def load() -> bool:
+        try:
+            (targets, variables, patterns), stamps = recorded_stamps(lambda: read_makefile(makefile))
+        except Exception as e:
+            # Parsed again on the next change, whatever file it is
+            state.pop("sources", None)
+            print_status("error", f"Ошибка парсинга Makefile: {e}")
+            return False
+        for arg in extra_args or []:
+            if "=" in arg:
+                key, value = arg.split("=", 1)
+                variables[key] = value
+        expand_pattern_rules(target_name, targets, patterns)
+        state.update(targets=targets, variables=variables, graph=makefile_graph(target_name, targets),
+                     sources=parse_sources(stamps))
+        return True
+
+    def parse_changed(changed: set[str]) -> bool:
+        # The Makefile, included fragments, dependency files (gcc -MMD) and
+        # $(wildcard) matches: anything the parse was built from
+        if "sources" not in state:
+            return True
+        files, patterns = state["sources"]
+        return any(path in files or matches_patterns(path, patterns) for path in changed)
+
+    def run(changed: Optional[set]) -> bool:
+        # Every rebuild is a new run for the $(shell ...) memo
+        clear_shell_results()
+        if changed is None or parse_changed(changed):
+            if not load():
+                return False
+            changed = None
+        targets, graph = state["targets"], state["graph"]
+        if target_name not in targets:
+            print_status("error", f"Цель '{target_name}' не найдена")
+            return False
+
+        executed = None
+        if changed is not None:
+            touched = {name for name, target in targets.items()
+                       if name in graph and any(dep in changed for dep in target["depends"])}
+            affected = dependents_closure(graph, touched)
+            if not affected:
+                return True
+            executed = set(graph) - affected
+        return build_makefile_target(target_name, targets, state["variables"], logger, jobs, keep_going, executed)
+
+    def is_relevant(path: str) -> bool:
+        # Files made by a recipe change during every build
+        target = state.get("targets", {}).get(path)
+        return target is None or not target["commands"]
+
+    watch_loop(run, is_relevant)